@@ -15,6 +15,7 @@ from api.routes.scrape import scrape_bp
 from api.routes.ml import ml_bp
 
 from api.logs import register_access_log
+from api.commands import register_commands
 
 
 logger = logging.getLogger(__name__)
@@ -62,6 +63,9 @@ def create_app(testing=False):
     #registro de  requisições
     register_access_log(app)
 
+    #comandos de linha de comando (flask scrape-queue ...)
+    register_commands(app)
+
     #registro de blueprints
     app.register_blueprint(auth_bp, url_prefix='/api/v1/auth')
     app.register_blueprint(health_bp, url_prefix='/api/v1/health')
@@ -0,0 +1,52 @@
+import logging
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from api.extensions import db
+from api.models.scrape_job import ScrapeJob
+from api.scripts.scrape_job_utils import serialize_scrape_job
+from api.scripts.scrape_queue_utils import (
+    seed_scrape_queue, run_queue_worker, get_latest_distributed_job, default_worker_id
+)
+
+
+logger = logging.getLogger(__name__)
+scrape_queue_cli = AppGroup('scrape-queue', help='Scraping distribuído por meio da fila scrape_task.')
+
+
+@scrape_queue_cli.command('seed')
+def seed():
+    '''Cria um job distribuído e enfileira as categorias.'''
+    job = seed_scrape_queue()
+    click.echo(f'Job {job.id} criado com {job.categories_total} categorias na fila.')
+
+
+@scrape_queue_cli.command('work')
+@click.option('--job-id', type=int, default=None, help='Job a consumir (padrão: o job distribuído mais recente).')
+@click.option('--worker-id', default=None, help='Identificador do worker (padrão: host:pid).')
+def work(job_id, worker_id):
+    '''Consome a fila até que ela se esgote.'''
+    if job_id is None:
+        job = get_latest_distributed_job()
+        if not job:
+            raise click.ClickException('Nenhum job distribuído em execução. Execute "flask scrape-queue seed".')
+        job_id = job.id
+    #as demais opções do worker (SCRAPE_QUEUE_*) são lidas da configuração da aplicação
+    total = run_queue_worker(job_id, worker_id=worker_id or default_worker_id())
+    click.echo(f'Worker finalizado: {total} livros gravados no job {job_id}.')
+
+
+@scrape_queue_cli.command('status')
+@click.argument('job_id', type=int)
+def status(job_id):
+    '''Mostra o progresso de um job.'''
+    job = db.session.get(ScrapeJob, job_id)
+    if not job:
+        raise click.ClickException(f'Job de scraping com id {job_id} não encontrado')
+    for key, value in serialize_scrape_job(job, current_app.config['SCRAPE_JOB_STALE_SECONDS']).items():
+        click.echo(f'{key}: {value}')
+
+
+def register_commands(app):
+    '''Registra os comandos de linha de comando da API (flask <comando>).'''
+    app.cli.add_command(scrape_queue_cli)
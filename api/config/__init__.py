@@ -1,5 +1,6 @@
 import logging
 import os
+import tempfile
 from datetime import timedelta
 
 
@@ -21,6 +22,41 @@ class Config(object):
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=60)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(minutes=1440)
 
+    SCRAPER_PARSER = os.environ.get('SCRAPER_PARSER', 'html.parser')
+    SCRAPER_BASE_URL = os.environ.get('SCRAPER_BASE_URL', 'http://books.toscrape.com/')
+    SCRAPER_INITIAL_CONCURRENCY = int(os.environ.get('SCRAPER_INITIAL_CONCURRENCY', 4))
+    SCRAPER_MAX_CONCURRENCY = int(os.environ.get('SCRAPER_MAX_CONCURRENCY', 16))
+    SCRAPER_TARGET_LATENCY = float(os.environ.get('SCRAPER_TARGET_LATENCY', 2.0))
+    SCRAPER_MAX_RETRIES = int(os.environ.get('SCRAPER_MAX_RETRIES', 4))
+    SCRAPER_CACHE_DIR = os.environ.get('SCRAPER_CACHE_DIR')
+    SCRAPER_CACHE_TTL = float(os.environ.get('SCRAPER_CACHE_TTL', 86400))
+    SCRAPER_CACHE_MAX_BYTES = int(os.environ.get('SCRAPER_CACHE_MAX_BYTES', 512 * 2**20))
+    SCRAPE_BATCH_SIZE = int(os.environ.get('SCRAPE_BATCH_SIZE', 200))
+    SCRAPE_JOBS_ASYNC = os.environ.get('SCRAPE_JOBS_ASYNC', 'true').lower() == 'true'
+    SCRAPE_JOB_STALE_SECONDS = int(os.environ.get('SCRAPE_JOB_STALE_SECONDS', 300))
+    SCRAPE_QUEUE_CLAIM_SIZE = int(os.environ.get('SCRAPE_QUEUE_CLAIM_SIZE', 4))
+    SCRAPE_QUEUE_LEASE_SECONDS = int(os.environ.get('SCRAPE_QUEUE_LEASE_SECONDS', 300))
+    SCRAPE_QUEUE_MAX_ATTEMPTS = int(os.environ.get('SCRAPE_QUEUE_MAX_ATTEMPTS', 3))
+    SCRAPE_QUEUE_POLL_INTERVAL = float(os.environ.get('SCRAPE_QUEUE_POLL_INTERVAL', 1.0))
+    SCRAPE_QUEUE_LOCK_FILE = os.environ.get(
+        'SCRAPE_QUEUE_LOCK_FILE',
+        os.path.join(tempfile.gettempdir(), 'bookstoscrape_scrape_queue.lock')
+    )
+    SEARCH_INCLUDE_DESCRIPTION = os.environ.get('SEARCH_INCLUDE_DESCRIPTION', 'false').lower() == 'true'
+    SEARCH_FUZZY_THRESHOLD = float(os.environ.get('SEARCH_FUZZY_THRESHOLD', 0.3))
+    SEARCH_FUZZY_LIMIT = int(os.environ.get('SEARCH_FUZZY_LIMIT', 10))
+    AUTOCOMPLETE_MAX_LIMIT = int(os.environ.get('AUTOCOMPLETE_MAX_LIMIT', 50))
+    CATALOG_CACHE_CHECK_SECONDS = float(os.environ.get('CATALOG_CACHE_CHECK_SECONDS', 1.0))
+    PAGINATION_DEFAULT_LIMIT = int(os.environ.get('PAGINATION_DEFAULT_LIMIT', 100))
+    PAGINATION_MAX_LIMIT = int(os.environ.get('PAGINATION_MAX_LIMIT', 1000))
+    BOOKS_BATCH_MAX_IDS = int(os.environ.get('BOOKS_BATCH_MAX_IDS', 100))
+    STREAM_YIELD_PER = int(os.environ.get('STREAM_YIELD_PER', 1000))
+    CATALOG_SNAPSHOT_ENABLED = os.environ.get('CATALOG_SNAPSHOT_ENABLED', 'false').lower() == 'true'
+    FACET_PRICE_EDGES = tuple(float(edge) for edge in os.environ.get('FACET_PRICE_EDGES', '10,20,30,40,50').split(','))
+
 class TestingConfig(Config):
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
-    TESTING = True
\ No newline at end of file
+    #TEST_DATABASE_URL permite executar os testes em um Postgres descartável
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite:///:memory:')
+    TESTING = True
+    SCRAPE_JOBS_ASYNC = False
+    CATALOG_CACHE_CHECK_SECONDS = 0
\ No newline at end of file
@@ -1,8 +1,14 @@
 from api.extensions import db
 
+from . import genres
+from . import book_details
 from . import books
+from . import catalog_version
+from . import catalog_stats
 from . import user
 from . import user_access
 from . import refresh_token_manager
 from . import access_log
-from . import user_preferences
\ No newline at end of file
+from . import user_preferences
+from . import scrape_job
+from . import scrape_task
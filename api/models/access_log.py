@@ -24,7 +24,7 @@ class AccessLog(db.Model):
     user_agent_platform = db.Column(db.String(100), nullable=True)
     response_time_ms    = db.Column(db.Float, nullable=True)
     status_code         = db.Column(db.Integer, nullable=True)
-    created_at          = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at          = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
     def __repr__(self):
         return f'<Username {self.username}'
\ No newline at end of file
@@ -0,0 +1,28 @@
+import logging
+from api.extensions import db
+
+
+logger = logging.getLogger(__name__)
+
+#colunas largas ou raramente lidas de cada livro, fora da tabela books (lidas só pelos detalhes do livro e pelo ML)
+BOOK_DETAIL_COLUMNS = ('description', 'product_type', 'price_excl_tax', 'price_incl_tax', 'tax', 'url')
+
+
+class BookDetails(db.Model):
+    '''
+    Modelo de dados para a tabela book_details: a descrição e as demais colunas pouco lidas de cada
+    livro, separadas de books para que as varreduras das listagens e estatísticas leiam só as
+    colunas estreitas. A chave é o upc, o que permite gravar as duas tabelas na mesma carga sem
+    conhecer os ids gerados para books.
+    '''
+    __tablename__ = 'book_details'
+    upc                = db.Column(db.String(50), db.ForeignKey('books.upc', ondelete='CASCADE'), primary_key=True)
+    description        = db.Column(db.Text, nullable=False)
+    product_type       = db.Column(db.String(50), nullable=False)
+    price_excl_tax     = db.Column(db.Float, nullable=False)
+    price_incl_tax     = db.Column(db.Float, nullable=False)
+    tax                = db.Column(db.Float, nullable=False)
+    url                = db.Column(db.String(1024), nullable=False)
+
+    def __repr__(self):
+        return f'<BookDetails {self.upc}>'
@@ -1,28 +1,66 @@
 import logging
+from sqlalchemy.ext.associationproxy import association_proxy
 from api.models.__init__ import db
+from api.models.book_details import BookDetails
+from api.models.books_search import register_search_ddl
+from api.models.genres import Genre
 
 
 logger = logging.getLogger(__name__)
 
+#valor numérico de cada avaliação textual (classe star-rating do books.toscrape.com)
+RATING_VALUES = {
+    'One': 1,
+    'Two': 2,
+    'Three': 3,
+    'Four': 4,
+    'Five': 5
+}
+#avaliações fora de RATING_VALUES ficam com rating_value nulo
+RATING_VALUE_EXPRESSION = 'CASE rating ' + ' '.join(f"WHEN '{label}' THEN {value}" for label, value in RATING_VALUES.items()) + ' END'
+
+
+def _detail(name: str):
+    '''Atributo do livro que lê e grava a coluna de mesmo nome em book_details (criando a linha se preciso).'''
+    return association_proxy('details', name, creator=lambda value: BookDetails(**{name: value}))
+
 
 class Books(db.Model):
     '''Modelo de dados para a tabela books.'''
     __tablename__ = 'books'
+    __table_args__ = (
+        #cobre o agrupamento por gênero com a média de preço (stats) sem ler a tabela
+        db.Index('ix_books_genre_id_price', 'genre_id', 'price'),
+    )
     id                 = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    upc                = db.Column(db.String(50), nullable=False)
-    title              = db.Column(db.String(500), nullable=False)
-    genre              = db.Column(db.String(100), nullable=False)
-    price              = db.Column(db.Float, nullable=False) 
+    upc                = db.Column(db.String(50), nullable=False, unique=True, index=True)
+    title              = db.Column(db.String(500), nullable=False, index=True)
+    genre_id           = db.Column(db.Integer, db.ForeignKey('genres.id'), nullable=False)
+    #nome do gênero (somente leitura), lido de genres pela chave; filtros e agregações frequentes usam genre_id
+    genre              = db.column_property(
+        db.select(Genre.name).where(Genre.id == genre_id).correlate_except(Genre).scalar_subquery()
+    )
+    price              = db.Column(db.Float, nullable=False, index=True)
     availability       = db.Column(db.Integer, nullable=False)
     rating             = db.Column(db.String(50), nullable=False)
-    description        = db.Column(db.Text, nullable=False)
-    product_type       = db.Column(db.String(50), nullable=False)
-    price_excl_tax     = db.Column(db.Float, nullable=False)
-    price_incl_tax     = db.Column(db.Float, nullable=False)
-    tax                = db.Column(db.Float, nullable=False)
+    #coluna gerada pelo banco a partir de rating, preenchida em qualquer caminho de carga (COPY, INSERT, upsert)
+    rating_value       = db.Column(db.Integer, db.Computed(RATING_VALUE_EXPRESSION, persisted=True))
     number_of_reviews  = db.Column(db.Integer, nullable=False)
-    url                = db.Column(db.String(1024), nullable=False)
     image_url          = db.Column(db.String(1024), nullable=False)
+    #colunas largas em book_details (partição vertical), carregadas só quando acessadas
+    details            = db.relationship(BookDetails, uselist=False, cascade='all, delete-orphan')
+    description        = _detail('description')
+    product_type       = _detail('product_type')
+    price_excl_tax     = _detail('price_excl_tax')
+    price_incl_tax     = _detail('price_incl_tax')
+    tax                = _detail('tax')
+    url                = _detail('url')
     
     def __repr__(self):
-        return f'<Title {self.title}>'
\ No newline at end of file
+        return f'<Title {self.title}>'
+
+
+#get_top_rated_books: varredura do índice na ordem de rating_value desc, title com LIMIT, sem ordenação
+db.Index('ix_books_rating_value_title', Books.rating_value.desc(), Books.title)
+#índice de texto completo da busca (tsvector + GIN no Postgres, FTS5 no SQLite), sobre books e book_details
+register_search_ddl(Books.__table__, BookDetails.__table__)
@@ -0,0 +1,126 @@
+import functools
+import logging
+import sqlite3
+from sqlalchemy import DDL, Table, event
+
+
+logger = logging.getLogger(__name__)
+
+#tabela FTS5 (SQLite) sem conteúdo próprio (contentless), sincronizada por triggers em books e book_details
+FTS_TABLE = 'books_fts'
+#coluna tsvector (Postgres) com título (peso A), gênero (B) e descrição (C), mantida por triggers em books e book_details
+SEARCH_VECTOR_COLUMN = 'search_vector'
+
+#a descrição fica em book_details (partição vertical); livros ainda sem a linha de detalhes são indexados com descrição vazia
+POSTGRES_SEARCH_DDL = [
+    f'ALTER TABLE books ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR_COLUMN} tsvector',
+    #a configuração simple não aplica stemming nem stopwords, o mesmo comportamento do tokenizador unicode61 do FTS5
+    f'''CREATE OR REPLACE FUNCTION books_{SEARCH_VECTOR_COLUMN}() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.{SEARCH_VECTOR_COLUMN} :=
+            setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce((SELECT name FROM genres WHERE id = NEW.genre_id), '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce((SELECT description FROM book_details WHERE upc = NEW.upc), '')), 'C');
+        RETURN NEW;
+    END $$''',
+    f'''CREATE TRIGGER books_{SEARCH_VECTOR_COLUMN} BEFORE INSERT OR UPDATE OF title, genre_id, {SEARCH_VECTOR_COLUMN} ON books
+        FOR EACH ROW EXECUTE FUNCTION books_{SEARCH_VECTOR_COLUMN}()''',
+    f'CREATE INDEX IF NOT EXISTS ix_books_{SEARCH_VECTOR_COLUMN} ON books USING gin ({SEARCH_VECTOR_COLUMN})',
+    #busca aproximada de títulos (operador % do pg_trgm); nos demais bancos o índice de trigramas fica em memória
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS ix_books_title_trgm ON books USING gin (title gin_trgm_ops)'
+]
+
+#alterar a descrição recalcula o tsvector do livro (o UPDATE dispara o trigger de books)
+POSTGRES_DETAILS_SEARCH_DDL = [
+    f'''CREATE OR REPLACE FUNCTION book_details_{SEARCH_VECTOR_COLUMN}() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            UPDATE books SET {SEARCH_VECTOR_COLUMN} = NULL WHERE upc = OLD.upc;
+        ELSE
+            UPDATE books SET {SEARCH_VECTOR_COLUMN} = NULL WHERE upc = NEW.upc;
+        END IF;
+        RETURN NULL;
+    END $$''',
+    f'''CREATE TRIGGER book_details_{SEARCH_VECTOR_COLUMN} AFTER INSERT OR UPDATE OF description OR DELETE ON book_details
+        FOR EACH ROW EXECUTE FUNCTION book_details_{SEARCH_VECTOR_COLUMN}()'''
+]
+
+#descrição atual do livro em book_details (vazia se ainda não houver a linha) e nome do gênero em genres
+_SQLITE_DESCRIPTION = "coalesce((SELECT description FROM book_details WHERE upc = {row}.upc), '')"
+_SQLITE_GENRE = '(SELECT name FROM genres WHERE id = {row}.genre_id)'
+
+#o 'delete' de uma tabela contentless precisa dos mesmos valores indexados, por isso os triggers das duas tabelas
+#sempre removem o documento com os valores atuais da outra tabela antes de indexá-lo de novo
+SQLITE_SEARCH_DDL = [
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, genre, description, content='', tokenize='unicode61 remove_diacritics 2'
+    )''',
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON books BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, genre, description) VALUES (new.id, new.title, {_SQLITE_GENRE.format(row='new')}, {_SQLITE_DESCRIPTION.format(row='new')});
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON books BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, genre, description) VALUES ('delete', old.id, old.title, {_SQLITE_GENRE.format(row='old')}, {_SQLITE_DESCRIPTION.format(row='old')});
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON books BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, genre, description) VALUES ('delete', old.id, old.title, {_SQLITE_GENRE.format(row='old')}, {_SQLITE_DESCRIPTION.format(row='old')});
+        INSERT INTO {FTS_TABLE}(rowid, title, genre, description) VALUES (new.id, new.title, {_SQLITE_GENRE.format(row='new')}, {_SQLITE_DESCRIPTION.format(row='new')});
+    END'''
+]
+
+#sem o livro correspondente em books (e.g., detalhes gravados antes do livro), não há documento a atualizar
+SQLITE_DETAILS_SEARCH_DDL = [
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_details_ai AFTER INSERT ON book_details BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, genre, description) SELECT 'delete', id, title, {_SQLITE_GENRE.format(row='books')}, '' FROM books WHERE upc = new.upc;
+        INSERT INTO {FTS_TABLE}(rowid, title, genre, description) SELECT id, title, {_SQLITE_GENRE.format(row='books')}, new.description FROM books WHERE upc = new.upc;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_details_ad AFTER DELETE ON book_details BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, genre, description) SELECT 'delete', id, title, {_SQLITE_GENRE.format(row='books')}, old.description FROM books WHERE upc = old.upc;
+        INSERT INTO {FTS_TABLE}(rowid, title, genre, description) SELECT id, title, {_SQLITE_GENRE.format(row='books')}, '' FROM books WHERE upc = old.upc;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_details_au AFTER UPDATE ON book_details BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, genre, description) SELECT 'delete', id, title, {_SQLITE_GENRE.format(row='books')}, old.description FROM books WHERE upc = old.upc;
+        INSERT INTO {FTS_TABLE}(rowid, title, genre, description) SELECT id, title, {_SQLITE_GENRE.format(row='books')}, new.description FROM books WHERE upc = new.upc;
+    END'''
+]
+
+
+@functools.lru_cache(maxsize=None)
+def sqlite_has_fts5() -> bool:
+    '''Indica se a biblioteca SQLite do processo foi compilada com o FTS5.'''
+    connection = sqlite3.connect(':memory:')
+    try:
+        connection.execute('CREATE VIRTUAL TABLE fts5_check USING fts5(content)')
+        return True
+    except sqlite3.OperationalError:
+        logger.warning('SQLite sem suporte a FTS5: a busca de livros usará LIKE.')
+        return False
+    finally:
+        connection.close()
+
+
+def _is_postgresql(ddl, target, bind, **kw) -> bool:
+    return bind.dialect.name == 'postgresql'
+
+
+def _is_sqlite_with_fts5(ddl, target, bind, **kw) -> bool:
+    return bind.dialect.name == 'sqlite' and sqlite_has_fts5()
+
+
+def register_search_ddl(books: Table, book_details: Table) -> None:
+    '''
+    Cria as estruturas de busca junto com as tabelas books e book_details (db.create_all) e remove
+    a tabela FTS5 e as funções dos triggers junto com elas. Nos bancos existentes, as estruturas
+    são criadas pelas migrações.
+    '''
+    for table, postgres_ddl, sqlite_ddl in ((books, POSTGRES_SEARCH_DDL, SQLITE_SEARCH_DDL), (book_details, POSTGRES_DETAILS_SEARCH_DDL, SQLITE_DETAILS_SEARCH_DDL)):
+        for statement in postgres_ddl:
+            event.listen(table, 'after_create', DDL(statement).execute_if(callable_=_is_postgresql))
+        for statement in sqlite_ddl:
+            event.listen(table, 'after_create', DDL(statement).execute_if(callable_=_is_sqlite_with_fts5))
+    event.listen(books, 'after_drop', DDL(f'DROP TABLE IF EXISTS {FTS_TABLE}').execute_if(callable_=_is_sqlite_with_fts5))
+    for table in ('books', 'book_details'):
+        event.listen(
+            books, 'after_drop',
+            DDL(f'DROP FUNCTION IF EXISTS {table}_{SEARCH_VECTOR_COLUMN}()').execute_if(callable_=_is_postgresql)
+        )
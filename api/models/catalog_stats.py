@@ -0,0 +1,23 @@
+import logging
+from datetime import datetime
+from api.extensions import db
+
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogStats(db.Model):
+    '''
+    Modelo de dados para a tabela catalog_stats (estatísticas do catálogo pré-calculadas).
+
+    Cada linha guarda, em JSON, a resposta de um relatório (e.g., 'overview', 'genres'),
+    recalculada a cada gravação na tabela books (load_utils); os endpoints de estatísticas
+    leem a linha pela chave primária em vez de agregar a tabela books.
+    '''
+    __tablename__ = 'catalog_stats'
+    name                = db.Column(db.String(50), primary_key=True)
+    payload             = db.Column(db.JSON, nullable=False)
+    updated_at          = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CatalogStats {self.name}>'
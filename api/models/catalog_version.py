@@ -0,0 +1,23 @@
+import logging
+from datetime import datetime
+from api.extensions import db
+
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogVersion(db.Model):
+    '''
+    Modelo de dados para a tabela catalog_version (linha única com a versão do catálogo de livros).
+
+    A versão é incrementada a cada gravação na tabela books (load_utils) e permite que estruturas
+    mantidas em memória pelos processos da API (e.g., índice de trigramas) detectem que ficaram
+    desatualizadas com uma única consulta pela chave primária.
+    '''
+    __tablename__ = 'catalog_version'
+    id                  = db.Column(db.Integer, primary_key=True)
+    version             = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at          = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CatalogVersion {self.version}>'
@@ -0,0 +1,18 @@
+import logging
+from api.extensions import db
+
+
+logger = logging.getLogger(__name__)
+
+
+class Genre(db.Model):
+    '''
+    Modelo de dados para a tabela genres: um registro por gênero com livros no catálogo, referenciado
+    por books.genre_id. Preenchida (e limpa dos gêneros sem livros) pelas cargas de load_utils.
+    '''
+    __tablename__ = 'genres'
+    id                 = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    name               = db.Column(db.String(100), nullable=False, unique=True, index=True)
+
+    def __repr__(self):
+        return f'<Genre {self.name}>'
@@ -9,6 +9,11 @@ logger = logging.getLogger(__name__)
 class RefreshTokenManager(db.Model):
     '''Modelo de dados para a tabela refresh_token_manager.'''
     __tablename__ = 'refresh_token_manager'
+    __table_args__ = (
+        #tokens JWT são longos: no Postgres o índice hash evita o limite de tamanho das chaves B-tree
+        db.Index('ix_refresh_token_manager_refresh_token', 'refresh_token', postgresql_using='hash'),
+        db.Index('ix_refresh_token_manager_username_created_at', 'username', 'created_at'),
+    )
     id                      = db.Column(db.Integer, primary_key=True, autoincrement=True)
     username                = db.Column(db.String(80), nullable=False)
     refresh_token           = db.Column(db.Text, nullable=True)
@@ -0,0 +1,30 @@
+import logging
+from datetime import datetime
+from api.extensions import db
+
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapeJob(db.Model):
+    '''Modelo de dados para a tabela scrape_job (execuções do scraping em segundo plano).'''
+    __tablename__ = 'scrape_job'
+    id                  = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    status              = db.Column(db.String(20), nullable=False, default='pending')
+    mode                = db.Column(db.String(20), nullable=False, default='single', server_default='single')
+    categories          = db.Column(db.JSON, nullable=True)
+    categories_total    = db.Column(db.Integer, nullable=False, default=0)
+    categories_done     = db.Column(db.Integer, nullable=False, default=0)
+    pages_done          = db.Column(db.Integer, nullable=False, default=0)
+    books_parsed        = db.Column(db.Integer, nullable=False, default=0)
+    checkpoint_url      = db.Column(db.String(1024), nullable=True)
+    active_seconds      = db.Column(db.Float, nullable=False, default=0.0)
+    error               = db.Column(db.Text, nullable=True)
+    metrics             = db.Column(db.JSON, nullable=True)
+    created_at          = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at          = db.Column(db.DateTime, nullable=True)
+    updated_at          = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at         = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<ScrapeJob {self.id}: {self.status}>'
@@ -0,0 +1,31 @@
+import logging
+from datetime import datetime
+from api.extensions import db
+
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapeTask(db.Model):
+    '''Modelo de dados para a tabela scrape_task (fila de páginas de categoria do scraping distribuído).'''
+    __tablename__ = 'scrape_task'
+    __table_args__ = (
+        db.UniqueConstraint('job_id', 'url', name='uq_scrape_task_job_url'),
+        db.Index('ix_scrape_task_claim', 'job_id', 'status', 'id'),
+    )
+    id                  = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    job_id              = db.Column(db.Integer, db.ForeignKey('scrape_job.id'), nullable=False)
+    kind                = db.Column(db.String(20), nullable=False)
+    genre               = db.Column(db.String(100), nullable=False)
+    url                 = db.Column(db.String(1024), nullable=False)
+    status              = db.Column(db.String(20), nullable=False, default='pending')
+    attempts            = db.Column(db.Integer, nullable=False, default=0)
+    worker              = db.Column(db.String(200), nullable=True)
+    books_found         = db.Column(db.Integer, nullable=True)
+    error               = db.Column(db.Text, nullable=True)
+    created_at          = db.Column(db.DateTime, default=datetime.utcnow)
+    claimed_at          = db.Column(db.DateTime, nullable=True)
+    finished_at         = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<ScrapeTask {self.id}: {self.kind} {self.status}>'
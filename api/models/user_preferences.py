@@ -9,6 +9,9 @@ logger = logging.getLogger(__name__)
 class UserPreferences(db.Model):
     '''Modelo de dados para a tabela user_preferences.'''
     __tablename__ = 'user_preferences'
+    __table_args__ = (
+        db.Index('ix_user_preferences_user_id_similarity_score', 'user_id', 'similarity_score'),
+    )
     id                      = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id                 = db.Column(db.Integer, nullable=True)
     inputed_book_id         = db.Column(db.Integer, nullable=True) 
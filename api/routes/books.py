@@ -1,13 +1,22 @@
 import logging
 from api.extensions import cache
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from api.scripts.books_utils import (
+    iter_all_book_titles,
+    iter_books_by_title_or_category,
     get_all_book_titles, 
     get_book_by_id, 
+    get_books_by_ids,
     get_books_by_title_or_category,
     get_books_by_price_range,
     get_top_rated_books
 )
+from api.scripts.autocomplete_utils import autocomplete_titles
+from api.scripts.facet_utils import faceted_search
+from api.scripts.negotiation_utils import format_cache_key, negotiated_response
+from api.scripts.pagination_utils import PaginationError, get_page_args, page_response
+from api.scripts.serialization_utils import BOOK_FIELDS, FieldsError, get_fields_arg
+from api.scripts.streaming_utils import StreamError, get_stream_arg, is_stream_request, stream_response
 from flask_jwt_extended import jwt_required
 
 
@@ -17,7 +26,7 @@ books_bp = Blueprint('books', __name__)
 
 @books_bp.route('/titles', methods=['GET'])
 @jwt_required()
-@cache.cached(timeout=3600)
+@cache.cached(timeout=3600, make_cache_key=format_cache_key, unless=is_stream_request)
 def titles():
     '''
     Retorna lista com todos os títulos de livros cadastrados 
@@ -26,10 +35,39 @@ def titles():
         - Books
     summary: Listagem de títulos de livros cadastrados.
     description: |
-        Endpoint responsável por retornar títulos de livros cadastrados.
+        Endpoint responsável por retornar títulos de livros cadastrados, em ordem alfabética e paginados por cursor.
+        Quando há próxima página, o cursor vem no cabeçalho X-Next-Cursor (e a URL no cabeçalho Link).
+    produces:
+        - application/json
+        - application/vnd.columnar+json
+        - application/msgpack
+    parameters:
+        - in: query
+          name: limit
+          type: integer
+          required: false
+          description: Tamanho da página (até PAGINATION_MAX_LIMIT, padrão 1000). Sem limit e sem cursor, a listagem é retornada inteira; com cursor e sem limit, vale PAGINATION_DEFAULT_LIMIT (padrão 100).
+        - in: query
+          name: cursor
+          type: string
+          required: false
+          description: Cursor opaco da próxima página, recebido no cabeçalho X-Next-Cursor da página anterior.
+        - in: query
+          name: stream
+          type: string
+          required: false
+          enum: [json, ndjson]
+          description: Modo streaming (também ativado por Accept application/x-ndjson). Retorna todos os títulos, sem paginação, como um array JSON (json) ou um objeto por linha (ndjson), emitidos à medida que são lidos do banco.
     responses:
         200:
             description: Listagem de títulos de livros cadastrados.
+            headers:
+                X-Next-Cursor:
+                    type: string
+                    description: Cursor da próxima página (ausente na última página).
+                Link:
+                    type: string
+                    description: URL da próxima página (rel="next").
             schema:
                 type: array
                 items:
@@ -39,6 +77,17 @@ def titles():
                 application/json:
                     - title: '10-Day Green Smoothie Cleanse: Lose Up to 15 Pounds in 10 Days!'
                     - title: '13 Hours: The Inside Account of What Really Happened In Benghazi'
+        400:
+            description: Parâmetros de paginação inválidos.
+            schema:
+                type: object
+                properties:
+                    msg:
+                        type: string
+                        description: Mensagem de erro para requisição inválida.
+            examples:
+                application/json:
+                    msg: 'O parâmetro cursor é inválido.'
         401:
             description: Erro de autenticação JWT.
             schema:
@@ -63,10 +112,100 @@ def titles():
                     error: '<erro interno do servidor>'
     '''
     try:
-        titles = get_all_book_titles()
-        if titles:
-            return jsonify(titles), 200
+        stream_format = get_stream_arg()
+        if stream_format:
+            return stream_response(iter_all_book_titles(), stream_format)
+        limit, cursor = get_page_args()
+        titles = get_all_book_titles(limit=limit, cursor=cursor)
+        if titles or cursor:
+            return page_response(titles)
         return jsonify({'msg': 'Não há livros cadastrados'}), 200
+    except (PaginationError, StreamError) as e:
+        return jsonify({'msg': str(e)}), 400
+    except Exception as e:
+        logger.error(f'error: {e}')
+        return jsonify({'error': str(e)}), 500
+
+
+@books_bp.route('/autocomplete', methods=['GET'])
+@jwt_required()
+def autocomplete():
+    '''
+    Retorna sugestões de títulos para o texto digitado (autocompletar)
+    ---
+    tags:
+        - Books
+    summary: Sugestões de títulos por prefixo.
+    description: |
+        Endpoint responsável por sugerir títulos que começam pelo texto informado ou que têm uma palavra iniciada por ele.
+        A comparação ignora maiúsculas, acentos e pontuação. As sugestões são respondidas por um índice de prefixos em memória,
+        reconstruído quando o catálogo muda.
+    parameters:
+        - in: query
+          name: q
+          type: string
+          required: true
+          description: Texto digitado.
+        - in: query
+          name: limit
+          type: integer
+          required: false
+          default: 10
+          description: Número máximo de sugestões (até AUTOCOMPLETE_MAX_LIMIT, padrão 50).
+    responses:
+        200:
+            description: Lista de títulos sugeridos (vazia se não houver sugestões).
+            schema:
+                type: array
+                items:
+                    type: string
+            examples:
+                application/json:
+                    - 'The Secret Garden'
+                    - 'The Secret of Dreadwillow Carse'
+        400:
+            description: Parâmetros inválidos.
+            schema:
+                type: object
+                properties:
+                    msg:
+                        type: string
+                        description: Mensagem de erro para requisição inválida.
+            examples:
+                application/json:
+                    msg: 'Forneça o parâmetro q para a consulta.'
+        401:
+            description: Erro de autenticação JWT.
+            schema:
+                type: object
+                properties:
+                    error:
+                        type: string
+                        description: Mensagem de erro de autenticação.
+            examples:
+                application/json:
+                    error: '<erro de autenticação>'
+        500:
+            description: Erro interno do servidor.
+            schema:
+                type: object
+                properties:
+                    error:
+                        type: string
+                        description: Mensagem de erro interno do servidor.
+            examples:
+                application/json:
+                    error: '<erro interno do servidor>'
+    '''
+    try:
+        prefix = request.args.get('q', '').strip()
+        limit = request.args.get('limit', default=10, type=int)
+        max_limit = current_app.config['AUTOCOMPLETE_MAX_LIMIT']
+        if not prefix:
+            return jsonify({'msg': 'Forneça o parâmetro q para a consulta.'}), 400
+        if limit is None or not 1 <= limit <= max_limit:
+            return jsonify({'msg': f'O parâmetro limit deve ser um inteiro entre 1 e {max_limit}.'}), 400
+        return jsonify(autocomplete_titles(prefix, limit)), 200
     except Exception as e:
         logger.error(f'error: {e}')
         return jsonify({'error': str(e)}), 500
@@ -74,7 +213,7 @@ def titles():
 
 @books_bp.route('details/<string:id>', methods=['GET'])
 @jwt_required()
-@cache.memoize(timeout=3600)
+@cache.cached(timeout=3600, query_string=True)
 def details(id):
     '''
     Retorna detalhes de um livro conforme id fornecido
@@ -90,6 +229,11 @@ def details(id):
           type: integer
           required: true
           description: O id do livro.
+        - in: query
+          name: fields
+          type: string
+          required: false
+          description: Campos retornados, separados por vírgula (e.g., id,title,price,image_url), entre os campos listados abaixo. Só essas colunas são lidas do banco (book_details apenas se algum campo estiver nela). Padrão são todos.
     responses:
         200:
             description: Detalhes de um livro conforme código fornecido.
@@ -198,18 +342,139 @@ def details(id):
                     error: '<erro interno do servidor>'
     '''
     try:
-        book_details = get_book_by_id(id)
+        book_details = get_book_by_id(id, fields=get_fields_arg(BOOK_FIELDS))
         if book_details:
             return jsonify(book_details), 200
         return jsonify({'msg': f'Livro com id {id} não encontrado'}), 404
+    except FieldsError as e:
+        return jsonify({'msg': str(e)}), 400
     except Exception as e:
         logger.error(f'error: {e}')
         return jsonify({'error': str(e)}), 500
     
 
+@books_bp.route('/details', methods=['GET'])
+@jwt_required()
+@cache.cached(timeout=3600, make_cache_key=format_cache_key)
+def details_batch():
+    '''
+    Retorna detalhes de vários livros conforme ids fornecidos
+    ---
+    tags:
+        - Books
+    summary: Detalhes de vários livros em uma requisição.
+    description: |
+        Endpoint responsável por retornar os detalhes de vários livros de uma vez (e.g., uma lista de recomendações), em vez de uma
+        chamada a /details/<id> por livro. Os ids são informados separados por vírgula (?ids=1,2,3) ou repetidos (?ids=1&ids=2)
+        e resolvidos com uma única consulta. Os livros vêm na ordem dos ids informados (repetições são ignoradas) e os ids não
+        encontrados são listados em missing. O número de ids é limitado por BOOKS_BATCH_MAX_IDS (padrão 100).
+    produces:
+        - application/json
+        - application/vnd.columnar+json
+        - application/msgpack
+    parameters:
+        - in: query
+          name: ids
+          type: string
+          required: true
+          description: Os ids dos livros, separados por vírgula.
+        - in: query
+          name: fields
+          type: string
+          required: false
+          description: Campos retornados, separados por vírgula (e.g., id,title,price,image_url), entre os campos listados abaixo. Só essas colunas são lidas do banco (book_details apenas se algum campo estiver nela). Padrão são todos.
+    responses:
+        200:
+            description: Detalhes dos livros encontrados e ids não encontrados.
+            schema:
+                type: object
+                properties:
+                    books:
+                        type: array
+                        description: Detalhes dos livros encontrados, na ordem dos ids (mesmos campos de /details/<id>).
+                        items:
+                            type: object
+                    missing:
+                        type: array
+                        description: Ids não encontrados.
+                        items:
+                            type: integer
+            examples:
+                application/json:
+                    books:
+                        - id: 1
+                          upc: 'a22124811bfa8350'
+                          title: "It's Only the Himalayas"
+                          genre: 'Travel'
+                          price: 45.17
+                          availability: 19
+                          rating: 'Two'
+                          description: 'A description...'
+                          product_type: 'Books'
+                          price_excl_tax: 45.17
+                          price_incl_tax: 45.17
+                          tax: 0.0
+                          number_of_reviews: 0
+                          url: 'http://books.toscrape.com/catalogue/its-only-the-himalayas_981/index.html'
+                          image_url: 'http://books.toscrape.com/media/cache/6d/41/6d418a73cc7d4ecfd75ca11d854041db.jpg'
+                    missing: [99999]
+        400:
+            description: Ids ausentes, inválidos ou acima do limite.
+            schema:
+                type: object
+                properties:
+                    msg:
+                        type: string
+                        description: Mensagem de erro de validação.
+            examples:
+                application/json:
+                    msg: 'Os ids devem ser números inteiros.'
+        401:
+            description: Erro de autenticação JWT.
+            schema:
+                type: object
+                properties:
+                    error:
+                        type: string
+                        description: Mensagem de erro de autenticação.
+            examples:
+                application/json:
+                    error: '<erro de autenticação>'
+        500:
+            description: Erro interno do servidor.
+            schema:
+                type: object
+                properties:
+                    error:
+                        type: string
+                        description: Mensagem de erro interno do servidor.
+            examples:
+                application/json:
+                    error: '<erro interno do servidor>'
+    '''
+    try:
+        values = [value.strip() for param in request.args.getlist('ids') for value in param.split(',') if value.strip()]
+        max_ids = current_app.config['BOOKS_BATCH_MAX_IDS']
+        if not values:
+            return jsonify({'msg': 'Forneça o parâmetro ids para a consulta.'}), 400
+        if not all(value.isdigit() for value in values):
+            return jsonify({'msg': 'Os ids devem ser números inteiros.'}), 400
+        if len(values) > max_ids:
+            return jsonify({'msg': f'Informe no máximo {max_ids} ids por consulta.'}), 400
+        result = get_books_by_ids([int(value) for value in values], fields=get_fields_arg(BOOK_FIELDS))
+        if result is None:
+            return jsonify({'error': 'Erro ao buscar livros.'}), 500
+        return negotiated_response(result)
+    except FieldsError as e:
+        return jsonify({'msg': str(e)}), 400
+    except Exception as e:
+        logger.error(f'error: {e}')
+        return jsonify({'error': str(e)}), 500
+
+
 @books_bp.route('/search', methods=['GET'])
 @jwt_required()
-@cache.memoize(timeout=3600)
+@cache.cached(timeout=3600, make_cache_key=format_cache_key, unless=is_stream_request)
 def search():
     '''
     Retorna livros por título e/ou gênero conforme parâmetros fornecidos
@@ -219,6 +484,13 @@ def search():
     summary: Listagem de livros por título e/ou categoria.
     description: |
         Endpoint responsável por retornar lista com informações de livros conforme parâmetros fornecidos. 
+        A busca usa o índice de texto completo: cada palavra é buscada como prefixo e os resultados são ordenados por relevância (rank).
+        Se nada for encontrado, o título é buscado por similaridade de trigramas, tolerando erros de digitação (rank entre 0 e 1).
+        Os resultados são paginados por cursor; quando há próxima página, o cursor vem no cabeçalho X-Next-Cursor.
+    produces:
+        - application/json
+        - application/vnd.columnar+json
+        - application/msgpack
     parameters:
         - in: query
           name: title
@@ -230,9 +502,37 @@ def search():
           type: string
           required: false
           description: Gênero.
+        - in: query
+          name: limit
+          type: integer
+          required: false
+          description: Tamanho da página (até PAGINATION_MAX_LIMIT, padrão 1000). Sem limit e sem cursor, a listagem é retornada inteira; com cursor e sem limit, vale PAGINATION_DEFAULT_LIMIT (padrão 100).
+        - in: query
+          name: cursor
+          type: string
+          required: false
+          description: Cursor opaco da próxima página, recebido no cabeçalho X-Next-Cursor da página anterior.
+        - in: query
+          name: fields
+          type: string
+          required: false
+          description: Campos retornados de cada livro, separados por vírgula (e.g., id,title,price,image_url), entre id, upc, title, genre, price, availability, rating, number_of_reviews e image_url. Só essas colunas são lidas do banco. Padrão são os campos listados abaixo.
+        - in: query
+          name: stream
+          type: string
+          required: false
+          enum: [json, ndjson]
+          description: Modo streaming (também ativado por Accept application/x-ndjson). Retorna todos os resultados, sem paginação, como um array JSON (json) ou um objeto por linha (ndjson), emitidos à medida que são lidos do banco.
     responses:
         200:
             description: Listagem de livros por título e/ou gênero.
+            headers:
+                X-Next-Cursor:
+                    type: string
+                    description: Cursor da próxima página (ausente na última página).
+                Link:
+                    type: string
+                    description: URL da próxima página (rel="next").
             schema:
                 type: array
                 items:
@@ -257,6 +557,10 @@ def search():
                         image_url:
                             type: string
                             description: URL da imagem do livro.
+                        rank:
+                            type: number
+                            format: float
+                            description: Relevância do livro para a busca (maior é melhor).
             examples:
                 application/json: 
                     - id: 43
@@ -265,12 +569,14 @@ def search():
                       genre: 'Mystery'
                       price: 53.98
                       image_url: 'http://books.toscrape.com/media/cache/f6/8e/f68e6ae2f9da04fccbde8442b0a1b52a.jpg'
+                      rank: 4.851032
                     - id: 15
                       upc: 'f733e8c19d40ec2e'
                       title: 'A Murder in Time'
                       genre: 'Mystery'
                       price: 16.64
                       image_url: 'http://books.toscrape.com/media/cache/cc/bd/ccbd7a62caefd5a3a2e04dd7c2ff48fe.jpg'
+                      rank: 4.851032
         400:
             description: Parâmetros ausentes.
             schema:
@@ -321,10 +627,239 @@ def search():
         genre = request.args.get('genre')
         if not title and not genre:
             return jsonify({'msg': 'Forneça o parâmetro title e/ou genre para a consulta.'}), 400
-        books = get_books_by_title_or_category(title=title, genre=genre)
-        if books:
-            return jsonify(books), 200
+        fields, stream_format = get_fields_arg(), get_stream_arg()
+        if stream_format:
+            return stream_response(iter_books_by_title_or_category(title=title, genre=genre, fields=fields), stream_format)
+        limit, cursor = get_page_args()
+        books = get_books_by_title_or_category(title=title, genre=genre, limit=limit, cursor=cursor, fields=fields)
+        if books or cursor:
+            return page_response(books)
         return jsonify({'msg': 'Nenhum livro encontrado com os parâmetros fornecidos'}), 404
+    except (PaginationError, FieldsError, StreamError) as e:
+        return jsonify({'msg': str(e)}), 400
+    except Exception as e:
+        logger.error(f'error: {e}')
+        return jsonify({'error': str(e)}), 500
+    
+
+@books_bp.route('/facets', methods=['GET'])
+@jwt_required()
+@cache.cached(timeout=3600, make_cache_key=format_cache_key)
+def facets():
+    '''
+    Retorna livros e contagens por faceta (gênero, avaliação e faixa de preço) conforme filtros combinados
+    ---
+    tags:
+        - Books
+    summary: Busca facetada de livros.
+    description: |
+        Endpoint responsável por combinar os filtros de título, gênero, faixa de preço e avaliação mínima, retornando uma página de resultados,
+        o total de livros encontrados e as contagens por gênero, avaliação e faixa de preço para os mesmos filtros.
+        O título é buscado no índice de texto completo (como em /search) e, quando informado, os resultados são ordenados por relevância (rank);
+        caso contrário, por título. As contagens vêm de uma única consulta agregada. Os resultados são paginados por cursor;
+        quando há próxima página, o cursor vem no cabeçalho X-Next-Cursor.
+    produces:
+        - application/json
+        - application/vnd.columnar+json
+        - application/msgpack
+    parameters:
+        - in: query
+          name: title
+          type: string
+          required: false
+          description: Título.
+        - in: query
+          name: genre
+          type: array
+          items:
+              type: string
+          collectionFormat: multi
+          required: false
+          description: Gênero (correspondência exata; pode ser repetido para aceitar vários gêneros).
+        - in: query
+          name: min_price
+          type: number
+          required: false
+          description: Preço mínimo.
+        - in: query
+          name: max_price
+          type: number
+          required: false
+          description: Preço máximo.
+        - in: query
+          name: min_rating
+          type: integer
+          required: false
+          description: Avaliação mínima, de 1 (One) a 5 (Five).
+        - in: query
+          name: limit
+          type: integer
+          required: false
+          description: Tamanho da página (até PAGINATION_MAX_LIMIT, padrão 1000). Sem limit e sem cursor, a listagem é retornada inteira; com cursor e sem limit, vale PAGINATION_DEFAULT_LIMIT (padrão 100).
+        - in: query
+          name: cursor
+          type: string
+          required: false
+          description: Cursor opaco da próxima página, recebido no cabeçalho X-Next-Cursor da página anterior.
+        - in: query
+          name: fields
+          type: string
+          required: false
+          description: Campos retornados de cada livro, separados por vírgula (e.g., id,title,price,image_url), entre id, upc, title, genre, price, availability, rating, number_of_reviews e image_url. Só essas colunas são lidas do banco. Padrão são os campos listados abaixo.
+    responses:
+        200:
+            description: Página de resultados e contagens por faceta.
+            headers:
+                X-Next-Cursor:
+                    type: string
+                    description: Cursor da próxima página (ausente na última página).
+                Link:
+                    type: string
+                    description: URL da próxima página (rel="next").
+            schema:
+                type: object
+                properties:
+                    total:
+                        type: integer
+                        description: Quantidade de livros que atendem aos filtros.
+                    results:
+                        type: array
+                        items:
+                            type: object
+                            properties:
+                                id:
+                                    type: integer
+                                upc:
+                                    type: string
+                                title:
+                                    type: string
+                                genre:
+                                    type: string
+                                price:
+                                    type: number
+                                    format: float
+                                rating:
+                                    type: string
+                                image_url:
+                                    type: string
+                                rank:
+                                    type: number
+                                    format: float
+                                    description: Relevância para o título buscado (apenas quando title é informado).
+                    facets:
+                        type: object
+                        properties:
+                            genre:
+                                type: array
+                                items:
+                                    type: object
+                                    properties:
+                                        value:
+                                            type: string
+                                        count:
+                                            type: integer
+                            rating:
+                                type: array
+                                items:
+                                    type: object
+                                    properties:
+                                        value:
+                                            type: string
+                                        count:
+                                            type: integer
+                            price:
+                                type: array
+                                items:
+                                    type: object
+                                    properties:
+                                        min:
+                                            type: number
+                                            description: Limite inferior (inclusivo) da faixa; nulo na primeira.
+                                        max:
+                                            type: number
+                                            description: Limite superior (exclusivo) da faixa; nulo na última.
+                                        count:
+                                            type: integer
+            examples:
+                application/json:
+                    total: 2
+                    results:
+                        - id: 43
+                          upc: 'f684a82adc49f011'
+                          title: 'A Murder in Time'
+                          genre: 'Mystery'
+                          price: 53.98
+                          rating: 'One'
+                          image_url: 'http://books.toscrape.com/media/cache/f6/8e/f68e6ae2f9da04fccbde8442b0a1b52a.jpg'
+                          rank: 4.851032
+                    facets:
+                        genre:
+                            - value: 'Mystery'
+                              count: 2
+                        rating:
+                            - value: 'Four'
+                              count: 1
+                            - value: 'One'
+                              count: 1
+                        price:
+                            - min: null
+                              max: 10.0
+                              count: 0
+                            - min: 10.0
+                              max: 20.0
+                              count: 1
+        400:
+            description: Parâmetros inválidos.
+            schema:
+                type: object
+                properties:
+                    msg:
+                        type: string
+                        description: Mensagem de erro para requisição inválida.
+            examples:
+                application/json:
+                    msg: 'O parâmetro min_rating deve ser um inteiro entre 1 e 5.'
+        401:
+            description: Erro de autenticação JWT.
+            schema:
+                type: object
+                properties:
+                    error:
+                        type: string
+                        description: Mensagem de erro de autenticação.
+            examples:
+                application/json:
+                    error: '<erro de autenticação>'
+        500:
+            description: Erro interno do servidor.
+            schema:
+                type: object
+                properties:
+                    error:
+                        type: string
+                        description: Mensagem de erro interno do servidor.
+            examples:
+                application/json:
+                    error: '<erro interno do servidor>'
+    '''
+    try:
+        min_rating = request.args.get('min_rating', type=int)
+        if min_rating is not None and not 1 <= min_rating <= 5:
+            return jsonify({'msg': 'O parâmetro min_rating deve ser um inteiro entre 1 e 5.'}), 400
+        limit, cursor = get_page_args()
+        result = faceted_search(
+            title=request.args.get('title'),
+            genres=request.args.getlist('genre'),
+            min_price=request.args.get('min_price', type=float),
+            max_price=request.args.get('max_price', type=float),
+            min_rating=min_rating,
+            limit=limit,
+            cursor=cursor,
+            fields=get_fields_arg()
+        )
+        return page_response(result, result['results'].next_cursor)
+    except (PaginationError, FieldsError) as e:
+        return jsonify({'msg': str(e)}), 400
     except Exception as e:
         logger.error(f'error: {e}')
         return jsonify({'error': str(e)}), 500
@@ -332,7 +867,7 @@ def search():
 
 @books_bp.route('/price-range', methods=['GET'])
 @jwt_required()
-@cache.memoize(timeout=3600)
+@cache.cached(timeout=3600, make_cache_key=format_cache_key)
 def price_range(): 
     '''
     Retorna livros conforme faixa de preço especificada
@@ -341,7 +876,12 @@ def price_range():
         - Books
     summary: Listagem de informações de livros conforme faixa de preço especificada.
     description: |
-        Endpoint responsável por retornar lista com informações de livros conforme faixa de preço especificada.
+        Endpoint responsável por retornar lista com informações de livros conforme faixa de preço especificada, do mais barato ao mais caro.
+        Os resultados são paginados por cursor; quando há próxima página, o cursor vem no cabeçalho X-Next-Cursor.
+    produces:
+        - application/json
+        - application/vnd.columnar+json
+        - application/msgpack
     parameters:
         - in: query
           name: min
@@ -353,9 +893,31 @@ def price_range():
           type: number
           required: true
           description: Preço máximo.
+        - in: query
+          name: limit
+          type: integer
+          required: false
+          description: Tamanho da página (até PAGINATION_MAX_LIMIT, padrão 1000). Sem limit e sem cursor, a listagem é retornada inteira; com cursor e sem limit, vale PAGINATION_DEFAULT_LIMIT (padrão 100).
+        - in: query
+          name: cursor
+          type: string
+          required: false
+          description: Cursor opaco da próxima página, recebido no cabeçalho X-Next-Cursor da página anterior.
+        - in: query
+          name: fields
+          type: string
+          required: false
+          description: Campos retornados de cada livro, separados por vírgula (e.g., id,title,price,image_url), entre id, upc, title, genre, price, availability, rating, number_of_reviews e image_url. Só essas colunas são lidas do banco. Padrão são os campos listados abaixo.
     responses:
         200:
             description: Listagem de informações de livros conforme faixa de preço especificada.
+            headers:
+                X-Next-Cursor:
+                    type: string
+                    description: Cursor da próxima página (ausente na última página).
+                Link:
+                    type: string
+                    description: URL da próxima página (rel="next").
             schema:
                 type: array
                 items:
@@ -445,10 +1007,13 @@ def price_range():
         max_price = request.args.get('max', type=float)
         if min_price is None or max_price is None:
             return jsonify({'msg': 'Os parâmetros min e max são obrigatórios.'}), 400
-        books = get_books_by_price_range(min_price=min_price, max_price=max_price)
-        if books:
-            return jsonify(books), 200
+        limit, cursor = get_page_args()
+        books = get_books_by_price_range(min_price=min_price, max_price=max_price, limit=limit, cursor=cursor, fields=get_fields_arg())
+        if books or cursor:
+            return page_response(books)
         return jsonify({'msg': 'Nenhum livro encontrado na faixa de preço informada.'}), 404
+    except (PaginationError, FieldsError) as e:
+        return jsonify({'msg': str(e)}), 400
     except Exception as e:
         logger.error(f'error: {e}')
         return jsonify({'error': str(e)}), 500
@@ -456,7 +1021,7 @@ def price_range():
 
 @books_bp.route('/top-rated', methods=['GET'])
 @jwt_required()
-@cache.cached(timeout=3600)
+@cache.cached(timeout=3600, make_cache_key=format_cache_key)
 def top_rated():
     '''
     Retorna lista dos livros com melhor avaliação
@@ -466,12 +1031,21 @@ def top_rated():
     summary: Listagem de informações de livros ordenados por avaliação.
     description: |
         Endpoint responsável por retornar lista com informações de livros ordenada por avaliação.
+    produces:
+        - application/json
+        - application/vnd.columnar+json
+        - application/msgpack
     parameters:
         - in: query
           name: limit
           type: integer
           required: false
           description: Número máximo de livros a retornar.
+        - in: query
+          name: fields
+          type: string
+          required: false
+          description: Campos retornados de cada livro, separados por vírgula (e.g., id,title,price,image_url), entre id, upc, title, genre, price, availability, rating, number_of_reviews e image_url. Só essas colunas são lidas do banco. Padrão são os campos listados abaixo.
     responses:
         200:
             description: Listagem de informações de livros ordenados por avaliação.
@@ -554,10 +1128,12 @@ def top_rated():
     '''
     try:
         limit = request.args.get('limit', default=10, type=int)
-        books = get_top_rated_books(limit=limit)
+        books = get_top_rated_books(limit=limit, fields=get_fields_arg())
         if books:
-            return jsonify(books), 200
+            return negotiated_response(books)
         return jsonify({'msg': 'Nenhum livro encontrado'}), 404
+    except FieldsError as e:
+        return jsonify({'msg': str(e)}), 400
     except Exception as e:
         logger.error(f'error: {e}')
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
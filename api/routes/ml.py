@@ -3,12 +3,19 @@ import pandas as pd
 import joblib
 import os
 from flask import Blueprint, jsonify, request
+from api.models.book_details import BookDetails
 from api.models.books import Books
 from api.models.user_preferences import UserPreferences
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
 from api.extensions import db, cache
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import linear_kernel
 from api.scripts.ml_utils import tokenizer, recommender
+from api.scripts.fuzzy_utils import get_candidates_index, resolve_title
+from api.scripts.negotiation_utils import format_cache_key, negotiated_response
+from api.scripts.pagination_utils import PaginationError, decode_cursor, get_page_args, page_response, paginate
+from api.scripts.streaming_utils import StreamError, get_stream_arg, iter_rows, stream_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 
@@ -30,13 +37,45 @@ def features():
         - ML
     summary: Listagem de features de treinamento para recomendação de livros
     description: |
-        Endpoint responsável por retornar features para treinamento.
+        Endpoint responsável por retornar features para treinamento, em ordem de id e paginadas por cursor.
+        Quando há próxima página, o cursor vem no cabeçalho X-Next-Cursor (e a URL no cabeçalho Link).
+    produces:
+        - application/json
+        - application/vnd.columnar+json
+        - application/msgpack
+    parameters:
+        - in: query
+          name: limit
+          type: integer
+          required: false
+          description: Tamanho da página (até PAGINATION_MAX_LIMIT, padrão 1000). Sem limit e sem cursor, a listagem é retornada inteira; com cursor e sem limit, vale PAGINATION_DEFAULT_LIMIT (padrão 100).
+        - in: query
+          name: cursor
+          type: string
+          required: false
+          description: Cursor opaco da próxima página, recebido no cabeçalho X-Next-Cursor da página anterior.
+        - in: query
+          name: stream
+          type: string
+          required: false
+          enum: [json, ndjson]
+          description: Modo streaming (também ativado por Accept application/x-ndjson). Retorna todas as features, sem paginação, como um array JSON (json) ou um objeto por linha (ndjson) com id, title e description, emitidos à medida que são lidos do banco.
     responses:
         200:
             description: Listagem de features de treinamento para recomendação de livros
+            headers:
+                X-Next-Cursor:
+                    type: string
+                    description: Cursor da próxima página (ausente na última página).
+                Link:
+                    type: string
+                    description: URL da próxima página (rel="next").
             schema:
                 type: object
                 properties:
+                    total_records:
+                        type: integer
+                        description: Número de registros da página.
                     features:
                         type: array
                         items:
@@ -60,6 +99,17 @@ def features():
                         - id: 2
                           title: "Full Moon over Noah’s Ark: An Odyssey to Mount Ararat and Beyond"
                           description: "acclaimed travel writer rick antonson sets adventurous compass..."
+        400:
+            description: Parâmetros de paginação inválidos.
+            schema:
+                type: object
+                properties:
+                    msg:
+                        type: string
+                        description: Mensagem de erro para requisição inválida.
+            examples:
+                application/json:
+                    msg: 'O parâmetro cursor é inválido.'
         401:
             description: Erro de autenticação JWT.
             schema:
@@ -84,7 +134,27 @@ def features():
                     error: '<erro interno do servidor>'
     '''
     try:
-        query = db.session.execute(db.select(Books)).scalars().all()
+        stream_format = get_stream_arg()
+        if stream_format:
+            #só as colunas das features, lidas em lotes
+            statement = (
+                db.select(Books.id, Books.title, BookDetails.description)
+                .outerjoin(BookDetails, BookDetails.upc == Books.upc)
+                .order_by(Books.id.asc())
+            )
+            rows = (
+                {'id': row.id, 'title': row.title, 'description': tokenizer(row.description) if row.description else ""}
+                for row in iter_rows(statement)
+            )
+            return stream_response(rows, stream_format)
+        limit, cursor = get_page_args()
+        #a descrição está em book_details: carregada no mesmo SELECT, sem uma consulta por livro
+        statement = db.select(Books).options(joinedload(Books.details))
+        if cursor:
+            statement = statement.where(Books.id > decode_cursor(cursor, (int,))[0])
+        statement = statement.order_by(Books.id.asc())
+        statement = statement.limit(limit + 1) if limit else statement
+        query = paginate(db.session.execute(statement).scalars().all(), limit, lambda book: (book.id,))
         data = [
             {
                 'id': book.id, 
@@ -93,10 +163,12 @@ def features():
             } 
             for book in query
         ]
-        return jsonify({
+        return page_response({
             'total_records': len(data),
             'features': data
-        }), 200
+        }, query.next_cursor)
+    except (PaginationError, StreamError) as e:
+        return jsonify({'msg': str(e)}), 400
     except Exception as e:
         logger.error(f'Erro ao recuperar features: {e}')
         return jsonify({'error': str(e)}), 500
@@ -177,7 +249,7 @@ def training_data():
                     error: '<erro interno do servidor>'
     '''
     try:
-        query = db.session.execute(db.select(Books)).scalars().all()
+        query = db.session.execute(db.select(Books).options(joinedload(Books.details))).scalars().all()
         data = [{'id': book.id, 'title': book.title, 'description': book.description} for book in query]
         df = pd.DataFrame(data)
         
@@ -212,9 +284,9 @@ def training_data():
         return jsonify({'error': str(e)}), 500
 
 
+#sem cache: cada chamada grava as preferências do usuário autenticado
 @ml_bp.route('/predictions', methods=['GET'])
 @jwt_required()
-@cache.memoize(timeout=3600)
 def predictions():
     '''
     Retorna lista com os 10 livros mais similares ao título especificado
@@ -224,6 +296,11 @@ def predictions():
     summary: Listagem de livros mais similares.
     description: |
         Endpoint responsável por retornar os 10 livros mais similares ao título especificado.
+        Títulos com pequenos erros de digitação são resolvidos para o título mais parecido (similaridade de trigramas).
+    produces:
+        - application/json
+        - application/vnd.columnar+json
+        - application/msgpack
     parameters:
         - name: body
           in: body
@@ -293,6 +370,11 @@ def predictions():
     try:
         cosine_sim = joblib.load(COSINE_SIM_PATH)
         idx = joblib.load(IDX_PATH)
+        #títulos com erros de digitação são resolvidos para o título mais parecido entre os conhecidos pelo modelo;
+        #o índice dos títulos só é reconstruído quando o modelo é treinado novamente
+        model_stat = os.stat(IDX_PATH)
+        titles_index = get_candidates_index('Índice de trigramas dos títulos do modelo', (model_stat.st_mtime_ns, model_stat.st_size), lambda: idx.index)
+        title = resolve_title(title, titles_index) or title
         
         query = db.session.execute(db.select(Books)).scalars().all()
         df = pd.DataFrame([book.__dict__ for book in query])
@@ -322,7 +404,7 @@ def predictions():
                 preferences.append(preference)
             db.session.commit()
 
-            return jsonify(recommendations), 200
+            return negotiated_response(recommendations)
 
         except Exception as e:
             db.session.rollback()
@@ -336,7 +418,7 @@ def predictions():
 
 @ml_bp.route('/user-preferences/<int:user_id>', methods=['GET'])
 @jwt_required()
-@cache.memoize(timeout=3600)
+@cache.cached(timeout=3600, make_cache_key=format_cache_key)
 def user_preferences(user_id):
     '''
     Retorna lista com recomendações do usuário especificado
@@ -345,16 +427,38 @@ def user_preferences(user_id):
         - ML
     summary: Listagem de recomendações para o usuário especificado.
     description: |
-        Endpoint responsável por retornar as recomendações para o usuário especificado.
+        Endpoint responsável por retornar as recomendações para o usuário especificado, da maior para a menor similaridade.
+        Os resultados são paginados por cursor; quando há próxima página, o cursor vem no cabeçalho X-Next-Cursor.
+    produces:
+        - application/json
+        - application/vnd.columnar+json
+        - application/msgpack
     parameters:
         - name: user_id
           in: path
           type: integer
           required: true
           description: ID do usuário.
+        - in: query
+          name: limit
+          type: integer
+          required: false
+          description: Tamanho da página (até PAGINATION_MAX_LIMIT, padrão 1000). Sem limit e sem cursor, a listagem é retornada inteira; com cursor e sem limit, vale PAGINATION_DEFAULT_LIMIT (padrão 100).
+        - in: query
+          name: cursor
+          type: string
+          required: false
+          description: Cursor opaco da próxima página, recebido no cabeçalho X-Next-Cursor da página anterior.
     responses:
         200:
             description: Listagem de recomendações para o usuário especificado.
+            headers:
+                X-Next-Cursor:
+                    type: string
+                    description: Cursor da próxima página (ausente na última página).
+                Link:
+                    type: string
+                    description: URL da próxima página (rel="next").
             schema:
                 type: array
                 items:
@@ -404,6 +508,17 @@ def user_preferences(user_id):
             examples:
                 application/json:
                     msg: 'Não há histórico de predições para o usuário id 1.'
+        400:
+            description: Parâmetros de paginação inválidos.
+            schema:
+                type: object
+                properties:
+                    msg:
+                        type: string
+                        description: Mensagem de erro para requisição inválida.
+            examples:
+                application/json:
+                    msg: 'O parâmetro cursor é inválido.'
         401:
             description: Erro de autenticação JWT.
             schema:
@@ -424,14 +539,22 @@ def user_preferences(user_id):
                         type: string
     '''
     try:
+        limit, cursor = get_page_args()
+        filters = [UserPreferences.user_id == user_id]
+        if cursor:
+            #chave (similarity_score, id), ambos decrescentes: a ordem do índice ix_user_preferences_user_id_similarity_score
+            score, preference_id = decode_cursor(cursor, (float, int))
+            filters += [UserPreferences.similarity_score <= score, or_(UserPreferences.similarity_score < score, UserPreferences.id < preference_id)]
         query = db.session.query(UserPreferences, Books).join(
             Books, UserPreferences.recommended_book_id == Books.id
         ).filter(
-            UserPreferences.user_id == user_id
+            *filters
         ).order_by(
-            UserPreferences.similarity_score.desc()
-        ).all()
-        if not query:
+            UserPreferences.similarity_score.desc(), UserPreferences.id.desc()
+        )
+        query = (query.limit(limit + 1) if limit else query).all()
+        query = paginate(query, limit, lambda row: (row[0].similarity_score, row[0].id))
+        if not query and not cursor:
             return jsonify({'msg': f'Não há histórico de predições para o usuário id {user_id}.'}), 404
         results = []
         for pref, book in query:
@@ -443,7 +566,9 @@ def user_preferences(user_id):
                 'image_url': book.image_url,
                 'similarity_score': pref.similarity_score,
             })
-        return jsonify(results), 200
+        return page_response(results, query.next_cursor)
+    except PaginationError as e:
+        return jsonify({'msg': str(e)}), 400
     except Exception as e:
         logger.error(f'error: {e}')
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -1,9 +1,11 @@
 import logging
-from flask import Blueprint, jsonify
-from api.models.books import Books
+from flask import Blueprint, jsonify, current_app
 from api.extensions import db
-from sqlalchemy import text 
-from api.scripts.scrape_utils import run_scraping
+from api.models.scrape_job import ScrapeJob
+from api.scripts.scrape_job_utils import (
+    JOB_DONE, create_scrape_job_if_idle, get_job_status, get_running_job,
+    serialize_scrape_job, start_scrape_job
+)
 from flask_jwt_extended import jwt_required
 
 
@@ -15,29 +17,256 @@ scrape_bp = Blueprint('scrape', __name__)
 @jwt_required()
 def scrape():
     '''
-    Realiza o web scraping para aquisição dos dados
+    Inicia o web scraping em segundo plano
     ---
     tags:
         - Scrape 
     summary: Web scraping.
     description: |
-        Endpoint responsável pelo processo de web scraping e inserção de novos registros na tabela books.
+        Endpoint responsável por iniciar o processo de web scraping e inserção de novos registros na tabela books.
+        O scraping é executado como um job em segundo plano e a resposta retorna imediatamente o id do job.
+        A cada página processada, os livros são gravados no banco e no CSV e um checkpoint é registrado,
+        permitindo retomar o job de onde parou em caso de interrupção.
+    responses:
+        202:
+            description: Job de scraping iniciado.
+            schema:
+                type: object
+                properties:
+                    msg:
+                        type: string
+                        description: Mensagem de sucesso.
+                    job_id:
+                        type: integer
+                        description: ID do job de scraping.
+                    status_url:
+                        type: string
+                        description: Rota para acompanhar o progresso do job.
+            examples:
+                application/json:
+                    msg: 'Web scraping iniciado'
+                    job_id: 1
+                    status_url: '/api/v1/scrape/jobs/1'
+        401:
+            description: Erro de autenticação JWT.
+            schema:
+                type: object
+                properties:
+                    error:
+                        type: string
+                        description: Mensagem de erro de autenticação.
+            examples:
+                application/json:
+                    error: '<erro de autenticação>'
+        409:
+            description: Já existe um job de scraping em execução.
+            schema:
+                type: object
+                properties:
+                    msg:
+                        type: string
+                        description: Mensagem de conflito.
+                    job_id:
+                        type: integer
+                        description: ID do job em execução.
+            examples:
+                application/json:
+                    msg: 'Já existe um job de scraping em execução'
+                    job_id: 1
+        500:
+            description: Erro interno do servidor.
+            schema:
+                type: object
+                properties:
+                    error:
+                        type: string
+                        description: Mensagem de erro interno do servidor.
+            examples:
+                application/json:
+                    error: '<erro interno do servidor>'
+    '''
+    try:
+        stale_seconds = current_app.config['SCRAPE_JOB_STALE_SECONDS']
+        #verificação e criação em um único comando: requisições simultâneas não iniciam dois jobs
+        job = create_scrape_job_if_idle(stale_seconds)
+        if job is None:
+            running_job = get_running_job(stale_seconds)
+            return jsonify({'msg': 'Já existe um job de scraping em execução', 'job_id': running_job.id if running_job else None}), 409
+
+        logger.info(f'Iniciando job de scraping {job.id}...')
+        start_scrape_job(current_app._get_current_object(), job.id)
+
+        return jsonify({
+            'msg': 'Web scraping iniciado',
+            'job_id': job.id,
+            'status_url': f'/api/v1/scrape/jobs/{job.id}'
+        }), 202
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f'error: {e}')
+        return jsonify({'error': str(e)}), 500
+
+
+@scrape_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def scrape_job_progress(job_id):
+    '''
+    Retorna o progresso de um job de scraping
+    ---
+    tags:
+        - Scrape 
+    summary: Progresso do web scraping.
+    description: |
+        Endpoint responsável por retornar o progresso de um job de scraping: categorias concluídas,
+        livros coletados e vazão. Um job em execução sem checkpoint recente é reportado como interrupted
+        e pode ser retomado.
+    parameters:
+        - in: path
+          name: job_id
+          type: integer
+          required: true
+          description: O id do job de scraping.
     responses:
         200:
-            description: Web scraping.
+            description: Progresso do job de scraping.
+            schema:
+                type: object
+                properties:
+                    job_id:
+                        type: integer
+                        description: ID do job de scraping.
+                    status:
+                        type: string
+                        description: Status do job (pending, running, done, failed ou interrupted).
+                    mode:
+                        type: string
+                        description: Modo de execução (single ou distributed).
+                    categories_total:
+                        type: integer
+                        description: Número de categorias a coletar.
+                    categories_done:
+                        type: integer
+                        description: Número de categorias concluídas.
+                    pages_done:
+                        type: integer
+                        description: Número de páginas de categoria processadas.
+                    books_parsed:
+                        type: integer
+                        description: Número de livros coletados e gravados.
+                    books_per_second:
+                        type: number
+                        format: float
+                        description: Vazão da coleta (livros por segundo de execução).
+                    elapsed_seconds:
+                        type: number
+                        format: float
+                        description: Tempo de execução acumulado, em segundos.
+                    checkpoint_url:
+                        type: string
+                        description: Próxima página a processar na categoria atual.
+                    failed_tasks:
+                        type: integer
+                        description: Tarefas da fila (modo distributed) que esgotaram as tentativas.
+                    error:
+                        type: string
+                        description: Mensagem de erro da última execução, se houver.
+            examples:
+                application/json:
+                    job_id: 1
+                    status: 'running'
+                    mode: 'single'
+                    categories_total: 50
+                    categories_done: 12
+                    pages_done: 20
+                    books_parsed: 380
+                    books_per_second: 9.5
+                    elapsed_seconds: 40.0
+                    checkpoint_url: 'http://books.toscrape.com/catalogue/category/books/fiction_10/page-2.html'
+                    failed_tasks: 0
+                    error: null
+        401:
+            description: Erro de autenticação JWT.
+            schema:
+                type: object
+                properties:
+                    error:
+                        type: string
+                        description: Mensagem de erro de autenticação.
+            examples:
+                application/json:
+                    error: '<erro de autenticação>'
+        404:
+            description: Job não encontrado.
             schema:
                 type: object
                 properties:
                     msg:
                         type: string
-                        description: Mensagem de sucesso do web scraping.
-                    total_records:
+                        description: Mensagem de erro para items não encontrados.
+            examples:
+                application/json:
+                    msg: 'Job de scraping com id 1 não encontrado'
+        500:
+            description: Erro interno do servidor.
+            schema:
+                type: object
+                properties:
+                    error:
+                        type: string
+                        description: Mensagem de erro interno do servidor.
+            examples:
+                application/json:
+                    error: '<erro interno do servidor>'
+    '''
+    try:
+        job = db.session.get(ScrapeJob, job_id)
+        if not job:
+            return jsonify({'msg': f'Job de scraping com id {job_id} não encontrado'}), 404
+        return jsonify(serialize_scrape_job(job, current_app.config['SCRAPE_JOB_STALE_SECONDS'])), 200
+    except Exception as e:
+        logger.error(f'error: {e}')
+        return jsonify({'error': str(e)}), 500
+
+
+@scrape_bp.route('/jobs/<int:job_id>/resume', methods=['POST'])
+@jwt_required()
+def resume_scrape_job(job_id):
+    '''
+    Retoma um job de scraping a partir do último checkpoint
+    ---
+    tags:
+        - Scrape 
+    summary: Retomada do web scraping.
+    description: |
+        Endpoint responsável por retomar um job de scraping que falhou ou foi interrompido (e.g., reinício do
+        servidor), continuando a partir da última página gravada em vez de recomeçar a coleta.
+    parameters:
+        - in: path
+          name: job_id
+          type: integer
+          required: true
+          description: O id do job de scraping.
+    responses:
+        202:
+            description: Job de scraping retomado.
+            schema:
+                type: object
+                properties:
+                    msg:
+                        type: string
+                        description: Mensagem de sucesso.
+                    job_id:
                         type: integer
-                        description: Número de registros inseridos.
+                        description: ID do job de scraping.
+                    status_url:
+                        type: string
+                        description: Rota para acompanhar o progresso do job.
             examples:
                 application/json:
-                    - msg: 'Web scraping realizado com sucesso'
-                    - total_records: 1000
+                    msg: 'Web scraping retomado'
+                    job_id: 1
+                    status_url: '/api/v1/scrape/jobs/1'
         401:
             description: Erro de autenticação JWT.
             schema:
@@ -49,6 +278,28 @@ def scrape():
             examples:
                 application/json:
                     error: '<erro de autenticação>'
+        404:
+            description: Job não encontrado.
+            schema:
+                type: object
+                properties:
+                    msg:
+                        type: string
+                        description: Mensagem de erro para items não encontrados.
+            examples:
+                application/json:
+                    msg: 'Job de scraping com id 1 não encontrado'
+        409:
+            description: O job já foi concluído, ainda está em execução ou é distribuído.
+            schema:
+                type: object
+                properties:
+                    msg:
+                        type: string
+                        description: Mensagem de conflito.
+            examples:
+                application/json:
+                    msg: 'Job de scraping 1 não pode ser retomado (status: done)'
         500:
             description: Erro interno do servidor.
             schema:
@@ -62,24 +313,27 @@ def scrape():
                     error: '<erro interno do servidor>'
     '''
     try:
-        logger.info('Iniciando scraping no Postgres...')
-        df_books = run_scraping()
+        job = db.session.get(ScrapeJob, job_id)
+        if not job:
+            return jsonify({'msg': f'Job de scraping com id {job_id} não encontrado'}), 404
+
+        if job.mode != 'single':
+            return jsonify({'msg': f'Job de scraping {job_id} é distribuído e deve ser retomado pelos workers (flask scrape-queue work)'}), 409
 
-        if df_books is None or df_books.empty:
-            return jsonify({'msg': 'Nenhum dado coletado.'}), 200
-        
-        truncate_sql = text(f'TRUNCATE TABLE {Books.__tablename__} RESTART IDENTITY CASCADE;')
-        
-        db.session.execute(truncate_sql)
-        data_to_insert = df_books.to_dict(orient='records') 
-        db.session.bulk_insert_mappings(Books, data_to_insert)
+        stale_seconds = current_app.config['SCRAPE_JOB_STALE_SECONDS']
+        status = get_job_status(job, stale_seconds)
+        #um job em execução só pode ser retomado quando não houver checkpoint recente (interrupted)
+        if status == JOB_DONE or get_running_job(stale_seconds):
+            return jsonify({'msg': f'Job de scraping {job_id} não pode ser retomado (status: {status})'}), 409
 
-        db.session.commit()
+        logger.info(f'Retomando job de scraping {job_id} a partir do checkpoint...')
+        start_scrape_job(current_app._get_current_object(), job.id)
 
         return jsonify({
-            'msg': 'Web scraping realizado com sucesso',
-            'total_records': len(data_to_insert)
-        }), 200
+            'msg': 'Web scraping retomado',
+            'job_id': job.id,
+            'status_url': f'/api/v1/scrape/jobs/{job.id}'
+        }), 202
 
     except Exception as e:
         db.session.rollback()
@@ -2,6 +2,7 @@ import logging
 from api.extensions import cache
 from flask import Blueprint, jsonify
 from flask_jwt_extended import jwt_required
+from api.scripts.negotiation_utils import format_cache_key, negotiated_response
 from api.scripts.stats_utils import get_stats_overview, get_stats_by_genre
 
 
@@ -11,7 +12,7 @@ stats_bp = Blueprint('stats', __name__)
 
 @stats_bp.route('/overview', methods=['GET'])
 @jwt_required()
-@cache.cached(timeout=3600)
+@cache.cached(timeout=3600, make_cache_key=format_cache_key)
 def stats_overview():
     '''
     Retorna estatísticas gerais do acervo de livros
@@ -20,7 +21,11 @@ def stats_overview():
         - Statistics
     summary: Estatísticas gerais do acervo.
     description: |
-        Endpoint responsável por retornar estatísticas gerais do acervo.
+        Endpoint responsável por retornar estatísticas gerais do acervo, pré-calculadas a cada atualização do catálogo.
+    produces:
+        - application/json
+        - application/vnd.columnar+json
+        - application/msgpack
     responses:
         200:
             description: Estatísticas gerais do acervo.
@@ -87,7 +92,7 @@ def stats_overview():
     try:
         stats = get_stats_overview()
         if stats:
-            return jsonify(stats), 200
+            return negotiated_response(stats)
         return jsonify({'msg': 'Nenhuma estatística disponível'}), 404
     except Exception as e:
         logger.error(f'error: {e}')
@@ -96,7 +101,7 @@ def stats_overview():
 
 @stats_bp.route('/genres', methods=['GET'])
 @jwt_required()
-@cache.cached(timeout=3600)
+@cache.cached(timeout=3600, make_cache_key=format_cache_key)
 def stats_genres():
     '''
     Retorna estatísticas detalhadas por gênero.
@@ -105,7 +110,11 @@ def stats_genres():
         - Statistics
     summary: Estatísticas gerais do acervo por gênero.
     description: |
-        Endpoint responsável por retornar estatísticas detalhadas por gênero.
+        Endpoint responsável por retornar estatísticas detalhadas por gênero, pré-calculadas a cada atualização do catálogo.
+    produces:
+        - application/json
+        - application/vnd.columnar+json
+        - application/msgpack
     responses:
         200:
               description: Estatísticas gerais do acervo por gênero.
@@ -162,7 +171,7 @@ def stats_genres():
     try:
         stats = get_stats_by_genre()
         if stats:
-            return jsonify(stats), 200
+            return negotiated_response(stats)
         return jsonify({'msg': 'Nenhuma estatística por gênero disponível'}), 404
     except Exception as e:
         logger.error(f'error: {e}')
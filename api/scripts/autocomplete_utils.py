@@ -0,0 +1,85 @@
+import bisect
+import logging
+import re
+import unicodedata
+from typing import Iterable, List
+from api.extensions import db
+from api.models.books import Books
+from api.scripts.catalog_cache_utils import get_catalog_cached
+
+
+logger = logging.getLogger(__name__)
+
+#tudo o que não for letra ou dígito separa palavras
+SEPARATOR_PATTERN = re.compile(r'[\W_]+')
+
+
+def normalize_title(text: str) -> str:
+    '''Normaliza o texto para comparação de prefixos: sem acentos, em minúsculas e sem pontuação.'''
+    text = unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ascii')
+    return SEPARATOR_PATTERN.sub(' ', text.lower()).strip()
+
+
+class PrefixIndex:
+    '''
+    Índice de prefixos dos títulos para autocompletar, baseado em arrays ordenados e busca binária.
+
+    O primeiro array contém os títulos normalizados; o segundo, os trechos de cada título que
+    começam nas palavras seguintes à primeira (em "the secret garden": "secret garden" e
+    "garden"). Uma consulta localiza com bisect o início do intervalo de chaves com o prefixo
+    e lê apenas as limit primeiras; os títulos que começam pelo prefixo vêm antes dos que
+    apenas contêm uma palavra iniciada por ele.
+
+    Args:
+        titles (iterable): Títulos do catálogo (repetições são ignoradas).
+    '''
+    def __init__(self, titles: Iterable[str]):
+        entries, word_entries = set(), set()
+        for title in set(titles):
+            normalized = normalize_title(title)
+            if not normalized:
+                continue
+            entries.add((normalized, title))
+            for match in re.finditer(' ', normalized):
+                word_entries.add((normalized[match.end():], title))
+        self._arrays = []
+        for pairs in (sorted(entries), sorted(word_entries)):
+            self._arrays.append(([key for key, _ in pairs], [title for _, title in pairs]))
+
+    def __len__(self) -> int:
+        return len(self._arrays[0][0])
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        '''Retorna até limit títulos distintos para o prefixo, em ordem alfabética dentro de cada grupo.'''
+        prefix = normalize_title(prefix)
+        if not prefix or limit <= 0:
+            return []
+        results, seen = [], set()
+        for keys, titles in self._arrays:
+            position = bisect.bisect_left(keys, prefix)
+            while position < len(keys) and len(results) < limit and keys[position].startswith(prefix):
+                title = titles[position]
+                if title not in seen:
+                    seen.add(title)
+                    results.append(title)
+                position += 1
+        return results
+
+
+def get_prefix_index() -> PrefixIndex:
+    '''Retorna o índice de prefixos dos títulos mantido em memória, reconstruído quando o catálogo muda.'''
+    return get_catalog_cached('Índice de prefixos dos títulos', lambda: PrefixIndex(title for title, in db.session.query(Books.title)))
+
+
+def autocomplete_titles(prefix: str, limit: int = 10) -> List[str]:
+    '''
+    Sugere títulos de livros que começam pelo prefixo informado (ou que têm uma palavra que começa por ele).
+
+    Args:
+        prefix (str): O texto digitado pelo usuário.
+        limit (int, optional): O número máximo de sugestões. Padrão é 10.
+
+    Return:
+        list: Os títulos sugeridos.
+    '''
+    return get_prefix_index().complete(prefix, limit)
@@ -1,6 +1,16 @@
 import logging
-from sqlalchemy import distinct, or_, case
+from sqlalchemy import distinct, or_
+from api.extensions import db
+from api.models.book_details import BOOK_DETAIL_COLUMNS, BookDetails
 from api.models.books import Books
+from api.models.genres import Genre
+from api.scripts.catalog_snapshot_utils import get_catalog_snapshot
+from api.scripts.pagination_utils import Page, PaginationError, decode_cursor, paginate
+from api.scripts.search_utils import iter_search_books, search_books
+from api.scripts.serialization_utils import (
+    BOOK_FIELDS, BOOK_SUMMARY_FIELDS, TOP_RATED_FIELDS, book_columns, needs_details, serialize_rows, with_keys
+)
+from api.scripts.streaming_utils import iter_rows
 
 
 logger = logging.getLogger('__name__')
@@ -16,9 +26,7 @@ def get_all_categories():
               Retorna None em caso de erro.
     '''
     try:
-        categories = (
-            Books.query.with_entities(distinct(Books.genre)).order_by(Books.genre.asc()).all()
-        )
+        categories = db.session.query(Genre.name).order_by(Genre.name.asc()).all()
         results = [{'category': c[0]} for c in categories]
         return results
     except Exception as e:
@@ -26,175 +34,263 @@ def get_all_categories():
         return None
 
 
-def get_all_book_titles():
+def get_all_book_titles(limit=None, cursor=None):
     '''
-    Retorna todos os títulos de livros únicos disponíveis no banco de dados.
+    Retorna os títulos de livros únicos disponíveis no banco de dados, em ordem alfabética.
+
+    A paginação é por chave (keyset): a página seguinte continua após o último título da anterior
+    (title > cursor), percorrendo o índice ix_books_title sem OFFSET.
+
+    Args:
+        limit (int, optional): Tamanho da página; None retorna todos os títulos.
+        cursor (str, optional): Cursor da página anterior (Page.next_cursor).
 
     Return:
-        list: Uma lista de dicionários, onde cada dicionário contém a chave 'book' (título).
-              Exemplo: [{'book': 'A Light in the Attic'}, {'book': 'Tipping the Velvet'}].
+        Page: Uma lista de dicionários, onde cada dicionário contém a chave 'title'.
+              Exemplo: [{'title': 'A Light in the Attic'}, {'title': 'Tipping the Velvet'}].
               Retorna None em caso de erro.
+
+    Raises:
+        PaginationError: Se o cursor for inválido.
     '''
+    after = decode_cursor(cursor, (str,)) if cursor else None
     try:
-        titles = (
-            Books.query.with_entities(distinct(Books.title)).order_by(Books.title.asc()).all()
-        )
-        results = [{'title': c[0]} for c in titles]
-        return results
+        snapshot = get_catalog_snapshot()
+        if snapshot is not None:
+            titles = [(title,) for title in snapshot.titles(limit, after[0] if after else None)]
+        else:
+            query = Books.query.with_entities(distinct(Books.title))
+            if after:
+                query = query.filter(Books.title > after[0])
+            query = query.order_by(Books.title.asc())
+            titles = (query.limit(limit + 1) if limit else query).all()
+        page = paginate(titles, limit, lambda row: (row[0],))
+        return Page([{'title': c[0]} for c in page], page.next_cursor)
     except Exception as e:
-        print(f'Erro ao buscar livros: {e}')
+        logger.error(f'Erro ao buscar livros: {e}')
         return None
     
 
-def get_book_by_id(id):
+def iter_all_book_titles():
+    '''
+    Percorre todos os títulos distintos em ordem alfabética, como get_all_book_titles sem paginação,
+    lendo-os em lotes do índice ix_books_title (ou da lista ordenada do snapshot colunar), para o
+    modo streaming de /books/titles.
+    '''
+    snapshot = get_catalog_snapshot()
+    if snapshot is not None:
+        titles = snapshot.titles()
+    else:
+        titles = (title for title, in iter_rows(Books.query.with_entities(distinct(Books.title)).order_by(Books.title.asc())))
+    for title in titles:
+        yield {'title': title}
+
+
+def _book_details(book, details, fields):
+    '''Monta o dicionário com os campos do livro (linha do snapshot e linha de book_details, se houver).'''
+    return {field: getattr(details if field in BOOK_DETAIL_COLUMNS else book, field, None) for field in fields}
+
+
+def _book_details_query(fields):
+    '''Consulta só das colunas dos campos, com a junção a book_details apenas se algum campo estiver nela.'''
+    query = db.session.query(*book_columns(fields)).select_from(Books)
+    if needs_details(fields):
+        query = query.outerjoin(BookDetails, BookDetails.upc == Books.upc)
+    return query
+
+
+def get_book_by_id(id, fields=None):
     '''
     Retorna todos os detalhes de um livro com base no seu ID.
 
+    É a única leitura de livros que busca a linha de book_details (descrição, url e impostos),
+    pelo upc; com o snapshot colunar ativo, as demais colunas vêm dele. Só as colunas dos campos
+    pedidos são lidas, e book_details só é consultada se algum deles estiver nela.
+
     Args:
         id (int): O ID único do livro no banco de dados.
+        fields (tuple, optional): Campos retornados (de BOOK_FIELDS). Padrão são todos.
 
     Return:
         dict: Um dicionário contendo todos os detalhes do livro, ou None se não for encontrado ou em caso de erro.
     '''
+    fields = fields or BOOK_FIELDS
     try:
-        book = Books.query.filter_by(id=id).first()
-        if book:
-            result = {
-                'id': book.id,
-                'upc': book.upc,
-                'title': book.title,
-                'genre': book.genre,
-                'price': book.price,
-                'availability': book.availability,
-                'rating': book.rating,
-                'description': book.description,
-                'product_type': book.product_type,
-                'price_excl_tax': book.price_excl_tax,
-                'price_incl_tax': book.price_incl_tax,
-                'tax': book.tax,
-                'number_of_reviews': book.number_of_reviews,
-                'url': book.url,
-                'image_url': book.image_url
-            }
-            return result
+        snapshot = get_catalog_snapshot()
+        if snapshot is not None:
+            book = snapshot.get(int(id)) if str(id).isdigit() else None
+            details = db.session.get(BookDetails, book.upc) if book and needs_details(fields) else None
+            return _book_details(book, details, fields) if book else None
+        book = _book_details_query(fields).filter(Books.id == id).first()
+        return serialize_rows([book], fields)[0] if book else None
+    except Exception as e:
+        logger.error(f'error: {e}')
         return None
+
+
+def get_books_by_ids(ids, fields=None):
+    '''
+    Retorna os detalhes de vários livros de uma vez, na ordem dos ids informados.
+
+    Os livros são lidos com uma única consulta (id IN (...)), ou do snapshot colunar quando
+    ativo, e as linhas de book_details com outra consulta pelos upcs encontrados. Ids repetidos
+    são considerados uma vez.
+
+    Args:
+        ids (list): Os IDs dos livros.
+        fields (tuple, optional): Campos retornados (de BOOK_FIELDS). Padrão são todos.
+
+    Return:
+        dict: Um dicionário com os detalhes dos livros encontrados (books) e os ids não encontrados (missing),
+              ou None em caso de erro.
+    '''
+    fields = fields or BOOK_FIELDS
+    try:
+        ids = list(dict.fromkeys(ids))
+        snapshot = get_catalog_snapshot()
+        if snapshot is not None:
+            books = {book_id: book for book_id, book in ((book_id, snapshot.get(book_id)) for book_id in ids) if book}
+            detail_fields = [field for field in fields if field in BOOK_DETAIL_COLUMNS]
+            upcs = [book.upc for book in books.values()]
+            details = {
+                detail.upc: detail
+                for detail in db.session.query(BookDetails.upc, *book_columns(detail_fields)).filter(BookDetails.upc.in_(upcs))
+            } if upcs and detail_fields else {}
+            found = {book_id: _book_details(book, details.get(book.upc), fields) for book_id, book in books.items()}
+        else:
+            rows = _book_details_query(with_keys(fields, ('id',))).filter(Books.id.in_(ids)).all() if ids else []
+            found = {row.id: book for row, book in zip(rows, serialize_rows(rows, fields))}
+        return {
+            'books': [found[book_id] for book_id in ids if book_id in found],
+            'missing': [book_id for book_id in ids if book_id not in found]
+        }
     except Exception as e:
         logger.error(f'error: {e}')
         return None
-    
 
-def get_books_by_title_or_category(title=None, genre=None):
+
+def get_books_by_title_or_category(title=None, genre=None, limit=None, cursor=None, fields=None):
     '''
-    Busca livros por título OU categoria (gênero), usando correspondência parcial (LIKE).
+    Busca livros por título OU categoria (gênero) no índice de texto completo (ver search_utils.search_books).
 
     Args:
         title (str, optional): O título ou parte do título a ser buscado. Padrão é None.
         genre (str, optional): A categoria (gênero) ou parte da categoria a ser buscada. Padrão é None.
+        limit (int, optional): Tamanho da página; None retorna todos os resultados.
+        cursor (str, optional): Cursor da página anterior (Page.next_cursor).
+        fields (tuple, optional): Campos retornados (de BOOK_LIST_FIELDS). Padrão é BOOK_SUMMARY_FIELDS.
 
     Return:
-        list: Uma lista de dicionários contendo ID, UPC, título, gênero, preço e URL da imagem.
-              Retorna uma lista vazia se nenhum filtro for fornecido. Retorna None em caso de erro.
+        Page: Uma lista de dicionários contendo ID, UPC, título, gênero, preço, URL da imagem e relevância
+              (rank), do mais para o menos relevante. Retorna uma lista vazia se nenhum filtro for fornecido.
+              Retorna None em caso de erro.
+
+    Raises:
+        PaginationError: Se o cursor for inválido.
     '''
     try:
-        filters = []
-        if title:
-            filters.append(Books.title.ilike(f'%{title}%'))
-        if genre:
-            filters.append(Books.genre.ilike(f'%{genre}%'))
-        if filters:
-            query = Books.query.filter(or_(*filters))
-        else:
-            return [] 
-        books = query.order_by(Books.title.asc()).all()
-        results = []
-        for book in books:
-            results.append({
-                'id': book.id,
-                'upc': book.upc,
-                'title': book.title,
-                'genre': book.genre,
-                'price': book.price,
-                'image_url': book.image_url
-            })
-        return results
+        fields = fields or BOOK_SUMMARY_FIELDS
+        books = search_books(title=title, genre=genre, limit=limit, cursor=cursor, fields=fields)
+        results = serialize_rows((book for book, _ in books), fields)
+        for result, (_, rank) in zip(results, books):
+            result['rank'] = round(rank, 6)
+        return Page(results, books.next_cursor)
+    except PaginationError:
+        raise
     except Exception as e:
         logger.error(f'error: {e}')
         return None
 
 
-def get_books_by_price_range(min_price, max_price):
+def iter_books_by_title_or_category(title=None, genre=None, fields=None):
     '''
-    Filtra livros dentro de uma faixa de preço específica (inclusiva).
+    Percorre todos os resultados da busca por título ou categoria, com os mesmos campos e a mesma
+    ordem de get_books_by_title_or_category, sem paginação e sem materializar a lista (ver
+    search_utils.iter_search_books), para o modo streaming de /books/search.
+    '''
+    fields = fields or BOOK_SUMMARY_FIELDS
+    for book, rank in iter_search_books(title=title, genre=genre, fields=fields):
+        result = serialize_rows([book], fields)[0]
+        result['rank'] = round(rank, 6)
+        yield result
+
+
+def get_books_by_price_range(min_price, max_price, limit=None, cursor=None, fields=None):
+    '''
+    Filtra livros dentro de uma faixa de preço específica (inclusiva), do mais barato ao mais caro.
+
+    A paginação é por chave (preço, id): a página seguinte começa no preço do último livro da
+    anterior (price >= cursor), de modo que a consulta continua a faixa do índice ix_books_price
+    em vez de descartar linhas com OFFSET. Só as colunas retornadas (e as da chave) são lidas.
 
     Args:
         min_price (float): O preço mínimo do livro.
         max_price (float): O preço máximo do livro.
+        limit (int, optional): Tamanho da página; None retorna todos os livros da faixa.
+        cursor (str, optional): Cursor da página anterior (Page.next_cursor).
+        fields (tuple, optional): Campos retornados (de BOOK_LIST_FIELDS). Padrão é BOOK_SUMMARY_FIELDS.
 
     Return:
-        list: Uma lista de dicionários contendo ID, UPC, título, gênero, preço e URL da imagem.
+        Page: Uma lista de dicionários contendo ID, UPC, título, gênero, preço e URL da imagem.
               Retorna None em caso de erro.
+
+    Raises:
+        PaginationError: Se o cursor for inválido.
     '''
+    after = decode_cursor(cursor, (float, int)) if cursor else None
+    fields = fields or BOOK_SUMMARY_FIELDS
     try:
-        books = (
-            Books.query
-            .filter(Books.price >= min_price, Books.price <= max_price)
-            .order_by(Books.price.asc())
-            .all()
-        )
-        results = []
-        for book in books:
-            results.append({
-                'id': book.id,
-                'upc': book.upc,
-                'title': book.title,
-                'genre': book.genre,
-                'price': book.price,
-                'image_url': book.image_url
-            })
-        return results
+        snapshot = get_catalog_snapshot()
+        if snapshot is not None:
+            books = snapshot.price_range(min_price, max_price, limit, after)
+        else:
+            query = (
+                Books.query
+                .with_entities(*book_columns(with_keys(fields, ('price', 'id'))))
+                .filter(Books.price >= min_price, Books.price <= max_price)
+            )
+            if after:
+                query = query.filter(Books.price >= after[0], or_(Books.price > after[0], Books.id > after[1]))
+            query = query.order_by(Books.price.asc(), Books.id.asc())
+            books = (query.limit(limit + 1) if limit else query).all()
+        books = paginate(books, limit, lambda book: (book.price, book.id))
+        return Page(serialize_rows(books, fields), books.next_cursor)
     except Exception as e:
         logger.error(f'error: {e}')
         return None
     
 
-def get_top_rated_books(limit=10):
+def get_top_rated_books(limit=10, fields=None):
     '''
-    Retorna os livros com a melhor avaliação (rating mais alto), convertendo ratings de texto para numérico.
+    Retorna os livros com a melhor avaliação (rating mais alto), ordenados pela coluna numérica rating_value.
+
+    A consulta percorre o índice ix_books_rating_value_title e para após limit linhas (com o
+    snapshot colunar ativo, lê a ordenação pré-calculada dele), lendo só as colunas retornadas
+    (TOP_RATED_FIELDS ou os campos pedidos). Livros sem avaliação numérica (rating_value nulo) não entram no ranking.
 
     Args:
         limit (int, optional): O número máximo de livros a serem retornados. Padrão é 10.
+        fields (tuple, optional): Campos retornados (de BOOK_LIST_FIELDS). Padrão é TOP_RATED_FIELDS.
 
     Return:
         list: Uma lista de dicionários contendo ID, UPC, título, gênero, rating, preço e URL da imagem.
               Retorna None em caso de erro.
     '''
-    rating_map = {
-        'One': 1, 
-        'Two': 2, 
-        'Three': 3, 
-        'Four': 4, 
-        'Five': 5
-    }
+    fields = fields or TOP_RATED_FIELDS
     try:
-        rating_case = case(rating_map, value=Books.rating).label('rating_value')
-        top_books = (
-            Books.query.add_columns(rating_case)
-            .order_by(rating_case.desc(), Books.title.asc())
-            .limit(limit)
-            .all()
-        )
-        results = []
-        for book, rating_val in top_books:
-            results.append({
-                'id': book.id,
-                'upc': book.upc,
-                'title': book.title,
-                'genre': book.genre,
-                'rating': book.rating,
-                'price': book.price,
-                'image_url': book.image_url
-            })
-        return results
+        snapshot = get_catalog_snapshot()
+        if snapshot is not None:
+            top_books = snapshot.top_rated(limit)
+        else:
+            top_books = (
+                Books.query
+                .with_entities(*book_columns(fields))
+                .filter(Books.rating_value.isnot(None))
+                .order_by(Books.rating_value.desc(), Books.title.asc())
+                .limit(limit)
+                .all()
+            )
+        return serialize_rows(top_books, fields)
     except Exception as e:
         logger.error(f'error: {e}')
         return None
\ No newline at end of file
@@ -0,0 +1,50 @@
+import logging
+import threading
+import time
+import weakref
+from typing import Callable, TypeVar
+from flask import current_app
+from api.config import Config
+from api.extensions import db
+from api.scripts.load_utils import get_catalog_version
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+#estruturas derivadas do catálogo mantidas em memória, por engine (banco): {nome: [versão, verificado_em, valor]}
+_caches = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def get_catalog_cached(name: str, builder: Callable[[], T]) -> T:
+    '''
+    Retorna a estrutura derivada do catálogo de livros identificada por name, montando-a com
+    builder na primeira chamada e sempre que a versão do catálogo (catalog_version) mudar.
+
+    Para que as consultas servidas pela estrutura não paguem uma ida ao banco a cada chamada,
+    a versão é verificada no máximo a cada CATALOG_CACHE_CHECK_SECONDS segundos (0 verifica
+    sempre); gravações feitas por outros processos são percebidas com esse atraso máximo.
+    '''
+    check_seconds = current_app.config.get('CATALOG_CACHE_CHECK_SECONDS', Config.CATALOG_CACHE_CHECK_SECONDS)
+    engine = db.engine
+    now = time.monotonic()
+    with _lock:
+        entry = _caches.setdefault(engine, {}).get(name)
+        if entry is not None and now - entry[1] < check_seconds:
+            return entry[2]
+
+    version = get_catalog_version()
+    with _lock:
+        entry = _caches[engine].get(name)
+        if entry is not None and entry[0] == version:
+            entry[1] = now
+            return entry[2]
+
+    start = time.perf_counter()
+    value = builder()
+    with _lock:
+        _caches[engine][name] = [version, now, value]
+    logger.info(f'{name} reconstruído para a versão {version} do catálogo em {time.perf_counter() - start:.3f}s.')
+    return value
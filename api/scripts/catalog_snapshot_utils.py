@@ -0,0 +1,177 @@
+import bisect
+import logging
+import sys
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from flask import current_app
+from api.config import Config
+from api.extensions import db
+from api.models.books import Books, RATING_VALUES
+from api.scripts.catalog_cache_utils import get_catalog_cached
+
+
+logger = logging.getLogger(__name__)
+
+#colunas de texto com poucos valores distintos (ou repetidos entre livros), internadas para ocuparem uma única cópia
+INTERNED_COLUMNS = ('title', 'genre', 'rating')
+#colunas numéricas guardadas em arrays tipados; as demais ficam em arrays de objetos
+NUMERIC_COLUMNS = {
+    'id': np.int64,
+    'price': np.float64,
+    'availability': np.int64,
+    'rating_value': np.int8,
+    'number_of_reviews': np.int64,
+}
+
+
+class CatalogRow(NamedTuple):
+    '''
+    Linha do snapshot, com os mesmos atributos das colunas da tabela books (e.g., book.title,
+    book.price). As colunas de book_details (descrição, url, impostos) não fazem parte do snapshot.
+    '''
+    id: int
+    upc: str
+    title: str
+    genre: str
+    price: float
+    availability: int
+    rating: str
+    rating_value: Optional[int]
+    number_of_reviews: int
+    image_url: str
+
+
+class CatalogSnapshot:
+    '''
+    Cópia colunar e somente leitura da tabela books, para responder às consultas de leitura sem o banco.
+
+    Cada coluna é um array NumPy (tipado para números, de objetos para textos); as ordenações
+    usadas pelas consultas são calculadas uma única vez na montagem: por (preço, id) para a faixa
+    de preço, por (rating_value desc, título, id) para o top-rated e a lista ordenada de títulos
+    distintos. Uma consulta localiza o intervalo com searchsorted/bisect e materializa apenas as
+    linhas retornadas, como CatalogRow. As estatísticas são pré-calculadas com bincount.
+
+    Os textos são comparados pela ordem dos code points (a mesma do SQLite); no Postgres a ordem
+    dos títulos pode diferir da collation do banco.
+
+    Args:
+        rows (iterable): Tuplas com as colunas de CatalogRow, ordenadas por id.
+    '''
+    def __init__(self, rows: Iterable[Sequence]):
+        values = list(zip(*rows)) or [()] * len(CatalogRow._fields)
+        self.columns = {}
+        for name, column in zip(CatalogRow._fields, values):
+            if name == 'rating_value':
+                #rating_value nulo (avaliação fora de One a Five) é guardado como 0
+                self.columns[name] = np.array([value or 0 for value in column], dtype=np.int8)
+            elif name in NUMERIC_COLUMNS:
+                self.columns[name] = np.array(column, dtype=NUMERIC_COLUMNS[name])
+            else:
+                if name in INTERNED_COLUMNS:
+                    column = [sys.intern(value) for value in column]
+                array = np.empty(len(column), dtype=object)
+                array[:] = column
+                self.columns[name] = array
+
+        ids, prices = self.columns['id'], self.columns['price']
+        ratings, titles = self.columns['rating_value'], self.columns['title']
+        self.price_order = np.lexsort((ids, prices))
+        self.sorted_prices = prices[self.price_order]
+        self.sorted_price_ids = ids[self.price_order]
+        #os títulos distintos já ordenados e, para cada livro, a posição do seu título entre eles
+        sorted_titles, title_codes = np.unique(titles, return_inverse=True)
+        self.sorted_titles = sorted_titles.tolist()
+        top_rated_order = np.lexsort((ids, title_codes, -ratings.astype(np.int64)))
+        self.top_rated_order = top_rated_order[ratings[top_rated_order] > 0]
+        genres, genre_codes = np.unique(self.columns['genre'], return_inverse=True)
+        self.genres = genres.tolist()
+
+        rating_labels = {value: label for label, value in RATING_VALUES.items()}
+        rating_counts = np.bincount(ratings, minlength=max(RATING_VALUES.values()) + 1)
+        self.overview = {
+            'total_books': int(len(ids)),
+            'avg_price': round(float(prices.mean()), 2) if len(ids) else 0.0,
+            #mesma ordem da consulta ao banco: mais frequente primeiro, empate pelo valor (sem avaliação antes)
+            'rating_distribution': [
+                {'rating': rating_labels.get(value, 'No Rating'), 'total': int(count)}
+                for value, count in sorted(enumerate(rating_counts.tolist()), key=lambda item: (-item[1], item[0]))
+                if count
+            ]
+        }
+        genre_counts = np.bincount(genre_codes, minlength=len(self.genres))
+        genre_sums = np.bincount(genre_codes, weights=prices, minlength=len(self.genres))
+        self.genre_stats = sorted(
+            (
+                {'genre': genre, 'total': int(count), 'avg_price': round(float(total / count), 2)}
+                for genre, count, total in zip(self.genres, genre_counts.tolist(), genre_sums.tolist())
+            ),
+            key=lambda stat: (-stat['total'], stat['genre'])
+        )
+
+    def __len__(self) -> int:
+        return len(self.columns['id'])
+
+    def rows(self, positions: Sequence[int]) -> List[CatalogRow]:
+        '''Materializa as linhas das posições informadas, convertendo os valores para tipos Python.'''
+        positions = np.asarray(positions, dtype=np.int64)
+        values = [self.columns[name][positions].tolist() for name in CatalogRow._fields]
+        rating_index = CatalogRow._fields.index('rating_value')
+        values[rating_index] = [value or None for value in values[rating_index]]
+        return [CatalogRow(*row) for row in zip(*values)]
+
+    def get(self, book_id: int) -> Optional[CatalogRow]:
+        '''Retorna o livro com o id informado (busca binária nos ids ordenados), ou None.'''
+        ids = self.columns['id']
+        position = int(np.searchsorted(ids, book_id))
+        if position < len(ids) and ids[position] == book_id:
+            return self.rows([position])[0]
+        return None
+
+    def price_range(
+        self,
+        min_price: float,
+        max_price: float,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[float, int]] = None
+    ) -> List[CatalogRow]:
+        '''
+        Livros com preço entre min_price e max_price (inclusive), ordenados por (preço, id), a partir
+        da chave after (exclusive). Lê até limit + 1 linhas, como as consultas paginadas do banco.
+        '''
+        start = int(np.searchsorted(self.sorted_prices, min_price, 'left'))
+        end = int(np.searchsorted(self.sorted_prices, max_price, 'right'))
+        if after:
+            price, book_id = after
+            first = int(np.searchsorted(self.sorted_prices, price, 'left'))
+            last = int(np.searchsorted(self.sorted_prices, price, 'right'))
+            start = max(start, first + int(np.searchsorted(self.sorted_price_ids[first:last], book_id, 'right')))
+        if limit:
+            end = min(end, start + limit + 1)
+        return self.rows(self.price_order[start:end]) if start < end else []
+
+    def top_rated(self, limit: int = 10) -> List[CatalogRow]:
+        '''Os limit livros com maior rating_value (empate por título), ignorando os sem avaliação.'''
+        return self.rows(self.top_rated_order[:max(limit, 0)])
+
+    def titles(self, limit: Optional[int] = None, after: Optional[str] = None) -> List[str]:
+        '''Títulos distintos em ordem alfabética, posteriores a after; até limit + 1 títulos.'''
+        start = bisect.bisect_right(self.sorted_titles, after) if after is not None else 0
+        return self.sorted_titles[start:start + limit + 1] if limit else self.sorted_titles[start:]
+
+
+def load_catalog_snapshot() -> CatalogSnapshot:
+    '''Lê a tabela books (sem hidratar objetos do ORM) e monta o snapshot.'''
+    columns = [getattr(Books, name) for name in CatalogRow._fields]
+    return CatalogSnapshot(db.session.query(*columns).order_by(Books.id.asc()).all())
+
+
+def get_catalog_snapshot() -> Optional[CatalogSnapshot]:
+    '''
+    Retorna o snapshot colunar do catálogo, ou None se CATALOG_SNAPSHOT_ENABLED estiver desativado.
+
+    O snapshot é mantido em memória por processo e remontado quando a versão do catálogo muda
+    (após cada scraping ou carga; ver catalog_cache_utils.get_catalog_cached).
+    '''
+    if not current_app.config.get('CATALOG_SNAPSHOT_ENABLED', Config.CATALOG_SNAPSHOT_ENABLED):
+        return None
+    return get_catalog_cached('Snapshot colunar do catálogo', load_catalog_snapshot)
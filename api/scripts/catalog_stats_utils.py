@@ -0,0 +1,91 @@
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from api.extensions import db
+from api.models.books import Books, RATING_VALUES
+from api.models.catalog_stats import CatalogStats
+from api.models.genres import Genre
+
+
+logger = logging.getLogger(__name__)
+
+STATS_OVERVIEW = 'overview'
+STATS_GENRES = 'genres'
+
+
+def compute_stats_overview() -> Dict:
+    '''
+    Agrega a tabela books: total de livros, preço médio e distribuição das avaliações (avaliações
+    fora de One a Five são contadas como 'No Rating').
+    '''
+    total_books = Books.query.count()
+    avg_price = (
+        Books.query
+        .with_entities(func.avg(Books.price))
+        .scalar()
+    )
+    #o agrupamento pela coluna inteira rating_value é resolvido apenas no índice ix_books_rating_value_title
+    rating_labels = {value: label for label, value in RATING_VALUES.items()}
+    rating_distribution = (
+        Books.query.with_entities(Books.rating_value, func.count())
+        .group_by(Books.rating_value)
+        .order_by(func.count().desc(), Books.rating_value)
+        .all()
+    )
+    return {
+        'total_books': total_books,
+        'avg_price': round(avg_price, 2) if avg_price else 0.0,
+        'rating_distribution': [{'rating': rating_labels.get(r[0], 'No Rating'), 'total': r[1]} for r in rating_distribution]
+    }
+
+
+def compute_stats_by_genre() -> List[Dict]:
+    '''Agrega a tabela books por gênero: quantidade de livros e preço médio.'''
+    #o agrupamento pelo id inteiro do gênero é resolvido apenas no índice ix_books_genre_id_price;
+    #os nomes vêm da tabela genres, com uma linha por gênero
+    totals = (
+        Books.query.with_entities(
+            Books.genre_id,
+            func.count().label('count'),
+            func.avg(Books.price).label('avg_price')
+        )
+        .group_by(Books.genre_id)
+        .subquery()
+    )
+    category_stats = (
+        db.session.query(Genre.name.label('genre'), totals.c.count, totals.c.avg_price)
+        .join(totals, totals.c.genre_id == Genre.id)
+        .order_by(totals.c.count.desc(), Genre.name)
+        .all()
+    )
+    return [
+        {
+            'genre': stat.genre,
+            'total': stat.count,
+            'avg_price': round(stat.avg_price, 2)
+        }
+        for stat in category_stats
+    ]
+
+
+def refresh_catalog_stats() -> None:
+    '''
+    Recalcula as estatísticas do catálogo e grava em catalog_stats, na transação atual.
+
+    As cargas (bulk_load_books, upsert_books) a chamam depois de bump_catalog_version: no Postgres,
+    o incremento bloqueia a linha de catalog_version até o commit, de modo que cargas concorrentes
+    recalculam uma de cada vez, cada uma vendo os livros já confirmados pela outra. Os jobs de
+    scraping gravam em lotes sem recalcular e a chamam uma vez ao final (na fila distribuída, só o
+    worker que encerra o job).
+    '''
+    now = datetime.utcnow()
+    for name, payload in ((STATS_OVERVIEW, compute_stats_overview()), (STATS_GENRES, compute_stats_by_genre())):
+        db.session.merge(CatalogStats(name=name, payload=payload, updated_at=now))
+    db.session.flush()
+
+
+def get_catalog_stats(name: str) -> Optional[object]:
+    '''Retorna o relatório pré-calculado name (leitura pela chave primária), ou None se ainda não foi calculado.'''
+    stats = db.session.get(CatalogStats, name)
+    return stats.payload if stats is not None else None
@@ -0,0 +1,216 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+import requests
+from api.config import Config
+from api.scripts.http_cache_utils import ResponseCache
+from api.scripts.metrics_utils import ScrapeMetrics
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+#status HTTP considerados transitórios (vale a pena tentar novamente)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+#limite para o tempo de espera solicitado pelo servidor via Retry-After
+RETRY_AFTER_MAX = 120.0
+
+
+class AdaptiveLimiter:
+    '''
+    Limita o número de requisições simultâneas com controle AIMD.
+
+    O limite cresce de forma aditiva (cerca de +1 a cada janela de requisições bem-sucedidas
+    e com latência abaixo do alvo) e cai de forma multiplicativa em caso de erro ou latência
+    acima do alvo, no máximo uma vez por janela de resfriamento.
+
+    Args:
+        initial (int): Limite inicial de requisições simultâneas.
+        minimum (int): Limite mínimo.
+        maximum (int): Limite máximo.
+        target_latency (float): Latência, em segundos, acima da qual o limite é reduzido.
+        decrease_factor (float): Fator aplicado ao limite em cada redução.
+        cooldown (float): Intervalo mínimo, em segundos, entre duas reduções.
+    '''
+    def __init__(
+        self,
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = 16,
+        target_latency: float = 2.0,
+        decrease_factor: float = 0.5,
+        cooldown: float = 1.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self._clock = clock
+        self._last_decrease = float('-inf')
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        '''Bloqueia até que haja uma vaga dentro do limite atual.'''
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency: float, success: bool) -> None:
+        '''Libera a vaga e ajusta o limite conforme o resultado da requisição.'''
+        with self._condition:
+            self.in_flight -= 1
+            if success and latency <= self.target_latency:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            else:
+                now = self._clock()
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+            self._condition.notify_all()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    '''Converte o cabeçalho Retry-After (segundos ou data HTTP) em segundos de espera.'''
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class CrawlController:
+    '''
+    Camada HTTP do scraper: concorrência adaptativa, novas tentativas e backoff.
+
+    Falhas transitórias (erros de conexão, timeouts e status em RETRY_STATUSES) são repetidas
+    até max_retries vezes, aguardando o Retry-After informado pelo servidor ou, na ausência
+    dele, um backoff exponencial com jitter completo. Com um ResponseCache, as respostas já
+    armazenadas são reproduzidas do disco sem acessar a rede. Com um ScrapeMetrics, latência,
+    bytes, erros e novas tentativas de cada requisição são registrados.
+    '''
+    def __init__(
+        self,
+        limiter: Optional[AdaptiveLimiter] = None,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+        jitter: Callable[[float, float], float] = random.uniform,
+        cache: Optional[ResponseCache] = None,
+        metrics: Optional[ScrapeMetrics] = None
+    ):
+        self.limiter = limiter or AdaptiveLimiter()
+        self.cache = cache
+        self.metrics = metrics
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sleep = sleep
+        self._jitter = jitter
+
+    @classmethod
+    def from_config(cls, config=Config, metrics: Optional[ScrapeMetrics] = None) -> 'CrawlController':
+        '''Cria o controlador com os parâmetros SCRAPER_* da configuração.'''
+        limiter = AdaptiveLimiter(
+            initial=config.SCRAPER_INITIAL_CONCURRENCY,
+            maximum=config.SCRAPER_MAX_CONCURRENCY,
+            target_latency=config.SCRAPER_TARGET_LATENCY
+        )
+        return cls(limiter=limiter, max_retries=config.SCRAPER_MAX_RETRIES, cache=ResponseCache.from_config(config), metrics=metrics)
+
+    def backoff(self, attempt: int) -> float:
+        '''Tempo de espera antes da tentativa attempt + 1 (backoff exponencial com jitter completo).'''
+        return self._jitter(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def fetch(self, url: str, timeout: float = 10) -> requests.Response:
+        '''
+        Executa um GET respeitando o limite de concorrência e repetindo falhas transitórias.
+
+        Raises:
+            requests.exceptions.RequestException: Se a requisição falhar de forma definitiva
+                ou se as tentativas se esgotarem.
+        '''
+        if self.cache is not None:
+            cached = self.cache.get(url)
+            if cached is not None:
+                if self.metrics is not None:
+                    self.metrics.observe_cache_hit()
+                return cached
+
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            start = time.monotonic()
+            response, error, success = None, None, False
+            try:
+                response = requests.get(url, timeout=timeout)
+                success = response.status_code not in RETRY_STATUSES
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+            finally:
+                latency = time.monotonic() - start
+                self.limiter.release(latency, success)
+                if self.metrics is not None:
+                    self.metrics.observe_request(
+                        latency,
+                        len(response.content) if response is not None and isinstance(response.content, bytes) else 0,
+                        response.status_code if response is not None else None
+                    )
+
+            if success:
+                response.raise_for_status()
+                if self.cache is not None:
+                    self.cache.put(url, response)
+                return response
+            if attempt >= self.max_retries:
+                if error is not None:
+                    raise error
+                response.raise_for_status()
+                raise requests.exceptions.HTTPError(f'{response.status_code} para url: {url}', response=response)
+
+            delay = None
+            if response is not None:
+                delay = parse_retry_after(response.headers.get('Retry-After'))
+            delay = min(delay, RETRY_AFTER_MAX) if delay is not None else self.backoff(attempt)
+            attempt += 1
+            if self.metrics is not None:
+                self.metrics.observe_retry()
+            logger.warning(
+                f'Falha transitória em {url} ({error or response.status_code}). '
+                f'Tentativa {attempt}/{self.max_retries} em {delay:.2f}s.'
+            )
+            self._sleep(delay)
+
+    def map(self, fn: Callable[[T], R], items: Iterable[T]) -> Iterator[R]:
+        '''
+        Aplica fn a cada item em paralelo, preservando a ordem dos resultados.
+
+        O número de threads é o limite máximo de concorrência; o número efetivo de
+        requisições simultâneas é controlado pelo AdaptiveLimiter em fetch.
+        '''
+        items = list(items)
+        if len(items) <= 1:
+            yield from map(fn, items)
+            return
+        with ThreadPoolExecutor(max_workers=min(self.limiter.maximum, len(items))) as executor:
+            yield from executor.map(fn, items)
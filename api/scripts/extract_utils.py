@@ -0,0 +1,176 @@
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+import soupsieve
+from bs4 import BeautifulSoup
+from api.config import Config
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  #lxml é opcional
+    lxml = None
+
+
+logger = logging.getLogger(__name__)
+
+#marcadores das subárvores de interesse; o restante da página (cabeçalho, menus, scripts) é descartado
+PRODUCT_PAGE_BOUNDS = ('<article class="product_page"', '</article>')
+CATEGORY_PAGE_BOUNDS = ('<section>', '</section>')
+
+
+def slice_html(html: str, bounds: Tuple[str, str]) -> str:
+    '''
+    Recorta do HTML apenas o trecho entre os marcadores informados (inclusive).
+
+    Retorna o documento inteiro caso algum dos marcadores não seja encontrado.
+    '''
+    start_marker, end_marker = bounds
+    start = html.find(start_marker)
+    if start == -1:
+        return html
+    end = html.find(end_marker, start)
+    if end == -1:
+        return html
+    return html[start:end + len(end_marker)]
+
+
+class BookPageExtractor(ABC):
+    '''
+    Interface dos extratores de páginas do books.toscrape.com.
+
+    Os extratores devolvem apenas os textos brutos das páginas; a limpeza e a montagem do
+    registro do livro ficam em scrape_utils, garantindo o mesmo resultado em todos os backends.
+    '''
+    name = None
+
+    @abstractmethod
+    def parse_categories(self, html: str) -> List[Tuple[str, str]]:
+        '''Retorna a lista de (nome, link relativo) das categorias da página inicial.'''
+
+    @abstractmethod
+    def parse_category_page(self, html: str) -> Tuple[List[str], Optional[str]]:
+        '''Retorna os links relativos dos livros da página e o link da próxima página (ou None).'''
+
+    @abstractmethod
+    def parse_book_page(self, html: str) -> Dict[str, Any]:
+        '''
+        Retorna os campos brutos da página de detalhes de um livro.
+
+        Chaves: image_src, title, price, description (ou None), rating (ou None) e
+        table (textos das células da tabela de informações do produto).
+        '''
+
+
+class SoupExtractor(BookPageExtractor):
+    '''Extrator baseado em BeautifulSoup (html.parser) com seletores CSS pré-compilados.'''
+    name = 'html.parser'
+
+    CATEGORY_LINKS = soupsieve.compile('ul.nav.nav-list > li > ul > li > a')
+    BOOK_LINKS = soupsieve.compile('article.product_pod h3 > a')
+    NEXT_LINK = soupsieve.compile('li.next > a')
+    IMAGE = soupsieve.compile('div.item.active img')
+    TITLE = soupsieve.compile('h1')
+    PRICE = soupsieve.compile('p.price_color')
+    DESCRIPTION = soupsieve.compile('div#product_description ~ p')
+    RATING = soupsieve.compile('p.star-rating')
+    TABLE_CELLS = soupsieve.compile('table.table-striped td')
+
+    def _soup(self, html: str) -> BeautifulSoup:
+        return BeautifulSoup(html, 'html.parser')
+
+    def parse_categories(self, html):
+        soup = self._soup(html)
+        return [(tag_a.text.strip(), tag_a['href']) for tag_a in self.CATEGORY_LINKS.select(soup)]
+
+    def parse_category_page(self, html):
+        soup = self._soup(slice_html(html, CATEGORY_PAGE_BOUNDS))
+        links = [tag_a['href'] for tag_a in self.BOOK_LINKS.select(soup)]
+        next_tag = self.NEXT_LINK.select_one(soup)
+        return links, (next_tag['href'] if next_tag else None)
+
+    def parse_book_page(self, html):
+        soup = self._soup(slice_html(html, PRODUCT_PAGE_BOUNDS))
+        description_tag = self.DESCRIPTION.select_one(soup)
+        rating_tag = self.RATING.select_one(soup)
+        return {
+            'image_src': self.IMAGE.select_one(soup)['src'],
+            'title': self.TITLE.select_one(soup).text,
+            'price': self.PRICE.select_one(soup).text,
+            'description': description_tag.text if description_tag else None,
+            'rating': rating_tag['class'][1] if rating_tag else None,
+            'table': [td.text for td in self.TABLE_CELLS.select(soup)]
+        }
+
+
+def _has_class(name: str) -> str:
+    '''Predicado XPath equivalente ao seletor CSS de classe (.name).'''
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class LxmlExtractor(BookPageExtractor):
+    '''Extrator baseado em lxml com expressões XPath pré-compiladas.'''
+    name = 'lxml'
+
+    if lxml is not None:
+        CATEGORY_LINKS = etree.XPath(f"descendant-or-self::ul[{_has_class('nav-list')}]/li/ul/li/a")
+        BOOK_LINKS = etree.XPath(f"descendant-or-self::article[{_has_class('product_pod')}]//h3/a/@href")
+        NEXT_LINK = etree.XPath(f"descendant-or-self::li[{_has_class('next')}]/a/@href")
+        IMAGE = etree.XPath(f"descendant-or-self::div[{_has_class('item')} and {_has_class('active')}]//img/@src")
+        TITLE = etree.XPath('descendant-or-self::h1')
+        PRICE = etree.XPath(f"descendant-or-self::p[{_has_class('price_color')}]")
+        DESCRIPTION = etree.XPath("descendant-or-self::div[@id='product_description']/following-sibling::p[1]")
+        RATING = etree.XPath(f"descendant-or-self::p[{_has_class('star-rating')}]/@class")
+        TABLE_CELLS = etree.XPath(f"descendant-or-self::table[{_has_class('table-striped')}]//td")
+
+    def parse_categories(self, html):
+        root = lxml.html.fromstring(html)
+        return [(tag_a.text_content().strip(), tag_a.get('href')) for tag_a in self.CATEGORY_LINKS(root)]
+
+    def parse_category_page(self, html):
+        root = lxml.html.fromstring(slice_html(html, CATEGORY_PAGE_BOUNDS))
+        next_links = self.NEXT_LINK(root)
+        return list(self.BOOK_LINKS(root)), (next_links[0] if next_links else None)
+
+    def parse_book_page(self, html):
+        root = lxml.html.fromstring(slice_html(html, PRODUCT_PAGE_BOUNDS))
+        description = self.DESCRIPTION(root)
+        rating = self.RATING(root)
+        return {
+            'image_src': self.IMAGE(root)[0],
+            'title': self.TITLE(root)[0].text_content(),
+            'price': self.PRICE(root)[0].text_content(),
+            'description': description[0].text_content() if description else None,
+            'rating': rating[0].split()[1] if rating else None,
+            'table': [td.text_content() for td in self.TABLE_CELLS(root)]
+        }
+
+
+EXTRACTORS = {
+    SoupExtractor.name: SoupExtractor,
+    LxmlExtractor.name: LxmlExtractor
+}
+
+_instances = {}
+
+
+def available_extractors() -> List[str]:
+    '''Retorna os nomes dos backends de extração utilizáveis no ambiente atual.'''
+    return [name for name in EXTRACTORS if name != LxmlExtractor.name or lxml is not None]
+
+
+def get_extractor(name: Optional[str] = None) -> BookPageExtractor:
+    '''
+    Retorna o extrator do backend informado (ou de Config.SCRAPER_PARSER).
+
+    Caso o lxml não esteja instalado, utiliza o backend html.parser.
+    '''
+    name = name or Config.SCRAPER_PARSER
+    if name not in EXTRACTORS:
+        raise ValueError(f'Backend de extração desconhecido: {name}. Opções: {sorted(EXTRACTORS)}')
+    if name not in available_extractors():
+        logger.warning(f'Backend {name} indisponível (lxml não instalado). Utilizando html.parser.')
+        name = SoupExtractor.name
+    if name not in _instances:
+        _instances[name] = EXTRACTORS[name]()
+    return _instances[name]
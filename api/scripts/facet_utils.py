@@ -0,0 +1,149 @@
+import logging
+from typing import Dict, List, Optional, Sequence
+from flask import current_app
+from sqlalchemy import case, func, literal, literal_column
+from api.config import Config
+from api.extensions import db
+from api.models.books import Books, RATING_VALUES
+from api.models.genres import Genre
+from api.scripts.pagination_utils import Page, decode_cursor, paginate
+from api.scripts.search_utils import SEARCH_LIKE, after_keyset, build_ranked_subquery, get_include_description, get_search_backend, tokenize
+from api.scripts.serialization_utils import book_columns, serialize_rows, with_keys
+
+
+logger = logging.getLogger(__name__)
+
+#cursor da busca facetada: (relevância, título, id) do último livro da página; sem título, a relevância é 0
+FACET_CURSOR_TYPES = (float, str, int)
+#campos de cada resultado: os das listagens, mais a avaliação (uma das facetas)
+FACET_RESULT_FIELDS = ('id', 'upc', 'title', 'genre', 'price', 'rating', 'image_url')
+
+
+def price_bucket_expression(edges: Sequence[float]):
+    '''
+    Expressão com a faixa de preço de cada livro: 0 para price < edges[0], i para edges[i-1] <= price < edges[i]
+    e len(edges) a partir do último limite. Os valores são escritos na própria consulta (e não como
+    parâmetros) para que a expressão do SELECT seja idêntica à do GROUP BY no Postgres.
+    '''
+    return case(
+        *[(Books.price < literal_column(repr(float(edge))), literal_column(str(index))) for index, edge in enumerate(edges)],
+        else_=literal_column(str(len(edges)))
+    )
+
+
+def faceted_search(
+    title: Optional[str] = None,
+    genres: Optional[List[str]] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_rating: Optional[int] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_description: Optional[bool] = None,
+    price_edges: Optional[Sequence[float]] = None,
+    fields: Optional[Sequence[str]] = None
+) -> Dict:
+    '''
+    Busca livros combinando título (índice de texto completo), gêneros, faixa de preço e avaliação
+    mínima, e conta os resultados por gênero, avaliação e faixa de preço.
+
+    As contagens das três facetas vêm de uma única consulta agregada, agrupada pela combinação
+    (gênero, rating_value, faixa de preço), somada por faceta em Python; a página de resultados é
+    uma segunda consulta com os mesmos filtros, paginada por chave como search_utils.search_books.
+
+    Args:
+        title (str, optional): Termo buscado no título (prefixos, como em /search).
+        genres (list, optional): Gêneros aceitos (correspondência exata).
+        min_price (float, optional): Preço mínimo (inclusivo).
+        max_price (float, optional): Preço máximo (inclusivo).
+        min_rating (int, optional): Avaliação mínima, de 1 (One) a 5 (Five).
+        limit (int, optional): Tamanho da página; None retorna todos os resultados.
+        cursor (str, optional): Cursor da página anterior.
+        include_description (bool, optional): Se o termo do título também é buscado na descrição.
+            Padrão é SEARCH_INCLUDE_DESCRIPTION da configuração.
+        price_edges (sequence, optional): Limites das faixas de preço das facetas. Padrão é
+            FACET_PRICE_EDGES da configuração.
+        fields (sequence, optional): Campos de cada resultado (de BOOK_LIST_FIELDS). Padrão é FACET_RESULT_FIELDS.
+
+    Returns:
+        dict: total (quantidade de resultados), results (Page com a página de resultados, do mais
+              para o menos relevante ou em ordem de título) e facets (genre, rating e price).
+
+    Raises:
+        PaginationError: Se o cursor for inválido.
+    '''
+    after = decode_cursor(cursor, FACET_CURSOR_TYPES) if cursor else None
+    include_description = get_include_description(include_description)
+    if price_edges is None:
+        price_edges = current_app.config.get('FACET_PRICE_EDGES', Config.FACET_PRICE_EDGES)
+    title_tokens = tokenize(title)
+    filters, ranked, rank = [], None, literal(0.0)
+    if title_tokens:
+        backend = get_search_backend()
+        if backend == SEARCH_LIKE:
+            filters.append(Books.title.ilike(f'%{title}%'))
+        else:
+            ranked = build_ranked_subquery(backend, title_tokens, [], include_description)
+            rank = ranked.c.rank
+    if genres:
+        filters.append(Books.genre_id.in_(db.select(Genre.id).where(Genre.name.in_(genres))))
+    if min_price is not None:
+        filters.append(Books.price >= min_price)
+    if max_price is not None:
+        filters.append(Books.price <= max_price)
+    if min_rating is not None:
+        filters.append(Books.rating_value >= min_rating)
+
+    def filtered(query):
+        if ranked is not None:
+            query = query.join(ranked, ranked.c.id == Books.id)
+        return query.filter(*filters)
+
+    bucket = price_bucket_expression(price_edges)
+    #o agrupamento usa o id inteiro do gênero; os nomes vêm da tabela genres, com uma linha por gênero
+    groups = (
+        filtered(db.session.query(Books.genre_id, Books.rating_value, bucket, func.count()).select_from(Books))
+        .group_by(Books.genre_id, Books.rating_value, bucket)
+        .all()
+    )
+    genre_names = dict(db.session.query(Genre.id, Genre.name).all())
+    groups = [(genre_names[genre_id], rating_value, bucket, count) for genre_id, rating_value, bucket, count in groups]
+
+    fields = fields or FACET_RESULT_FIELDS
+    query = filtered(db.session.query(*book_columns(with_keys(fields, ('title', 'id'))), rank.label('rank')).select_from(Books))
+    if after:
+        query = query.filter(after_keyset(rank, after))
+    query = query.order_by(rank.desc(), Books.title.asc(), Books.id.asc())
+    rows = paginate((query.limit(limit + 1) if limit else query).all(), limit, lambda row: (row.rank, row.title, row.id))
+    results = serialize_rows(rows, fields)
+    if title_tokens:
+        for result, row in zip(results, rows):
+            result['rank'] = round(row.rank, 6)
+
+    return {
+        'total': sum(count for _, _, _, count in groups),
+        'results': Page(results, rows.next_cursor),
+        'facets': _count_facets(groups, price_edges)
+    }
+
+
+def _count_facets(groups, price_edges: Sequence[float]) -> Dict[str, List[Dict]]:
+    '''Soma as contagens por (gênero, rating_value, faixa de preço) em cada faceta.'''
+    rating_labels = {value: label for label, value in RATING_VALUES.items()}
+    genres, ratings, prices = {}, {}, [0] * (len(price_edges) + 1)
+    for genre, rating_value, bucket, count in groups:
+        genres[genre] = genres.get(genre, 0) + count
+        ratings[rating_value] = ratings.get(rating_value, 0) + count
+        prices[int(bucket)] += count
+    bounds = [None, *price_edges, None]
+    return {
+        'genre': [{'value': genre, 'count': count} for genre, count in sorted(genres.items(), key=lambda item: (-item[1], item[0]))],
+        'rating': [
+            {'value': rating_labels.get(value, 'No Rating'), 'count': ratings[value]}
+            for value in sorted(ratings, key=lambda value: -(value or 0))
+        ],
+        'price': [
+            {'min': bounds[index], 'max': bounds[index + 1], 'count': count}
+            for index, count in enumerate(prices)
+        ]
+    }
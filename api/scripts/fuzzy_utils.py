@@ -0,0 +1,170 @@
+import logging
+import re
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple
+import numpy as np
+from flask import current_app
+from sqlalchemy import func
+from api.config import Config
+from api.extensions import db
+from api.models.books import Books
+from api.scripts.load_utils import get_dialect_name
+from api.scripts.catalog_cache_utils import get_catalog_cached
+
+
+logger = logging.getLogger(__name__)
+
+#palavras: sequências de letras e dígitos, como no pg_trgm
+WORD_PATTERN = re.compile(r'[^\W_]+')
+
+#índices de listas de candidatos de resolve_title (e.g., títulos do modelo de recomendação treinado): {nome: (versão, índice)}
+_candidates_indexes = {}
+_candidates_lock = threading.Lock()
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    '''
+    Trigramas do texto, no mesmo formato do pg_trgm: em minúsculas, cada palavra é prefixada
+    com dois espaços e sufixada com um (e.g., "cat" gera "  c", " ca", "cat" e "at ").
+    '''
+    result = set()
+    for word in WORD_PATTERN.findall(text.lower()):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(result)
+
+
+class TrigramIndex:
+    '''
+    Índice invertido de trigramas para busca aproximada (tolerante a erros de digitação).
+
+    Cada trigrama aponta para um array (NumPy) com as posições dos documentos que o contêm.
+    Uma busca concatena apenas os arrays dos trigramas da consulta e conta, com um único
+    bincount, quantos trigramas cada documento compartilha com ela; a similaridade (a mesma do
+    pg_trgm: trigramas em comum divididos pelo total de trigramas distintos das duas strings) é
+    calculada de forma vetorizada, sem percorrer os títulos em Python.
+
+    Args:
+        documents (iterable): Pares (chave, texto).
+    '''
+    def __init__(self, documents: Iterable[Tuple[object, str]]):
+        self.keys = []
+        self.texts = []
+        sizes = []
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for key, text in documents:
+            document_trigrams = trigrams(text)
+            position = len(self.keys)
+            self.keys.append(key)
+            self.texts.append(text)
+            sizes.append(len(document_trigrams))
+            for trigram in document_trigrams:
+                postings[trigram].append(position)
+        self.sizes = np.asarray(sizes, dtype=np.int32)
+        self.postings = {trigram: np.asarray(positions, dtype=np.int32) for trigram, positions in postings.items()}
+        self._key_set = set(self.keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._key_set
+
+    def search(self, query: str, limit: int = 10, threshold: float = 0.3) -> List[Tuple[object, str, float]]:
+        '''
+        Retorna até limit documentos com similaridade maior ou igual a threshold.
+
+        Returns:
+            list: Tuplas (chave, texto, similaridade), da maior para a menor similaridade (empate pelo texto).
+        '''
+        query_trigrams = trigrams(query)
+        postings = [self.postings[trigram] for trigram in query_trigrams if trigram in self.postings]
+        if not postings:
+            return []
+        shared = np.bincount(np.concatenate(postings), minlength=len(self.keys))
+        candidates = np.flatnonzero(shared)
+        shared = shared[candidates]
+        scores = shared / (len(query_trigrams) + self.sizes[candidates] - shared)
+        selected = scores >= threshold
+        matches = [
+            (self.keys[position], self.texts[position], float(score))
+            for position, score in zip(candidates[selected].tolist(), scores[selected].tolist())
+        ]
+        matches.sort(key=lambda match: (-match[2], match[1]))
+        return matches[:limit]
+
+
+def get_title_index() -> TrigramIndex:
+    '''
+    Retorna o índice de trigramas dos títulos de books mantido em memória, reconstruído quando
+    a versão do catálogo muda (ver catalog_cache_utils.get_catalog_cached).
+    '''
+    return get_catalog_cached('Índice de trigramas dos títulos', lambda: TrigramIndex(db.session.query(Books.id, Books.title).all()))
+
+
+def find_similar_titles(
+    title: str,
+    limit: Optional[int] = None,
+    threshold: Optional[float] = None
+) -> List[Tuple[int, str, float]]:
+    '''
+    Busca os livros cujo título é mais parecido com o informado, tolerando erros de digitação.
+
+    No Postgres usa o operador % do pg_trgm, servido pelo índice GIN ix_books_title_trgm; nos
+    demais bancos, o índice de trigramas em memória (get_title_index). Sem limit e threshold,
+    usa SEARCH_FUZZY_LIMIT e SEARCH_FUZZY_THRESHOLD da configuração da aplicação.
+
+    Returns:
+        list: Tuplas (id, título, similaridade), da maior para a menor similaridade.
+    '''
+    limit = limit or current_app.config.get('SEARCH_FUZZY_LIMIT', Config.SEARCH_FUZZY_LIMIT)
+    if threshold is None:
+        threshold = current_app.config.get('SEARCH_FUZZY_THRESHOLD', Config.SEARCH_FUZZY_THRESHOLD)
+    if not trigrams(title):
+        return []
+    if get_dialect_name() != 'postgresql':
+        return get_title_index().search(title, limit, threshold)
+
+    #o limite do operador % é uma configuração da sessão; is_local=true vale só para a transação atual
+    db.session.execute(db.select(func.set_config('pg_trgm.similarity_threshold', str(threshold), True)))
+    score = func.similarity(Books.title, title).label('score')
+    rows = (
+        db.session.query(Books.id, Books.title, score)
+        .filter(Books.title.op('%')(title))
+        .order_by(score.desc(), Books.title.asc())
+        .limit(limit)
+        .all()
+    )
+    return [(row.id, row.title, row.score) for row in rows]
+
+
+def get_candidates_index(name: str, version: Hashable, candidates: Callable[[], Iterable[str]]) -> TrigramIndex:
+    '''
+    Retorna o índice de trigramas da lista de candidatos identificada por name (e.g., os títulos
+    do modelo de recomendação), montado com candidates na primeira chamada e sempre que version
+    (e.g., a data de modificação dos artefatos do modelo) mudar.
+    '''
+    with _candidates_lock:
+        entry = _candidates_indexes.get(name)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+    index = TrigramIndex((candidate, candidate) for candidate in candidates())
+    with _candidates_lock:
+        _candidates_indexes[name] = (version, index)
+    logger.info(f'{name} reconstruído para a versão {version} em {len(index)} candidatos.')
+    return index
+
+
+def resolve_title(title: str, index: TrigramIndex, threshold: Optional[float] = None) -> Optional[str]:
+    '''
+    Retorna o candidato do índice (ver get_candidates_index) mais parecido com title (o próprio
+    title se estiver entre os candidatos), ou None. Sem threshold, usa SEARCH_FUZZY_THRESHOLD.
+    '''
+    if threshold is None:
+        threshold = current_app.config.get('SEARCH_FUZZY_THRESHOLD', Config.SEARCH_FUZZY_THRESHOLD)
+    if title in index:
+        return title
+    matches = index.search(title, limit=1, threshold=threshold)
+    return matches[0][0] if matches else None
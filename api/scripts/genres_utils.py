@@ -1,6 +1,7 @@
 import logging
-from sqlalchemy import distinct
-from api.models.books import Books
+from api.extensions import db
+from api.models.genres import Genre
+from api.scripts.catalog_snapshot_utils import get_catalog_snapshot
 
 
 logger = logging.getLogger('__name__')
@@ -14,9 +15,11 @@ def get_all_genres():
         list: Uma lista de dicionários.
     '''
     try:
-        categories = (
-            Books.query.with_entities(distinct(Books.genre)).order_by(Books.genre.asc()).all()
-        )
+        snapshot = get_catalog_snapshot()
+        if snapshot is not None:
+            return [{'genre': genre} for genre in snapshot.genres]
+        #uma linha por gênero na tabela genres, lida em ordem pelo índice ix_genres_name
+        categories = db.session.query(Genre.name).order_by(Genre.name.asc()).all()
         results = [{'genre': c[0]} for c in categories]
         return results
     except Exception as e:
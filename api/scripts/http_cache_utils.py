@@ -0,0 +1,205 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Optional
+import requests
+from requests.structures import CaseInsensitiveDict
+from api.config import Config
+
+
+logger = logging.getLogger(__name__)
+
+#cabeçalhos preservados nas respostas reproduzidas do cache
+CACHED_HEADERS = ('Content-Type', 'Last-Modified', 'ETag')
+#após uma limpeza por tamanho, o cache fica com no máximo esta fração de max_bytes
+EVICTION_TARGET = 0.9
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    '''Grava o arquivo via arquivo temporário + os.replace, evitando leituras de arquivos incompletos.'''
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ResponseCache:
+    '''
+    Cache em disco das respostas HTTP do scraper, endereçado por conteúdo.
+
+    Os corpos das respostas são gravados uma única vez em objects/, nomeados pelo SHA-256 do
+    conteúdo (páginas idênticas em URLs diferentes ocupam o espaço de uma só), e o índice em
+    index/ associa o SHA-256 da URL ao objeto e à data da coleta. Entradas mais antigas que
+    ttl segundos são ignoradas e, quando o total de objetos ultrapassa max_bytes, os menos
+    usados recentemente são removidos.
+
+    Args:
+        directory (str): Diretório do cache.
+        ttl (float): Validade das respostas, em segundos.
+        max_bytes (int): Tamanho máximo dos objetos em disco, em bytes.
+    '''
+    def __init__(
+        self,
+        directory: str,
+        ttl: float = 86400,
+        max_bytes: int = 512 * 2**20,
+        clock: Callable[[], float] = time.time
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._objects_dir = os.path.join(directory, 'objects')
+        self._index_dir = os.path.join(directory, 'index')
+        os.makedirs(self._objects_dir, exist_ok=True)
+        os.makedirs(self._index_dir, exist_ok=True)
+        self._size = sum(size for _, _, size in self._iter_objects())
+
+    @classmethod
+    def from_config(cls, config=Config) -> Optional['ResponseCache']:
+        '''Cria o cache a partir de SCRAPER_CACHE_DIR (ou retorna None se o cache estiver desativado).'''
+        if not config.SCRAPER_CACHE_DIR:
+            return None
+        return cls(config.SCRAPER_CACHE_DIR, ttl=config.SCRAPER_CACHE_TTL, max_bytes=config.SCRAPER_CACHE_MAX_BYTES)
+
+    @property
+    def size(self) -> int:
+        '''Tamanho aproximado dos objetos em disco, em bytes.'''
+        return self._size
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self._objects_dir, digest[:2], digest)
+
+    def _index_path(self, url: str) -> str:
+        digest = _sha256(url.encode('utf-8'))
+        return os.path.join(self._index_dir, digest[:2], digest + '.json')
+
+    def _iter_objects(self):
+        for root, _, files in os.walk(self._objects_dir):
+            for name in files:
+                if name.startswith('.tmp-'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def _read_entry(self, url: str) -> Optional[dict]:
+        try:
+            with open(self._index_path(url), encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def get(self, url: str) -> Optional[requests.Response]:
+        '''Retorna a resposta armazenada para a URL, ou None se ausente ou expirada.'''
+        entry = self._read_entry(url)
+        if entry is None or self._clock() - entry['fetched_at'] > self.ttl:
+            self.misses += 1
+            return None
+        path = self._object_path(entry['sha256'])
+        try:
+            with open(path, 'rb') as file:
+                content = file.read()
+            #o mtime do objeto marca o último uso, base da remoção por tamanho (LRU)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        response = requests.Response()
+        response._content = content
+        response.status_code = entry['status_code']
+        response.url = url
+        response.encoding = entry.get('encoding')
+        response.headers = CaseInsensitiveDict(entry.get('headers', {}))
+        return response
+
+    def put(self, url: str, response: requests.Response) -> None:
+        '''Armazena a resposta (apenas status 200 com corpo em bytes).'''
+        content = response.content
+        if response.status_code != 200 or not isinstance(content, bytes):
+            return
+        digest = _sha256(content)
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            _write_atomic(path, content)
+            with self._lock:
+                self._size += len(content)
+
+        entry = {
+            'url': url,
+            'sha256': digest,
+            'status_code': response.status_code,
+            'encoding': response.encoding,
+            'headers': {key: response.headers[key] for key in CACHED_HEADERS if key in response.headers},
+            'fetched_at': self._clock()
+        }
+        _write_atomic(self._index_path(url), json.dumps(entry).encode('utf-8'))
+
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> int:
+        '''
+        Remove os objetos usados há mais tempo até que o cache caiba em EVICTION_TARGET * max_bytes,
+        junto com as entradas do índice expiradas ou que apontem para objetos removidos.
+
+        Returns:
+            int: O número de bytes liberados.
+        '''
+        with self._lock:
+            objects = sorted(self._iter_objects(), key=lambda item: item[1])
+            size = sum(item[2] for item in objects)
+            freed = 0
+            target = self.max_bytes * EVICTION_TARGET
+            for path, _, object_size in objects:
+                if size - freed <= target:
+                    break
+                try:
+                    os.remove(path)
+                    freed += object_size
+                except FileNotFoundError:
+                    pass
+            self._size = size - freed
+
+            now = self._clock()
+            for root, _, files in os.walk(self._index_dir):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        with open(path, encoding='utf-8') as file:
+                            entry = json.load(file)
+                    except (FileNotFoundError, json.JSONDecodeError):
+                        continue
+                    if now - entry['fetched_at'] > self.ttl or not os.path.exists(self._object_path(entry['sha256'])):
+                        try:
+                            os.remove(path)
+                        except FileNotFoundError:
+                            pass
+
+        if freed:
+            logger.info(f'Cache HTTP: {freed / 2**20:.1f} MiB liberados.')
+        return freed
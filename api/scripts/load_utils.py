@@ -0,0 +1,362 @@
+import csv
+import io
+import logging
+import itertools
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+import pandas as pd
+from datetime import datetime
+from sqlalchemy import delete, insert, text
+from sqlalchemy.dialects import postgresql, sqlite
+from api.extensions import db
+from api.models.book_details import BOOK_DETAIL_COLUMNS, BookDetails
+from api.models.books import Books
+from api.models.catalog_version import CatalogVersion
+from api.models.genres import Genre
+from api.scripts.catalog_stats_utils import refresh_catalog_stats
+
+
+logger = logging.getLogger(__name__)
+
+#colunas da tabela books, na mesma ordem do CSV gerado pelo scraping
+BOOK_COLUMNS = [
+    'upc',
+    'title',
+    'genre',
+    'price',
+    'availability',
+    'rating',
+    'description',
+    'product_type',
+    'price_excl_tax',
+    'price_incl_tax',
+    'tax',
+    'number_of_reviews',
+    'url',
+    'image_url'
+]
+
+#colunas gravadas em cada tabela (partição vertical): o upc liga as duas e o gênero é gravado pelo id em genres
+BOOKS_TABLE_COLUMNS = [
+    'genre_id' if column == 'genre' else column for column in BOOK_COLUMNS if column not in BOOK_DETAIL_COLUMNS
+]
+DETAILS_TABLE_COLUMNS = ['upc', *BOOK_DETAIL_COLUMNS]
+#tabela temporária em que o COPY grava as linhas do CSV antes de separá-las entre books e book_details
+COPY_STAGING_TABLE = 'books_copy_staging'
+#aspas dos identificadores no SQL do COPY
+POSTGRES_PREPARER = postgresql.dialect().identifier_preparer
+
+COPY_CHUNK_SIZE = 5000
+INSERT_CHUNK_SIZE = 1000
+#construtores de INSERT com suporte a ON CONFLICT
+DIALECT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+BooksSource = Union[pd.DataFrame, str, Iterable[Dict[str, Any]]]
+#id da linha única da tabela catalog_version
+CATALOG_VERSION_ID = 1
+
+
+class _TextStream(io.TextIOBase):
+    '''
+    Objeto file-like somente leitura sobre um iterador de strings.
+
+    Permite que o COPY FROM STDIN consuma o CSV à medida que ele é gerado,
+    sem materializar o arquivo inteiro em memória.
+    '''
+    def __init__(self, chunks: Iterator[str]):
+        self._chunks = chunks
+        self._buffer = ''
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                break
+        if size < 0:
+            data, self._buffer = self._buffer, ''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def readline(self, size: int = -1) -> str:
+        return self.read(size)
+
+
+def get_dialect_name() -> str:
+    '''Retorna o nome do dialeto do banco de dados da sessão atual (e.g., postgresql, sqlite).'''
+    return db.session.get_bind().dialect.name
+
+
+def get_dialect_insert():
+    '''
+    Retorna o construtor de INSERT do dialeto atual com suporte a ON CONFLICT
+    (Postgres e SQLite), ou None se o banco não for suportado.
+    '''
+    return DIALECT_INSERTS.get(get_dialect_name())
+
+
+def get_catalog_version() -> int:
+    '''Retorna a versão atual do catálogo de livros (0 se nunca houve gravação).'''
+    version = db.session.query(CatalogVersion.version).filter(CatalogVersion.id == CATALOG_VERSION_ID).scalar()
+    return version or 0
+
+
+def bump_catalog_version() -> None:
+    '''
+    Incrementa a versão do catálogo na transação atual, sinalizando que a tabela books mudou.
+
+    O incremento é feito no próprio banco (version = version + 1, com INSERT ... ON CONFLICT
+    no Postgres e no SQLite), de modo que gravações concorrentes (e.g., workers da fila de
+    scraping) não perdem atualizações.
+    '''
+    now = datetime.utcnow()
+    table = CatalogVersion.__table__
+    dialect_insert = get_dialect_insert()
+    if dialect_insert is not None:
+        statement = dialect_insert(table).values(id=CATALOG_VERSION_ID, version=1, updated_at=now)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={'version': table.c.version + 1, 'updated_at': now}
+        )
+        db.session.execute(statement)
+        return
+    updated = db.session.execute(
+        table.update().where(table.c.id == CATALOG_VERSION_ID).values(version=table.c.version + 1, updated_at=now)
+    ).rowcount
+    if not updated:
+        db.session.execute(insert(table).values(id=CATALOG_VERSION_ID, version=1, updated_at=now))
+
+
+def truncate_books(refresh_stats: bool = True) -> None:
+    '''
+    Remove todos os registros das tabelas books, book_details e genres.
+
+    No Postgres usa TRUNCATE (reiniciando as sequências de ids, com book_details pelo CASCADE);
+    nos demais bancos, DELETE, primeiro em books para que os triggers da busca ainda encontrem
+    as descrições e os nomes dos gêneros. Com refresh_stats False, as estatísticas do catálogo
+    não são recalculadas (ver bulk_load_books).
+    '''
+    if get_dialect_name() == 'postgresql':
+        db.session.execute(text(f'TRUNCATE TABLE {Books.__tablename__}, {Genre.__tablename__} RESTART IDENTITY CASCADE;'))
+    else:
+        db.session.execute(text(f'DELETE FROM {Books.__tablename__};'))
+        db.session.execute(text(f'DELETE FROM {BookDetails.__tablename__};'))
+        db.session.execute(text(f'DELETE FROM {Genre.__tablename__};'))
+    bump_catalog_version()
+    if refresh_stats:
+        refresh_catalog_stats()
+
+
+def _check_columns(columns: Iterable[str], source: str) -> None:
+    '''Levanta ValueError se alguma das colunas de books estiver ausente da origem dos dados.'''
+    missing = set(BOOK_COLUMNS) - set(columns)
+    if missing:
+        raise ValueError(f'Colunas ausentes em {source}: {sorted(missing)}')
+
+
+def _iter_record_chunks(source: BooksSource, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    '''
+    Percorre a origem dos dados em blocos de no máximo chunk_size registros, apenas com as
+    colunas de BOOK_COLUMNS (colunas extras de um DataFrame ou CSV são ignoradas).
+    '''
+    if isinstance(source, pd.DataFrame):
+        _check_columns(source.columns, 'DataFrame')
+        for start in range(0, len(source), chunk_size):
+            yield source.iloc[start:start + chunk_size].reindex(columns=BOOK_COLUMNS).to_dict(orient='records')
+    elif isinstance(source, str):
+        for chunk in pd.read_csv(source, chunksize=chunk_size, keep_default_na=False):
+            _check_columns(chunk.columns, f'arquivo {source}')
+            yield chunk.reindex(columns=BOOK_COLUMNS).to_dict(orient='records')
+    else:
+        iterator = iter(source)
+        while True:
+            chunk = list(itertools.islice(iterator, chunk_size))
+            if not chunk:
+                break
+            yield [{column: record.get(column) for column in BOOK_COLUMNS} for record in chunk]
+
+
+def resolve_genre_ids(names: Iterable[str]) -> Dict[str, int]:
+    '''
+    Retorna o id de cada gênero em genres, inserindo os gêneros ainda não cadastrados.
+
+    No Postgres e no SQLite a inserção usa INSERT ... ON CONFLICT (name) DO NOTHING, de modo
+    que cargas concorrentes não falham ao cadastrar o mesmo gênero.
+    '''
+    names = sorted(set(names))
+    if not names:
+        return {}
+    table = Genre.__table__
+    dialect_insert = get_dialect_insert()
+    if dialect_insert is not None:
+        statement = dialect_insert(table).on_conflict_do_nothing(index_elements=[table.c.name])
+        db.session.execute(statement, [{'name': name} for name in names])
+    else:
+        existing = set(db.session.scalars(db.select(table.c.name).where(table.c.name.in_(names))))
+        missing = [{'name': name} for name in names if name not in existing]
+        if missing:
+            db.session.execute(insert(table), missing)
+    return dict(db.session.execute(db.select(table.c.name, table.c.id).where(table.c.name.in_(names))).all())
+
+
+def prune_genres() -> None:
+    '''Remove de genres os gêneros que deixaram de ter livros.'''
+    db.session.execute(
+        delete(Genre.__table__).where(~db.exists().where(Books.__table__.c.genre_id == Genre.__table__.c.id))
+    )
+
+
+def _split_records(records: List[Dict[str, Any]]):
+    '''Separa os registros nas linhas de books (com o id do gênero) e de book_details.'''
+    genre_ids = resolve_genre_ids(record['genre'] for record in records)
+    records = [dict(record, genre_id=genre_ids[record['genre']]) for record in records]
+    books = [{column: record[column] for column in BOOKS_TABLE_COLUMNS} for record in records]
+    details = [{column: record[column] for column in DETAILS_TABLE_COLUMNS} for record in records]
+    return books, details
+
+
+def _iter_csv_chunks(source: BooksSource, chunk_size: int) -> Iterator[str]:
+    '''Serializa a origem dos dados em blocos de texto CSV (sem cabeçalho).'''
+    for records in _iter_record_chunks(source, chunk_size):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in records:
+            writer.writerow([record[column] for column in BOOK_COLUMNS])
+        yield buffer.getvalue()
+
+
+def _quote(identifier: str) -> str:
+    '''Identificador entre aspas duplas para o SQL montado à mão do COPY (Postgres).'''
+    return POSTGRES_PREPARER.quote_identifier(identifier)
+
+
+def _copy_books(source: BooksSource, chunk_size: int) -> int:
+    '''
+    Carrega os registros via COPY ... FROM STDIN usando a conexão psycopg2 da sessão.
+
+    O COPY grava em uma tabela temporária com as colunas de BOOK_COLUMNS (e os tipos de books,
+    book_details e genres), de onde os gêneros novos são cadastrados e as linhas são separadas
+    entre books e book_details com INSERT ... SELECT. A lista de colunas do COPY é sempre
+    BOOK_COLUMNS, nunca o cabeçalho do CSV: um CSV é relido e serializado nessa ordem.
+    '''
+    raw_connection = db.session.connection().connection.dbapi_connection
+    staging, books, details, genres = (
+        _quote(table) for table in (COPY_STAGING_TABLE, Books.__tablename__, BookDetails.__tablename__, Genre.__tablename__)
+    )
+    columns = ', '.join(_quote(column) for column in BOOK_COLUMNS)
+    staging_columns = ', '.join(
+        f'g.name AS {_quote(column)}' if column == 'genre' else f'{"d" if column in BOOK_DETAIL_COLUMNS else "b"}.{_quote(column)}'
+        for column in BOOK_COLUMNS
+    )
+    books_columns = ', '.join(_quote(column) for column in BOOKS_TABLE_COLUMNS)
+    books_values = ', '.join('g.id' if column == 'genre_id' else f's.{_quote(column)}' for column in BOOKS_TABLE_COLUMNS)
+    details_columns = ', '.join(_quote(column) for column in DETAILS_TABLE_COLUMNS)
+    with raw_connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT {staging_columns} '
+            f'FROM {books} b JOIN {details} d ON d.upc = b.upc '
+            f'JOIN {genres} g ON g.id = b.genre_id WITH NO DATA'
+        )
+        cursor.copy_expert(
+            f'COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)',
+            _TextStream(_iter_csv_chunks(source, chunk_size))
+        )
+        total = cursor.rowcount
+        cursor.execute(f'INSERT INTO {genres} (name) SELECT DISTINCT genre FROM {staging} ON CONFLICT (name) DO NOTHING')
+        cursor.execute(
+            f'INSERT INTO {books} ({books_columns}) SELECT {books_values} FROM {staging} s '
+            f'JOIN {genres} g ON g.name = s.genre'
+        )
+        cursor.execute(f'INSERT INTO {details} ({details_columns}) SELECT {details_columns} FROM {staging}')
+        cursor.execute(f'DROP TABLE {staging}')
+        return total
+
+
+def _insert_books(source: BooksSource, chunk_size: int) -> int:
+    '''Carrega os registros com INSERTs em lote (executemany), um bloco por vez.'''
+    total = 0
+    for records in _iter_record_chunks(source, chunk_size):
+        books, details = _split_records(records)
+        db.session.execute(insert(Books.__table__), books)
+        db.session.execute(insert(BookDetails.__table__), details)
+        total += len(records)
+    return total
+
+
+def bulk_load_books(source: BooksSource, chunk_size: Optional[int] = None, refresh_stats: bool = True) -> int:
+    '''
+    Carrega livros na tabela books pelo caminho mais rápido disponível no banco de dados.
+
+    No Postgres os dados são transmitidos via COPY ... FROM STDIN (psycopg2); nos demais
+    bancos (e.g., SQLite) são inseridos via executemany em blocos. A transação não é
+    confirmada aqui: o commit fica a cargo de quem chama.
+
+    Args:
+        source (DataFrame | str | Iterable[dict]): DataFrame do scraping, caminho de um CSV
+            no formato de data/books.csv ou iterável de dicionários com as colunas de books.
+        chunk_size (int, optional): Número de registros por bloco. Padrão depende do banco.
+        refresh_stats (bool, optional): Se False, as estatísticas do catálogo não são recalculadas:
+            quem carrega o catálogo em vários lotes chama refresh_catalog_stats uma vez ao final.
+
+    Returns:
+        int: O número de registros carregados.
+    '''
+    if get_dialect_name() == 'postgresql':
+        total = _copy_books(source, chunk_size or COPY_CHUNK_SIZE)
+    else:
+        total = _insert_books(source, chunk_size or INSERT_CHUNK_SIZE)
+    bump_catalog_version()
+    if refresh_stats:
+        refresh_catalog_stats()
+    logger.info(f'{total} livros carregados na tabela {Books.__tablename__}.')
+    return total
+
+
+def upsert_books(source: BooksSource, chunk_size: Optional[int] = None, refresh_stats: bool = True) -> int:
+    '''
+    Insere ou atualiza livros nas tabelas books e book_details usando o upc como chave (cadastrando
+    os gêneros novos em genres e removendo os que ficaram sem livros).
+
+    No Postgres e no SQLite cada bloco é gravado com um INSERT ... ON CONFLICT (upc) DO UPDATE
+    por tabela; nos demais bancos, os upcs do bloco são removidos e reinseridos. Dentro de um
+    bloco prevalece a última ocorrência de cada upc. A transação não é confirmada aqui e, com
+    refresh_stats False, as estatísticas do catálogo não são recalculadas (ver bulk_load_books).
+
+    Returns:
+        int: O número de registros gravados.
+    '''
+    dialect_insert = get_dialect_insert()
+    total = 0
+    for records in _iter_record_chunks(source, chunk_size or INSERT_CHUNK_SIZE):
+        records = list({record['upc']: record for record in records}.values())
+        books, details = _split_records(records)
+        #books antes de book_details: a chave estrangeira exige o livro e os triggers da busca leem o título dele
+        tables = ((Books.__table__, books, BOOKS_TABLE_COLUMNS), (BookDetails.__table__, details, DETAILS_TABLE_COLUMNS))
+        if dialect_insert is not None:
+            for table, rows, columns in tables:
+                statement = dialect_insert(table)
+                statement = statement.on_conflict_do_update(
+                    index_elements=[table.c.upc],
+                    set_={column: statement.excluded[column] for column in columns if column != 'upc'}
+                )
+                db.session.execute(statement, rows)
+        else:
+            upcs = [record['upc'] for record in records]
+            db.session.execute(delete(BookDetails.__table__).where(BookDetails.__table__.c.upc.in_(upcs)))
+            db.session.execute(delete(Books.__table__).where(Books.__table__.c.upc.in_(upcs)))
+            for table, rows, _ in tables:
+                db.session.execute(insert(table), rows)
+        total += len(records)
+    #um livro que mudou de gênero pode ter deixado o anterior sem livros
+    prune_genres()
+    bump_catalog_version()
+    if refresh_stats:
+        refresh_catalog_stats()
+    logger.info(f'{total} livros gravados (upsert) na tabela {Books.__tablename__}.')
+    return total
@@ -0,0 +1,219 @@
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+
+logger = logging.getLogger(__name__)
+
+#limites superiores (em segundos) dos buckets dos histogramas de latência e de extração
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PARSE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+#número máximo de erros recentes mantidos para diagnóstico
+MAX_RECENT_ERRORS = 20
+
+
+class Histogram:
+    '''
+    Histograma de buckets fixos (cumulativos no snapshot, no estilo Prometheus).
+
+    Os percentis são estimados pelo limite superior do bucket que os contém, limitados ao
+    maior valor observado.
+    '''
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @classmethod
+    def from_snapshot(cls, buckets: Sequence[float], snapshot: Dict[str, Any]) -> 'Histogram':
+        '''Reconstrói o histograma a partir do seu snapshot (contagens cumulativas por bucket).'''
+        histogram = cls(buckets)
+        previous = 0
+        for index, bound in enumerate(histogram.buckets):
+            cumulative = snapshot['buckets'][f'le_{bound:g}']
+            histogram.counts[index] = cumulative - previous
+            previous = cumulative
+        histogram.counts[-1] = snapshot['count'] - previous
+        histogram.count = snapshot['count']
+        histogram.total = snapshot['sum']
+        histogram.max = snapshot['max']
+        return histogram
+
+    def merge(self, other: 'Histogram') -> None:
+        '''Soma as observações de outro histograma com os mesmos buckets.'''
+        self.counts = [count + other_count for count, other_count in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                bound = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[f'le_{bound:g}'] = cumulative
+        buckets['le_inf'] = self.count
+        return {
+            'count': self.count,
+            'sum': round(self.total, 6),
+            'mean': round(self.total / self.count, 6) if self.count else 0.0,
+            'p50': round(self.percentile(0.5), 6),
+            'p90': round(self.percentile(0.9), 6),
+            'p99': round(self.percentile(0.99), 6),
+            'max': round(self.max, 6),
+            'buckets': buckets
+        }
+
+
+class ScrapeMetrics:
+    '''
+    Métricas estruturadas de uma execução do scraping, seguras para uso entre threads.
+
+    Cobre as três etapas do pipeline: rede (latência por requisição, bytes, novas tentativas,
+    erros HTTP e acertos do cache), extração (tempo de parser por tipo de página) e gravação
+    (tempo gasto no banco/CSV), além de falhas por categoria e livros/s. O tempo somado de cada
+    etapa indica onde a coleta está limitada; o tempo de rede é a soma das requisições
+    paralelas e pode exceder o tempo total.
+    '''
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.started_at = clock()
+        self.finished_at = None
+        self.request_latency = Histogram(LATENCY_BUCKETS)
+        self.parse_time = {'category': Histogram(PARSE_BUCKETS), 'book': Histogram(PARSE_BUCKETS)}
+        self.requests = 0
+        self.bytes_downloaded = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.http_errors = Counter()
+        self.failures_by_category = Counter()
+        self.recent_errors = []
+        self.pages = 0
+        self.books = 0
+        self.write_seconds = 0.0
+        self.writes = 0
+
+    def observe_request(self, latency: float, size: int = 0, status: Optional[int] = None) -> None:
+        '''Registra uma requisição HTTP (status None indica erro de conexão ou timeout).'''
+        with self._lock:
+            self.requests += 1
+            self.request_latency.observe(latency)
+            self.bytes_downloaded += size
+            if status is None or status >= 400:
+                self.http_errors[str(status) if status is not None else 'connection'] += 1
+
+    def observe_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def observe_cache_hit(self) -> None:
+        with self._lock:
+            self.cache_hits += 1
+
+    def observe_parse(self, kind: str, seconds: float) -> None:
+        '''Registra o tempo de extração de uma página (kind: category ou book).'''
+        with self._lock:
+            self.parse_time[kind].observe(seconds)
+            if kind == 'category':
+                self.pages += 1
+
+    def observe_write(self, seconds: float, books: int) -> None:
+        '''Registra a gravação de um lote de livros (banco e/ou CSV).'''
+        with self._lock:
+            self.write_seconds += seconds
+            self.writes += 1
+            self.books += books
+
+    def record_failure(self, category: str, url: str, error: Exception) -> None:
+        '''Registra uma página que não pôde ser coletada.'''
+        with self._lock:
+            self.failures_by_category[category] += 1
+            self.recent_errors = (self.recent_errors + [{'category': category, 'url': url, 'error': str(error)}])[-MAX_RECENT_ERRORS:]
+
+    @classmethod
+    def from_snapshots(cls, snapshots: Iterable[Dict[str, Any]]) -> 'ScrapeMetrics':
+        '''
+        Combina os snapshots de várias execuções simultâneas (e.g., os workers de um job
+        distribuído) em um só: contadores e histogramas são somados e a duração é a da
+        execução mais longa.
+        '''
+        metrics = cls(clock=lambda: 0.0)
+        metrics.finished_at = 0.0
+        for snapshot in snapshots:
+            metrics.finished_at = max(metrics.finished_at, snapshot['elapsed_seconds'])
+            metrics.request_latency.merge(Histogram.from_snapshot(LATENCY_BUCKETS, snapshot['request_latency_seconds']))
+            for kind, histogram in metrics.parse_time.items():
+                histogram.merge(Histogram.from_snapshot(PARSE_BUCKETS, snapshot['parse_seconds'][kind]))
+            for name in ('requests', 'bytes_downloaded', 'retries', 'cache_hits', 'pages', 'books', 'writes'):
+                setattr(metrics, name, getattr(metrics, name) + snapshot[name])
+            metrics.write_seconds += snapshot['write_seconds']
+            metrics.http_errors.update(snapshot['http_errors'])
+            metrics.failures_by_category.update(snapshot['failures_by_category'])
+            metrics.recent_errors = (metrics.recent_errors + snapshot['recent_errors'])[-MAX_RECENT_ERRORS:]
+        return metrics
+
+    def finish(self) -> None:
+        self.finished_at = self._clock()
+
+    def snapshot(self) -> Dict[str, Any]:
+        '''Retorna as métricas atuais em um dicionário serializável em JSON.'''
+        with self._lock:
+            elapsed = (self.finished_at or self._clock()) - self.started_at
+            stages = {
+                'network': self.request_latency.total,
+                'parse': sum(histogram.total for histogram in self.parse_time.values()),
+                'write': self.write_seconds
+            }
+            return {
+                'elapsed_seconds': round(elapsed, 3),
+                'books': self.books,
+                'pages': self.pages,
+                'books_per_second': round(self.books / elapsed, 2) if elapsed else 0.0,
+                'requests': self.requests,
+                'cache_hits': self.cache_hits,
+                'bytes_downloaded': self.bytes_downloaded,
+                'retries': self.retries,
+                'http_errors': dict(self.http_errors),
+                'failures_by_category': dict(self.failures_by_category),
+                'recent_errors': list(self.recent_errors),
+                'request_latency_seconds': self.request_latency.snapshot(),
+                'parse_seconds': {kind: histogram.snapshot() for kind, histogram in self.parse_time.items()},
+                'write_seconds': round(self.write_seconds, 6),
+                'writes': self.writes,
+                'stage_seconds': {stage: round(seconds, 6) for stage, seconds in stages.items()},
+                'bottleneck': max(stages, key=stages.get) if any(stages.values()) else None
+            }
+
+    def log_summary(self) -> None:
+        snapshot = self.snapshot()
+        latency = snapshot['request_latency_seconds']
+        logger.info(
+            f'Métricas do scraping: {snapshot["books"]} livros em {snapshot["elapsed_seconds"]}s '
+            f'({snapshot["books_per_second"]} livros/s) | {snapshot["requests"]} requisições '
+            f'(p50 {latency["p50"]}s, p90 {latency["p90"]}s), {snapshot["bytes_downloaded"] / 1024:.1f} KiB, '
+            f'{snapshot["retries"]} novas tentativas, {snapshot["cache_hits"]} do cache | '
+            f'etapas (s): {snapshot["stage_seconds"]} | falhas: {snapshot["failures_by_category"]}'
+        )
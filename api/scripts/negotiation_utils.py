@@ -0,0 +1,99 @@
+import hashlib
+from typing import Any, Tuple
+from flask import Response, current_app, jsonify, request
+
+try:
+    import msgpack
+except ImportError:  #msgpack é opcional
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  #orjson é opcional
+    orjson = None
+
+
+#formatos das listagens: JSON (padrão), JSON colunar (um array por campo) e MessagePack
+JSON_MIMETYPE = 'application/json'
+COLUMNAR_MIMETYPE = 'application/vnd.columnar+json'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+
+
+def available_mimetypes() -> Tuple[str, ...]:
+    '''
+    Formatos oferecidos na negociação, em ordem de preferência: o JSON vem primeiro, de modo que
+    Accept ausente ou */* continua recebendo JSON. O MessagePack só é oferecido com o pacote
+    msgpack instalado.
+    '''
+    return (JSON_MIMETYPE, COLUMNAR_MIMETYPE, *(MSGPACK_MIMETYPES if msgpack is not None else ()))
+
+
+def get_response_mimetype() -> str:
+    '''Formato da resposta pedido no cabeçalho Accept da requisição atual (JSON se nenhum formato oferecido for aceito).'''
+    return request.accept_mimetypes.best_match(available_mimetypes(), default=JSON_MIMETYPE)
+
+
+def format_cache_key(*args, **kwargs) -> str:
+    '''
+    Chave de cache das rotas com negociação de formato (make_cache_key de cache.cached): o
+    caminho, a query string (em ordem), o corpo da requisição e o formato da resposta, de modo que
+    clientes com Accept diferentes não recebam a resposta cacheada em outro formato.
+    '''
+    query = tuple(sorted(request.args.items(multi=True)))
+    digest = hashlib.md5(str(query).encode() + request.get_data())
+    return f'{request.path}{digest.hexdigest()}:{get_response_mimetype()}'
+
+
+def to_columns(value: Any) -> Any:
+    '''
+    Converte as listas de objetos do corpo (em qualquer nível) para o layout colunar: um objeto
+    com um array por campo, na ordem em que os campos aparecem (campos ausentes em um item viram
+    null). Objetos e demais valores mantêm a forma original.
+    '''
+    if isinstance(value, dict):
+        return {key: to_columns(item) for key, item in value.items()}
+    if not isinstance(value, list):
+        return value
+    if value and all(isinstance(item, dict) for item in value):
+        fields = dict.fromkeys(key for item in value for key in item)
+        columns = {}
+        for field in fields:
+            column = [item.get(field) for item in value]
+            if any(isinstance(cell, (dict, list)) for cell in column):
+                column = [to_columns(cell) for cell in column]
+            columns[field] = column
+        return columns
+    return [to_columns(item) for item in value]
+
+
+def dumps(body: Any, mimetype: str) -> bytes:
+    '''
+    Serializa o corpo no formato informado: JSON colunar com orjson (ou o serializador JSON do
+    Flask, sem o pacote) e MessagePack com msgpack. Valores que os serializadores não conhecem
+    (datas, Decimal) são convertidos como no JSON padrão do Flask.
+    '''
+    default = current_app.json.default
+    if mimetype in MSGPACK_MIMETYPES:
+        return msgpack.packb(body, default=default, use_bin_type=True)
+    if orjson is not None:
+        return orjson.dumps(body, default=default, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY)
+    return current_app.json.dumps(body).encode()
+
+
+def negotiated_response(body: Any, status: int = 200) -> Response:
+    '''
+    Resposta no formato pedido no cabeçalho Accept (ver get_response_mimetype). Em JSON, a
+    resposta é a mesma de jsonify; em JSON colunar, as listas de objetos são convertidas com
+    to_columns. O cabeçalho Vary: Accept avisa os caches HTTP de que o corpo depende do Accept.
+    '''
+    mimetype = get_response_mimetype()
+    if mimetype == JSON_MIMETYPE:
+        response = jsonify(body)
+    else:
+        response = current_app.response_class(
+            dumps(to_columns(body) if mimetype == COLUMNAR_MIMETYPE else body, mimetype),
+            mimetype=mimetype
+        )
+    response.status_code = status
+    response.vary.add('Accept')
+    return response
@@ -0,0 +1,110 @@
+import base64
+import binascii
+import json
+import logging
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+from flask import current_app, request
+from api.config import Config
+from api.scripts.negotiation_utils import negotiated_response
+
+
+logger = logging.getLogger(__name__)
+
+#tipos aceitos em cada posição do cursor (números JSON podem chegar como int ou float)
+CURSOR_TYPES = {str: (str,), int: (int,), float: (int, float)}
+
+
+class PaginationError(ValueError):
+    '''Parâmetros de paginação inválidos (limit fora do intervalo ou cursor malformado).'''
+
+
+class Page(list):
+    '''
+    Lista com os itens de uma página e o cursor opaco da próxima (None na última página).
+
+    Args:
+        items (iterable): Os itens da página.
+        next_cursor (str, optional): Cursor para buscar a página seguinte.
+    '''
+    def __init__(self, items: Iterable = (), next_cursor: Optional[str] = None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
+
+def encode_cursor(*values) -> str:
+    '''Codifica os valores da chave de ordenação do último item da página em um cursor opaco (base64 de JSON).'''
+    data = json.dumps(list(values), separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List:
+    '''
+    Decodifica um cursor gerado por encode_cursor, validando a quantidade e os tipos dos valores.
+
+    Raises:
+        PaginationError: Se o cursor não for válido para a chave de ordenação informada.
+    '''
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(data.decode('utf-8'))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise PaginationError('O parâmetro cursor é inválido.')
+    if not isinstance(values, list) or len(values) != len(types):
+        raise PaginationError('O parâmetro cursor é inválido.')
+    for value, expected in zip(values, types):
+        if isinstance(value, bool) or not isinstance(value, CURSOR_TYPES[expected]):
+            raise PaginationError('O parâmetro cursor é inválido.')
+    return [float(value) if expected is float else value for value, expected in zip(values, types)]
+
+
+def paginate(rows: Sequence, limit: Optional[int], key: Callable[[object], Tuple]) -> Page:
+    '''
+    Monta a página a partir de até limit + 1 linhas lidas na ordem da chave de ordenação: a linha
+    excedente só indica que há próxima página, cujo cursor é a chave (key) da última linha mantida.
+    Com limit None, todas as linhas formam uma única página.
+    '''
+    if limit is None or len(rows) <= limit:
+        return Page(rows)
+    rows = rows[:limit]
+    return Page(rows, encode_cursor(*key(rows[-1])))
+
+
+def get_page_args() -> Tuple[Optional[int], Optional[str]]:
+    '''
+    Lê os parâmetros limit e cursor da query string da requisição atual. A paginação é opcional:
+    sem nenhum dos dois, a listagem é retornada inteira, como antes da paginação por cursor.
+
+    Returns:
+        tuple: (limit, cursor); sem limit nem cursor, (None, None). Com cursor e sem limit, limit
+        vale PAGINATION_DEFAULT_LIMIT.
+
+    Raises:
+        PaginationError: Se limit não for um inteiro entre 1 e PAGINATION_MAX_LIMIT.
+    '''
+    default_limit = current_app.config.get('PAGINATION_DEFAULT_LIMIT', Config.PAGINATION_DEFAULT_LIMIT)
+    max_limit = current_app.config.get('PAGINATION_MAX_LIMIT', Config.PAGINATION_MAX_LIMIT)
+    cursor = request.args.get('cursor') or None
+    if 'limit' not in request.args and cursor is None:
+        return None, None
+    limit = request.args.get('limit', default=default_limit, type=int)
+    if limit is None or not 1 <= limit <= max_limit:
+        raise PaginationError(f'O parâmetro limit deve ser um inteiro entre 1 e {max_limit}.')
+    return limit, cursor
+
+
+def page_response(body, next_cursor: Optional[str] = None, status: int = 200):
+    '''
+    Resposta de uma página, no formato pedido no cabeçalho Accept (ver negotiated_response).
+    Havendo próxima página, o cursor é enviado no cabeçalho X-Next-Cursor e a URL completa no
+    cabeçalho Link (rel="next"), sem alterar o corpo. Sem next_cursor, é usado o da própria
+    página (Page.next_cursor), se houver.
+    '''
+    next_cursor = next_cursor or getattr(body, 'next_cursor', None)
+    response = negotiated_response(body, status)
+    if next_cursor:
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return response
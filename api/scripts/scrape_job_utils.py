@@ -0,0 +1,236 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from flask import Flask
+from sqlalchemy import func, literal
+from api.extensions import db
+from api.models.scrape_job import ScrapeJob
+from api.models.scrape_task import ScrapeTask
+from api.scripts.load_utils import get_dialect_name, truncate_books, bulk_load_books
+from api.scripts.catalog_stats_utils import refresh_catalog_stats
+from api.scripts.extract_utils import BookPageExtractor, get_extractor
+from api.scripts.crawl_utils import CrawlController
+from api.scripts.metrics_utils import ScrapeMetrics
+from api.scripts import scrape_utils
+
+
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+#job marcado como em execução, mas sem checkpoint recente (processo reiniciado ou encerrado)
+JOB_INTERRUPTED = 'interrupted'
+
+#chave do lock consultivo (pg_advisory_xact_lock) que serializa a criação de jobs no Postgres
+JOB_CREATE_LOCK_KEY = 7150031
+
+
+def is_stale(job: ScrapeJob, stale_seconds: int) -> bool:
+    '''Indica se um job em execução está sem registrar checkpoints há mais de stale_seconds.'''
+    return job.updated_at is None or job.updated_at < datetime.utcnow() - timedelta(seconds=stale_seconds)
+
+
+def get_job_status(job: ScrapeJob, stale_seconds: int) -> str:
+    '''Retorna o status do job, tratando como interrompido o job em execução sem checkpoint recente.'''
+    if job.status == JOB_RUNNING and is_stale(job, stale_seconds):
+        return JOB_INTERRUPTED
+    return job.status
+
+
+def get_running_job(stale_seconds: int) -> Optional[ScrapeJob]:
+    '''Retorna o job em execução com checkpoint recente, se houver.'''
+    jobs = ScrapeJob.query.filter(ScrapeJob.status.in_([JOB_PENDING, JOB_RUNNING])).order_by(ScrapeJob.id.desc()).all()
+    for job in jobs:
+        if not is_stale(job, stale_seconds):
+            return job
+    return None
+
+
+def create_scrape_job() -> ScrapeJob:
+    '''Cria e persiste um novo job de scraping com status pending.'''
+    job = ScrapeJob(status=JOB_PENDING, updated_at=datetime.utcnow())
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def create_scrape_job_if_idle(stale_seconds: int) -> Optional[ScrapeJob]:
+    '''
+    Cria um job pending apenas se não houver outro em execução com checkpoint recente (ver
+    get_running_job), verificando e inserindo em um único INSERT ... SELECT ... WHERE NOT EXISTS,
+    de modo que duas requisições simultâneas não iniciem dois jobs. No SQLite o comando é
+    executado sob o lock de escrita do banco; no Postgres, em que transações concorrentes não
+    veem as inserções umas das outras, a criação é serializada por um lock consultivo.
+
+    Returns:
+        ScrapeJob: O job criado, ou None se já houver um job em execução.
+    '''
+    now = datetime.utcnow()
+    if get_dialect_name() == 'postgresql':
+        db.session.execute(db.select(func.pg_advisory_xact_lock(JOB_CREATE_LOCK_KEY)))
+    running = db.select(ScrapeJob.id).where(
+        ScrapeJob.status.in_([JOB_PENDING, JOB_RUNNING]),
+        ScrapeJob.updated_at >= now - timedelta(seconds=stale_seconds)
+    )
+    statement = (
+        db.insert(ScrapeJob)
+        .from_select(['status', 'updated_at'], db.select(literal(JOB_PENDING), literal(now, db.DateTime)).where(~running.exists()))
+        .returning(ScrapeJob.id)
+    )
+    job_id = db.session.execute(statement).scalar()
+    db.session.commit()
+    return db.session.get(ScrapeJob, job_id) if job_id is not None else None
+
+
+def serialize_scrape_job(job: ScrapeJob, stale_seconds: int) -> Dict[str, Any]:
+    '''
+    Monta o progresso do job para a resposta da API.
+
+    A vazão (livros/s) considera apenas o tempo efetivamente gasto na coleta, somado entre
+    as execuções, e não o tempo em que o job ficou parado antes de ser retomado. Em jobs
+    distribuídos, failed_tasks conta as tarefas da fila que esgotaram as tentativas.
+    '''
+    #import local: scrape_queue_utils importa este módulo
+    from api.scripts.scrape_queue_utils import TASK_FAILED
+    failed_tasks = ScrapeTask.query.filter_by(job_id=job.id, status=TASK_FAILED).count()
+    return {
+        'job_id': job.id,
+        'status': get_job_status(job, stale_seconds),
+        'mode': job.mode,
+        'categories_total': job.categories_total,
+        'categories_done': job.categories_done,
+        'pages_done': job.pages_done,
+        'books_parsed': job.books_parsed,
+        'books_per_second': round(job.books_parsed / job.active_seconds, 2) if job.active_seconds else 0.0,
+        'elapsed_seconds': round(job.active_seconds, 2),
+        'checkpoint_url': job.checkpoint_url,
+        'failed_tasks': failed_tasks,
+        'error': job.error,
+        'metrics': job.metrics,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'updated_at': job.updated_at.isoformat() if job.updated_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
+
+def run_scrape_job(
+    job_id: int,
+    file_path: str = scrape_utils.BOOKS_CSV_PATH,
+    extractor: Optional[BookPageExtractor] = None,
+    controller: Optional[CrawlController] = None
+) -> ScrapeJob:
+    '''
+    Executa (ou retoma) o job de scraping a partir do último checkpoint.
+
+    A cada página de categoria processada, os livros são gravados no banco e no CSV e o
+    checkpoint (categorias concluídas e URL da próxima página) é atualizado na mesma
+    transação. Assim, um job interrompido é retomado exatamente a partir da página seguinte
+    à última gravada, sem duplicar nem perder livros.
+
+    As métricas da execução atual (ScrapeMetrics) são gravadas no job a cada checkpoint, o
+    que permite acompanhar durante a coleta se ela está limitada pela rede, pelo parser ou
+    pela gravação. Ao retomar um job, as métricas recomeçam do zero.
+
+    Returns:
+        ScrapeJob: O job com o status final (done ou failed).
+    '''
+    extractor = extractor or get_extractor()
+    controller = controller or CrawlController.from_config()
+    if controller.metrics is None:
+        controller.metrics = ScrapeMetrics()
+    metrics = controller.metrics
+
+    job = db.session.get(ScrapeJob, job_id)
+    job.status = JOB_RUNNING
+    job.error = None
+    job.started_at = job.started_at or datetime.utcnow()
+    job.updated_at = datetime.utcnow()
+    db.session.commit()
+
+    last_checkpoint = time.monotonic()
+
+    def checkpoint():
+        nonlocal last_checkpoint
+        now = time.monotonic()
+        job.active_seconds += now - last_checkpoint
+        job.updated_at = datetime.utcnow()
+        job.metrics = metrics.snapshot()
+        last_checkpoint = now
+        db.session.commit()
+
+    try:
+        #a lista de categorias é congelada na primeira execução para que a retomada siga a mesma ordem
+        if job.categories is None:
+            job.categories = scrape_utils.get_category_links(extractor, controller)
+            job.categories_total = len(job.categories)
+            checkpoint()
+
+        for index in range(job.categories_done, job.categories_total):
+            category = job.categories[index]
+            start_url = job.checkpoint_url
+
+            for _, books, next_url in scrape_utils.iter_category_pages(category, start_url, extractor, controller):
+                valid_books = list(scrape_utils.iter_valid_books(books))
+                start = time.perf_counter()
+                if valid_books:
+                    #a tabela só é esvaziada quando o primeiro lote do job estiver pronto
+                    #as estatísticas do catálogo são recalculadas uma vez, ao final do job
+                    if not job.books_parsed:
+                        truncate_books(refresh_stats=False)
+                    bulk_load_books(valid_books, refresh_stats=False)
+                    scrape_utils.write_books_csv(valid_books, file_path, append=job.books_parsed > 0)
+                    metrics.observe_write(time.perf_counter() - start, len(valid_books))
+                job.books_parsed += len(valid_books)
+                job.pages_done += 1
+                job.checkpoint_url = next_url
+                checkpoint()
+
+            job.categories_done = index + 1
+            job.checkpoint_url = None
+            checkpoint()
+            logger.info(f'Job {job.id}: categoria {category["name"]} concluída ({job.books_parsed} livros até agora).')
+
+        refresh_catalog_stats()
+        job.status = JOB_DONE
+        job.finished_at = datetime.utcnow()
+        metrics.finish()
+        checkpoint()
+        logger.info(f'Job {job.id} concluído: {job.books_parsed} livros coletados.')
+        metrics.log_summary()
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f'Job {job_id} falhou: {e}')
+        #os lotes já confirmados continuam em books
+        refresh_catalog_stats()
+        job = db.session.get(ScrapeJob, job_id)
+        job.status = JOB_FAILED
+        job.error = str(e)
+        job.updated_at = datetime.utcnow()
+        metrics.finish()
+        job.metrics = metrics.snapshot()
+        db.session.commit()
+
+    return job
+
+
+def start_scrape_job(app: Flask, job_id: int) -> None:
+    '''
+    Dispara a execução do job fora da thread da requisição.
+
+    Com SCRAPE_JOBS_ASYNC desativado (e.g., nos testes), o job é executado de forma síncrona.
+    '''
+    if not app.config.get('SCRAPE_JOBS_ASYNC', True):
+        run_scrape_job(job_id)
+        return
+
+    def target():
+        with app.app_context():
+            run_scrape_job(job_id)
+
+    threading.Thread(target=target, name=f'scrape-job-{job_id}', daemon=True).start()
@@ -0,0 +1,346 @@
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, List, Optional
+from flask import current_app
+from sqlalchemy import and_, case, or_
+from api.config import Config
+from api.extensions import db
+from api.models.scrape_job import ScrapeJob
+from api.models.scrape_task import ScrapeTask
+from api.scripts.load_utils import get_dialect_name, get_dialect_insert, upsert_books
+from api.scripts.catalog_stats_utils import refresh_catalog_stats
+from api.scripts.extract_utils import BookPageExtractor, get_extractor
+from api.scripts.crawl_utils import CrawlController
+from api.scripts.metrics_utils import ScrapeMetrics
+from api.scripts.scrape_job_utils import JOB_DONE, JOB_FAILED, JOB_RUNNING
+from api.scripts import scrape_utils
+
+try:
+    import fcntl
+except ImportError:  #fcntl não existe no Windows
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+JOB_MODE_DISTRIBUTED = 'distributed'
+
+TASK_CATEGORY = 'category'
+TASK_PAGE = 'page'
+
+TASK_PENDING = 'pending'
+TASK_CLAIMED = 'claimed'
+TASK_DONE = 'done'
+TASK_FAILED = 'failed'
+
+#serializa as reivindicações entre threads quando o fcntl não está disponível
+_thread_lock = threading.Lock()
+
+
+def default_worker_id() -> str:
+    '''Identificador do worker: host e PID do processo.'''
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+@contextmanager
+def queue_lock(lock_file: str) -> Iterator[None]:
+    '''
+    Lock exclusivo entre processos do mesmo host, baseado em flock sobre um arquivo local.
+
+    Usado no SQLite, que não suporta SELECT ... FOR UPDATE SKIP LOCKED. Como o banco SQLite
+    é um arquivo local, todos os seus workers compartilham o mesmo host e o mesmo arquivo de lock.
+    '''
+    if fcntl is None:
+        with _thread_lock:
+            yield
+        return
+    with open(lock_file, 'a') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def seed_scrape_queue(
+    extractor: Optional[BookPageExtractor] = None,
+    controller: Optional[CrawlController] = None
+) -> ScrapeJob:
+    '''
+    Cria um job distribuído e enfileira uma tarefa por categoria (a primeira página de cada uma).
+
+    As páginas seguintes são enfileiradas pelos próprios workers à medida que são descobertas.
+    '''
+    categories = scrape_utils.get_category_links(extractor, controller)
+    now = datetime.utcnow()
+    job = ScrapeJob(
+        mode=JOB_MODE_DISTRIBUTED,
+        status=JOB_RUNNING if categories else JOB_DONE,
+        categories=categories,
+        categories_total=len(categories),
+        started_at=now,
+        updated_at=now,
+        finished_at=None if categories else now
+    )
+    db.session.add(job)
+    db.session.flush()
+    db.session.add_all([
+        ScrapeTask(job_id=job.id, kind=TASK_CATEGORY, genre=category['name'], url=category['initial_url'], status=TASK_PENDING)
+        for category in categories
+    ])
+    db.session.commit()
+    logger.info(f'Job distribuído {job.id}: {len(categories)} categorias enfileiradas.')
+    return job
+
+
+def _claimable_filter(job_id: int, lease_seconds: int):
+    '''Tarefas pendentes ou reivindicadas por um worker cujo prazo (lease) expirou.'''
+    expired = datetime.utcnow() - timedelta(seconds=lease_seconds)
+    return and_(
+        ScrapeTask.job_id == job_id,
+        or_(
+            ScrapeTask.status == TASK_PENDING,
+            and_(ScrapeTask.status == TASK_CLAIMED, ScrapeTask.claimed_at < expired)
+        )
+    )
+
+
+def claim_tasks(
+    job_id: int,
+    worker_id: str,
+    limit: int,
+    lease_seconds: int,
+    lock_file: Optional[str] = None
+) -> List[ScrapeTask]:
+    '''
+    Reivindica até limit tarefas da fila para o worker.
+
+    No Postgres as linhas são travadas com SELECT ... FOR UPDATE SKIP LOCKED, de modo que
+    workers concorrentes (em qualquer host) pulam as tarefas já travadas em vez de esperar.
+    Nos demais bancos (SQLite), a leitura e a marcação são serializadas por um lock de arquivo
+    (lock_file, padrão SCRAPE_QUEUE_LOCK_FILE da configuração).
+    '''
+    query = ScrapeTask.query.filter(_claimable_filter(job_id, lease_seconds)).order_by(ScrapeTask.id).limit(limit)
+
+    def claim(tasks):
+        now = datetime.utcnow()
+        for task in tasks:
+            task.status = TASK_CLAIMED
+            task.worker = worker_id
+            task.claimed_at = now
+        db.session.commit()
+        return tasks
+
+    if get_dialect_name() == 'postgresql':
+        return claim(query.with_for_update(skip_locked=True).all())
+    with queue_lock(lock_file or current_app.config.get('SCRAPE_QUEUE_LOCK_FILE', Config.SCRAPE_QUEUE_LOCK_FILE)):
+        return claim(query.all())
+
+
+def _owned_by(task_id: int, worker_id: str):
+    '''Tarefa ainda reivindicada pelo worker (o lease não expirou e não foi assumido por outro worker).'''
+    return and_(ScrapeTask.id == task_id, ScrapeTask.worker == worker_id, ScrapeTask.status == TASK_CLAIMED)
+
+
+def _merge_worker_metrics(job_id: int, worker_id: str, metrics: ScrapeMetrics) -> ScrapeJob:
+    '''
+    Grava o snapshot das métricas do worker em scrape_job.metrics, na transação atual.
+
+    Cada worker mantém seu snapshot em metrics['workers'][worker_id] e o restante do objeto é a
+    combinação dos snapshots de todos os workers (ScrapeMetrics.from_snapshots), no mesmo formato
+    das métricas de um job sequencial. A linha do job é relida com FOR UPDATE (no SQLite, a
+    transação já detém o lock de escrita do banco), de modo que workers concorrentes não
+    sobrescrevam os snapshots uns dos outros.
+    '''
+    job = db.session.get(ScrapeJob, job_id, with_for_update=True, populate_existing=True)
+    workers = dict((job.metrics or {}).get('workers', {}))
+    workers[worker_id] = metrics.snapshot()
+    job.metrics = {**ScrapeMetrics.from_snapshots(workers.values()).snapshot(), 'workers': workers}
+    return job
+
+
+def process_tasks(
+    job_id: int,
+    worker_id: str,
+    tasks: List[ScrapeTask],
+    max_attempts: int,
+    extractor: Optional[BookPageExtractor] = None,
+    controller: Optional[CrawlController] = None
+) -> int:
+    '''
+    Processa as tarefas reivindicadas por worker_id e grava os resultados em uma única transação.
+
+    Os livros de todas as páginas são gravados com um upsert em lote, as próximas páginas
+    são enfileiradas e as tarefas e contadores do job são atualizados no mesmo commit, de modo
+    que uma queda do worker antes do commit apenas devolve as tarefas à fila (após o lease).
+    As métricas do worker (controller.metrics) são combinadas em scrape_job.metrics no mesmo commit.
+
+    Uma tarefa só é concluída se a página da categoria e todos os seus livros forem extraídos;
+    qualquer falha devolve a tarefa inteira à fila, até max_attempts tentativas. Cada tarefa é
+    atualizada apenas se ainda pertencer ao worker: se o lease expirou e outro worker a
+    reivindicou, o resultado deste é descartado, sem contar a página duas vezes no job.
+
+    Returns:
+        int: O número de livros gravados.
+    '''
+    scraped, failed = [], []
+    now = datetime.utcnow()
+
+    for task in tasks:
+        task_id, url, genre, attempts = task.id, task.url, task.genre, task.attempts
+        try:
+            page_books, next_url = scrape_utils.scrape_category_page(url, genre, extractor, controller)
+        except Exception as e:
+            failed.append((task_id, e))
+            logger.warning(f'Tarefa {task_id} ({url}) falhou na tentativa {attempts + 1}: {e}')
+            continue
+        scraped.append((task_id, genre, list(scrape_utils.iter_valid_books(page_books)), next_url))
+
+    for task_id, error in failed:
+        #no UPDATE, attempts à direita ainda é o valor anterior
+        db.session.query(ScrapeTask).filter(_owned_by(task_id, worker_id)).update({
+            ScrapeTask.attempts: ScrapeTask.attempts + 1,
+            ScrapeTask.error: str(error),
+            ScrapeTask.status: case((ScrapeTask.attempts + 1 >= max_attempts, TASK_FAILED), else_=TASK_PENDING),
+            ScrapeTask.worker: None,
+            ScrapeTask.claimed_at: None
+        }, synchronize_session=False)
+
+    books, next_pages = [], []
+    pages_done, categories_done = 0, 0
+    for task_id, genre, valid_books, next_url in scraped:
+        owned = db.session.query(ScrapeTask).filter(_owned_by(task_id, worker_id)).update({
+            ScrapeTask.status: TASK_DONE,
+            ScrapeTask.books_found: len(valid_books),
+            ScrapeTask.finished_at: now
+        }, synchronize_session=False)
+        if not owned:
+            logger.warning(f'Tarefa {task_id} foi reivindicada por outro worker após o lease expirar; resultado descartado.')
+            continue
+        books.extend(valid_books)
+        pages_done += 1
+        if next_url:
+            next_pages.append({'job_id': job_id, 'kind': TASK_PAGE, 'genre': genre, 'url': next_url, 'status': TASK_PENDING, 'attempts': 0, 'created_at': now})
+        else:
+            categories_done += 1
+
+    start = time.perf_counter()
+    if books:
+        upsert_books(books, refresh_stats=False)
+    if next_pages:
+        #uma página reprocessada após o lease expirar não duplica a tarefa seguinte
+        statement = get_dialect_insert()(ScrapeTask.__table__).on_conflict_do_nothing(index_elements=['job_id', 'url'])
+        db.session.execute(statement, next_pages)
+
+    metrics = controller.metrics if controller is not None else None
+    if metrics is not None:
+        metrics.observe_write(time.perf_counter() - start, len(books))
+        job = _merge_worker_metrics(job_id, worker_id, metrics)
+    else:
+        job = db.session.get(ScrapeJob, job_id)
+
+    #os contadores são incrementados no próprio banco para suportar workers concorrentes
+    db.session.query(ScrapeJob).filter(ScrapeJob.id == job_id).update({
+        ScrapeJob.books_parsed: ScrapeJob.books_parsed + len(books),
+        ScrapeJob.pages_done: ScrapeJob.pages_done + pages_done,
+        ScrapeJob.categories_done: ScrapeJob.categories_done + categories_done,
+        ScrapeJob.active_seconds: (now - job.started_at).total_seconds(),
+        ScrapeJob.updated_at: now
+    }, synchronize_session=False)
+    db.session.commit()
+    return len(books)
+
+
+def finish_job_if_drained(job_id: int) -> bool:
+    '''
+    Encerra o job quando não houver tarefas pendentes nem em andamento: concluído se todas as
+    tarefas foram concluídas, ou falho (com o número de tarefas em error) se alguma esgotou as
+    tentativas, já que as páginas dessas tarefas (e as seguintes da categoria) não foram coletadas.
+    As estatísticas do catálogo são recalculadas aqui, uma vez por job, pelo worker que o encerra.
+    '''
+    remaining = ScrapeTask.query.filter(
+        ScrapeTask.job_id == job_id,
+        ScrapeTask.status.in_([TASK_PENDING, TASK_CLAIMED])
+    ).count()
+    if remaining:
+        return False
+    failed = ScrapeTask.query.filter_by(job_id=job_id, status=TASK_FAILED).count()
+    now = datetime.utcnow()
+    finished = db.session.query(ScrapeJob).filter(ScrapeJob.id == job_id, ScrapeJob.status == JOB_RUNNING).update({
+        ScrapeJob.status: JOB_FAILED if failed else JOB_DONE,
+        ScrapeJob.error: f'{failed} tarefas falharam após esgotar as tentativas' if failed else None,
+        ScrapeJob.finished_at: now,
+        ScrapeJob.updated_at: now
+    }, synchronize_session=False)
+    if finished:
+        refresh_catalog_stats()
+    db.session.commit()
+    return True
+
+
+def get_latest_distributed_job() -> Optional[ScrapeJob]:
+    '''Retorna o job distribuído em execução mais recente, se houver.'''
+    return ScrapeJob.query.filter_by(mode=JOB_MODE_DISTRIBUTED, status=JOB_RUNNING).order_by(ScrapeJob.id.desc()).first()
+
+
+def run_queue_worker(
+    job_id: int,
+    worker_id: Optional[str] = None,
+    claim_size: Optional[int] = None,
+    lease_seconds: Optional[int] = None,
+    max_attempts: Optional[int] = None,
+    poll_interval: Optional[float] = None,
+    lock_file: Optional[str] = None,
+    extractor: Optional[BookPageExtractor] = None,
+    controller: Optional[CrawlController] = None,
+    sleep: Callable[[float], None] = time.sleep
+) -> int:
+    '''
+    Consome a fila do job até que ela se esgote.
+
+    Vários workers (processos ou hosts) podem executar esta função para o mesmo job; cada um
+    reivindica claim_size tarefas por vez. Enquanto houver tarefas em andamento em outros
+    workers (que podem enfileirar novas páginas), o worker aguarda poll_interval segundos.
+    Os parâmetros não informados vêm das opções SCRAPE_QUEUE_* da configuração da aplicação.
+
+    As métricas do worker ficam em controller.metrics (criado automaticamente se ausente) e são
+    combinadas em scrape_job.metrics a cada lote processado e ao final do worker.
+
+    Returns:
+        int: O número de livros gravados por este worker.
+    '''
+    config = current_app.config
+    worker_id = worker_id or default_worker_id()
+    claim_size = claim_size or config.get('SCRAPE_QUEUE_CLAIM_SIZE', Config.SCRAPE_QUEUE_CLAIM_SIZE)
+    lease_seconds = lease_seconds or config.get('SCRAPE_QUEUE_LEASE_SECONDS', Config.SCRAPE_QUEUE_LEASE_SECONDS)
+    max_attempts = max_attempts or config.get('SCRAPE_QUEUE_MAX_ATTEMPTS', Config.SCRAPE_QUEUE_MAX_ATTEMPTS)
+    if poll_interval is None:
+        poll_interval = config.get('SCRAPE_QUEUE_POLL_INTERVAL', Config.SCRAPE_QUEUE_POLL_INTERVAL)
+    lock_file = lock_file or config.get('SCRAPE_QUEUE_LOCK_FILE', Config.SCRAPE_QUEUE_LOCK_FILE)
+    extractor = extractor or get_extractor()
+    controller = controller or CrawlController.from_config()
+    if controller.metrics is None:
+        controller.metrics = ScrapeMetrics()
+    total = 0
+
+    logger.info(f'Worker {worker_id} consumindo a fila do job {job_id}...')
+    while True:
+        tasks = claim_tasks(job_id, worker_id, claim_size, lease_seconds, lock_file)
+        if tasks:
+            total += process_tasks(job_id, worker_id, tasks, max_attempts, extractor, controller)
+            continue
+        if finish_job_if_drained(job_id):
+            break
+        sleep(poll_interval)
+
+    logger.info(f'Worker {worker_id} finalizado: {total} livros gravados.')
+    controller.metrics.finish()
+    _merge_worker_metrics(job_id, worker_id, controller.metrics)
+    db.session.commit()
+    controller.metrics.log_summary()
+    return total
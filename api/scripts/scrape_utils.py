@@ -1,15 +1,22 @@
 import logging
 import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 import re 
-from typing import List, Dict, Any, Optional
+import time
+import itertools
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable, Tuple
+from api.scripts.load_utils import BOOK_COLUMNS
+from api.scripts.extract_utils import BookPageExtractor, get_extractor
+from api.scripts.crawl_utils import CrawlController
+from api.scripts.metrics_utils import ScrapeMetrics
+from api.config import Config
 
 
 logger = logging.getLogger('__name__')
 
-BASE_URL = 'http://books.toscrape.com/'
+BASE_URL = Config.SCRAPER_BASE_URL
 HOME_URL = BASE_URL + 'index.html'
+BOOKS_CSV_PATH = 'data/books.csv'
 
 
 def clean_currency(currency_str: str) -> float:
@@ -31,28 +38,23 @@ def extract_number_from_availability(availability_text: str) -> int:
     return int(match.group()) if match else 0
 
 
-def get_category_links() -> List[Dict[str, str]]:
+def get_category_links(
+    extractor: Optional[BookPageExtractor] = None,
+    controller: Optional[CrawlController] = None
+) -> List[Dict[str, str]]:
     '''Coleta o nome e a URL inicial de todas as categorias na página inicial.'''
     logging.info('Iniciando a coleta de links de categorias...')
+    extractor = extractor or get_extractor()
+    controller = controller or CrawlController.from_config()
 
     try:
-        home_response = requests.get(HOME_URL, timeout=10)
-        home_response.raise_for_status() 
+        home_response = controller.fetch(HOME_URL, timeout=10)
     except requests.exceptions.RequestException as e:
         logging.error(f'Erro ao acessar a URL inicial: {e}')
         return []
     
-    home_soup = BeautifulSoup(home_response.text, 'html.parser')
-    
-    #encontra a lista de categorias
-    category_list_html = home_soup.find('ul', class_='nav nav-list').find('ul').find_all('li')
-    
     categories = []
-    for item in category_list_html:
-        tag_a = item.find('a')
-        category_name = tag_a.text.strip()
-        relative_link = tag_a['href']
-        
+    for category_name, relative_link in extractor.parse_categories(home_response.text):
         #constrói a url absoluta
         category_url = BASE_URL + relative_link 
         
@@ -65,177 +67,289 @@ def get_category_links() -> List[Dict[str, str]]:
     return categories
 
 
-def extract_book_details(url: str, genre: str) -> Optional[Dict[str, Any]]:
+def _observe_parse(controller: CrawlController, kind: str, start: float) -> None:
+    '''Registra o tempo de extração da página nas métricas do controlador, se houver.'''
+    if controller.metrics is not None:
+        controller.metrics.observe_parse(kind, time.perf_counter() - start)
+
+
+def _record_failure(controller: CrawlController, genre: str, url: str, error: Exception) -> None:
+    '''Registra a falha de coleta da página nas métricas do controlador, se houver.'''
+    if controller.metrics is not None:
+        controller.metrics.record_failure(genre, url, error)
+
+
+def build_book_record(raw: Dict[str, Any], url: str, genre: str) -> Dict[str, Any]:
+    '''Limpa os campos brutos extraídos da página de detalhes e monta o registro do livro.'''
+    #link da imagem
+    image_url = BASE_URL + raw['image_src'].replace('../../', '')
+
+    #descrição e avaliação em estrelas são opcionais na página
+    description = raw['description'] if raw['description'] is not None else 'No Description'
+    rating = raw['rating'] or 'No Rating'
+
+    #extração de dados da tabela
+    product_table = raw['table']
+    availability = extract_number_from_availability(product_table[5])
+    number_of_reviews = int(product_table[6]) if product_table[6].isdigit() else 0
+
+    return {
+        'upc': product_table[0],
+        'title': raw['title'],
+        'genre': genre,
+        'price': clean_currency(raw['price']),
+        'product_type': product_table[1],
+        'price_excl_tax': clean_currency(product_table[2]),
+        'price_incl_tax': clean_currency(product_table[3]),
+        'tax': clean_currency(product_table[4]),
+        'number_of_reviews': number_of_reviews,
+        'availability': availability,
+        'rating': rating,
+        'description': description,
+        'url': url,
+        'image_url': image_url
+    }
+
+
+def extract_book_details(
+    url: str,
+    genre: str,
+    extractor: Optional[BookPageExtractor] = None,
+    controller: Optional[CrawlController] = None
+) -> Optional[Dict[str, Any]]:
     '''
     Acessa a página de detalhes de um livro e extrai todas as informações.
     ADICIONADO: 'url' para mapear corretamente ao modelo Books.
+
+    Uma página malformada (que não pode ser extraída) é registrada nas métricas e descartada,
+    sem interromper a página da categoria: uma nova tentativa baixaria o mesmo conteúdo.
+
+    Returns:
+        dict: O registro do livro, ou None se a página não puder ser extraída.
+
+    Raises:
+        Exception: Se a página não puder ser obtida mesmo após as novas tentativas do
+            CrawlController (a falha é registrada nas métricas e propagada, para que a página
+            da categoria não seja dada como gravada).
     '''
+    extractor = extractor or get_extractor()
+    controller = controller or CrawlController.from_config()
+    try:
+        detail_response = controller.fetch(url, timeout=10)
+    except Exception as e:
+        logging.error(f'Erro ao baixar detalhes de {url}: {e}')
+        _record_failure(controller, genre, url, e)
+        raise
+
     try:
-        detail_response = requests.get(url, timeout=10)
-        detail_response.raise_for_status()
         detail_response.encoding = 'utf-8'
-        detail_soup = BeautifulSoup(detail_response.text, 'html.parser')
+        start = time.perf_counter()
+        raw = extractor.parse_book_page(detail_response.text)
+        book = build_book_record(raw, url, genre)
+        _observe_parse(controller, 'book', start)
+        return book
+    except Exception as e:
+        logging.error(f'Erro ao extrair detalhes de {url}, livro descartado: {e}')
+        _record_failure(controller, genre, url, e)
+        return None
 
-        #extraindo link da imagem
-        image_tag = detail_soup.find('div', class_='item active').find('img')
-        image_relative_url = image_tag['src']
-        image_url = BASE_URL + image_relative_url.replace('../../', '')
-        
-        #extraindo dados simples
-        title = detail_soup.find('h1').text
-        
-        #preço principal
-        price = detail_soup.find('p', class_='price_color').text
-        price = clean_currency(price)
 
-        #descrição
-        description_tag = detail_soup.find('div', id='product_description')
-        description = description_tag.find_next_sibling('p').text if description_tag else 'No Description'
+def scrape_category_page(
+    page_url: str,
+    genre: str,
+    extractor: Optional[BookPageExtractor] = None,
+    controller: Optional[CrawlController] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    '''
+    Processa uma única página de categoria: extrai os detalhes de todos os livros da página
+    e resolve a URL da próxima página. As páginas de detalhes são baixadas em paralelo, sob
+    o controle de concorrência do CrawlController.
 
-        #avaliação em estrelas
-        rating_tag = detail_soup.find('p', class_='star-rating')
-        rating = rating_tag['class'][1] if rating_tag else 'No Rating'
+    Returns:
+        tuple: A lista de livros extraídos e a URL absoluta da próxima página (ou None).
 
-        #tabela de informações
-        product_table = detail_soup.find('table', class_='table-striped').find_all('td')
-        
-        #extração de dados da tabela
-        upc = product_table[0].text
-        product_type = product_table[1].text
-        
-        price_excl_tax = clean_currency(product_table[2].text)
-        price_incl_tax = clean_currency(product_table[3].text)
-        tax = clean_currency(product_table[4].text)
+    Raises:
+        Exception: Se a página da categoria não puder ser obtida ou extraída, ou se a de algum
+            dos seus livros não puder ser obtida (a página inteira deve ser refeita). Livros com
+            páginas malformadas são descartados e registrados nas métricas (extract_book_details).
+    '''
+    extractor = extractor or get_extractor()
+    controller = controller or CrawlController.from_config()
 
-        availability_text = product_table[5].text
-        availability = extract_number_from_availability(availability_text)
-        
-        number_of_reviews = int(product_table[6].text) if product_table[6].text.isdigit() else 0
-
-        return {
-            'upc': upc,
-            'title': title,
-            'genre': genre,
-            'price': price,
-            'product_type': product_type,
-            'price_excl_tax': price_excl_tax,
-            'price_incl_tax': price_incl_tax,
-            'tax': tax,
-            'number_of_reviews': number_of_reviews,
-            'availability': availability,
-            'rating': rating,
-            'description': description,
-            'url': url,
-            'image_url': image_url
-        }
+    try:
+        page_response = controller.fetch(page_url, timeout=15)
+
+        #encontrar todos os livros da página atual e o link da próxima página
+        start = time.perf_counter()
+        book_links, link_next = extractor.parse_category_page(page_response.text)
+        _observe_parse(controller, 'category', start)
     except Exception as e:
-        logging.error(f'Erro ao extrair detalhes de {url}: {e}')
-        return None
+        _record_failure(controller, genre, page_url, e)
+        raise
+
+    #ajusta os links relativos para serem absolutos
+    urls = [BASE_URL + 'catalogue/' + relative_link.replace('../', '') for relative_link in book_links]
+
+    #extrair os detalhes, na ordem da página
+    books = [
+        book for book in controller.map(lambda url: extract_book_details(url, genre, extractor, controller), urls)
+        if book is not None
+    ]
 
+    next_url = None
+    if link_next:
+        #cria a URL completa para a próxima página
+        url_parts = page_url.split('/')
+        next_url = '/'.join(url_parts[:-1]) + '/' + link_next
+    return books, next_url
 
-def scrape_category(category: Dict[str, str], data_list: List[Dict[str, Any]]) -> None:
+
+def iter_category_pages(
+    category: Dict[str, str],
+    start_url: Optional[str] = None,
+    extractor: Optional[BookPageExtractor] = None,
+    controller: Optional[CrawlController] = None
+) -> Iterator[Tuple[str, List[Dict[str, Any]], Optional[str]]]:
     '''
-    Itera sobre todas as páginas de uma categoria e extrai os detalhes dos livros.
-    Recebe 'data_list' para adicionar os resultados.
+    Itera sobre as páginas de uma categoria a partir de start_url (ou da página inicial),
+    produzindo (URL da página, livros da página, URL da próxima página) a cada página.
+
+    Uma página que falhe mesmo após as novas tentativas do CrawlController interrompe a
+    iteração com a exceção, em vez de encerrar a categoria como se estivesse completa: quem
+    consome (e.g., o job de scraping) mantém o checkpoint na página que falhou.
     '''
     genre_name = category['name']
-    current_url = category['initial_url']
+    current_url = start_url or category['initial_url']
     page_number = 1
+    controller = controller or CrawlController.from_config()
 
     logging.info(f'Scraping gênero: {genre_name}')
 
-    while True:
+    while current_url:
         logging.info(f'  > Processando {genre_name} - pag. {page_number}')
 
         try:
-            page_response = requests.get(current_url, timeout=15)
-            page_response.raise_for_status()
-            page_soup = BeautifulSoup(page_response.text, 'html.parser')
-            
-            #encontrar todos os livros na página atual
-            books_on_page = page_soup.find_all('article', class_='product_pod')
-            
-            #iterar sobre os links de livros
-            for book in books_on_page:
-                relative_link = book.find('h3').find('a')['href']
-                #ajusta o link relativo para ser absoluto
-                url = BASE_URL + 'catalogue/' + relative_link.replace('../', '')
-                
-                #extrair e adicionar os detalhes
-                book_data = extract_book_details(url, genre_name)
-                if book_data:
-                    data_list.append(book_data) #adiciona à lista passada por parâmetro
-            
-            #verificar paginação ('next' button)
-            next_button = page_soup.find('li', class_='next')
-            
-            if next_button:
-                #se houver botão 'next', atualiza a URL para a próxima página
-                link_next = next_button.find('a')['href']
-                
-                #cria a URL completa para a próxima página
-                url_parts = current_url.split('/')
-                current_url = '/'.join(url_parts[:-1]) + '/' + link_next
-                page_number += 1
-            else:
-                #não há mais páginas, sai do loop
-                break
-
-        except requests.exceptions.RequestException as e:
-            logging.error(f'Erro ao processar a página {current_url}: {e}')
-            break
+            books, next_url = scrape_category_page(current_url, genre_name, extractor, controller)
         except Exception as e:
-            logging.error(f'Erro inesperado ao raspar categoria {genre_name}: {e}')
+            logging.error(f'Erro ao processar a página {current_url} do gênero {genre_name}: {e}')
+            raise
+
+        yield current_url, books, next_url
+        current_url = next_url
+        page_number += 1
+
+
+def iter_category_books(
+    category: Dict[str, str],
+    extractor: Optional[BookPageExtractor] = None,
+    controller: Optional[CrawlController] = None
+) -> Iterator[Dict[str, Any]]:
+    '''
+    Itera sobre todas as páginas de uma categoria, produzindo os detalhes de cada livro
+    à medida que são extraídos.
+    '''
+    for _, books, _ in iter_category_pages(category, extractor=extractor, controller=controller):
+        yield from books
+
+
+def iter_books(
+    categories: Iterable[Dict[str, str]],
+    extractor: Optional[BookPageExtractor] = None,
+    controller: Optional[CrawlController] = None
+) -> Iterator[Dict[str, Any]]:
+    '''Encadeia os livros de todas as categorias em um único fluxo.'''
+    controller = controller or CrawlController.from_config()
+    for category in categories:
+        yield from iter_category_books(category, extractor, controller)
+
+
+def validate_book(book: Dict[str, Any]) -> bool:
+    '''Verifica se o livro possui todas as colunas esperadas e os campos obrigatórios preenchidos.'''
+    if any(column not in book for column in BOOK_COLUMNS):
+        return False
+    if not book['upc'] or not book['title'] or not book['url']:
+        return False
+    return isinstance(book['price'], (int, float))
+
+
+def iter_valid_books(books: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    '''Filtra o fluxo de livros, descartando registros inválidos.'''
+    for book in books:
+        if validate_book(book):
+            yield book
+        else:
+            logging.warning(f'Livro descartado por dados inválidos: {book.get("url")}')
+
+
+def iter_batches(items: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    '''Agrupa um iterável em listas de no máximo batch_size elementos.'''
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
             break
+        yield batch
+
+
+def write_books_csv(batch: List[Dict[str, Any]], file_path: str, append: bool) -> None:
+    '''Grava um lote de livros no CSV, escrevendo o cabeçalho apenas no primeiro lote.'''
+    df_batch = pd.DataFrame(batch)[BOOK_COLUMNS]
+    df_batch.to_csv(
+        file_path,
+        mode='a' if append else 'w',
+        header=not append,
+        index=False,
+        encoding='utf-8'
+    )
 
 
-def run_scraping() -> pd.DataFrame:
+def run_scraping(
+    on_batch: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    batch_size: Optional[int] = None,
+    file_path: str = BOOKS_CSV_PATH,
+    extractor: Optional[BookPageExtractor] = None,
+    controller: Optional[CrawlController] = None
+) -> int:
     '''
-    Executa o scraping, salva o CSV em api/data e retorna o DataFrame.
+    Executa o scraping como um pipeline (coleta → extração → validação → lotes).
+
+    Cada lote de até batch_size livros (padrão SCRAPE_BATCH_SIZE) é anexado ao CSV e entregue a on_batch (e.g., para
+    inserção no banco) assim que fica pronto, mantendo o uso de memória limitado ao lote
+    e preservando o progresso parcial caso a coleta seja interrompida.
+
+    As métricas da execução (latência, bytes, tempo de extração e de gravação, falhas) são
+    registradas em controller.metrics, criado automaticamente se ausente, e resumidas no log ao final.
+
+    Returns:
+        int: O número total de livros coletados.
     '''
-    
-    collected_data = []
-    
+    batch_size = batch_size or Config.SCRAPE_BATCH_SIZE
     #coleta todos os links de gênero
-    categories_list = get_category_links()
-    
-    #processa cada gênero
-    for category in categories_list:
-        scrape_category(category, collected_data) #passa a lista local
+    extractor = extractor or get_extractor()
+    controller = controller or CrawlController.from_config()
+    if controller.metrics is None:
+        controller.metrics = ScrapeMetrics()
+    categories_list = get_category_links(extractor, controller)
 
-    logging.info(f'\nTotal de {len(collected_data)} livros coletados.')
+    books = iter_valid_books(iter_books(categories_list, extractor, controller))
 
-    if not collected_data:
-        logging.warning('Nenhum dado de livro foi coletado.')
-        return pd.DataFrame()
-    
-    df_books = pd.DataFrame(collected_data)
-    
-    #colunas ordenadas
-    ordered_columns = [
-        'upc', 
-        'title', 
-        'genre', 
-        'price', 
-        'availability', 
-        'rating', 
-        'description',
-        'product_type', 
-        'price_excl_tax', 
-        'price_incl_tax', 
-        'tax', 
-        'number_of_reviews',
-        'url',
-        'image_url'
-    ]
-    
-    df_books = df_books[ordered_columns]
+    total = 0
+    for batch_number, batch in enumerate(iter_batches(books, batch_size)):
+        start = time.perf_counter()
+        write_books_csv(batch, file_path, append=batch_number > 0)
+        if on_batch:
+            on_batch(batch)
+        controller.metrics.observe_write(time.perf_counter() - start, len(batch))
+        total += len(batch)
+        logging.info(f'Lote {batch_number + 1} gravado ({total} livros até agora).')
 
-    logging.info('DataFrame criado com sucesso!')
- 
-    file_path = 'data/books.csv'
+    logging.info(f'\nTotal de {total} livros coletados.')
+    controller.metrics.finish()
+    controller.metrics.log_summary()
 
-    df_books.to_csv(file_path, index=False, encoding='utf-8')
-    logging.info(f'Dados salvos em "{file_path}"')
+    if not total:
+        logging.warning('Nenhum dado de livro foi coletado.')
+    else:
+        logging.info(f'Dados salvos em "{file_path}"')
 
-    return df_books
\ No newline at end of file
+    return total
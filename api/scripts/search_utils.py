@@ -0,0 +1,301 @@
+import logging
+import re
+from typing import Iterator, List, Optional, Sequence, Tuple
+from flask import current_app
+from sqlalchemy import Double, Float, Integer, and_, cast, literal, or_, text
+from api.config import Config
+from api.extensions import db
+from api.models.book_details import BookDetails
+from api.models.books import Books
+from api.models.genres import Genre
+from api.models.books_search import FTS_TABLE, SEARCH_VECTOR_COLUMN, sqlite_has_fts5
+from api.scripts.load_utils import get_dialect_name
+from api.scripts.fuzzy_utils import find_similar_titles
+from api.scripts.pagination_utils import Page, PaginationError, decode_cursor, paginate
+from api.scripts.serialization_utils import BOOK_SUMMARY_FIELDS, book_bundle, book_columns, with_keys
+from api.scripts.streaming_utils import iter_rows
+
+
+logger = logging.getLogger(__name__)
+
+SEARCH_POSTGRES = 'postgresql'
+SEARCH_SQLITE = 'sqlite'
+SEARCH_LIKE = 'like'
+
+#origem dos resultados de uma página, gravada no cursor: a ordem (e a escala da relevância) de cada uma é diferente
+SEARCH_MODE_TEXT = 'text'
+SEARCH_MODE_FUZZY = 'fuzzy'
+#cursor da busca: (origem, relevância, título, id) do último livro da página
+SEARCH_CURSOR_TYPES = (str, float, str, int)
+
+#pesos das colunas no bm25 do FTS5 (title, genre, description), equivalentes aos pesos A, B e C do Postgres
+FTS5_WEIGHTS = (10.0, 5.0, 1.0)
+#letras e dígitos, separando em pontuação e sublinhado como os tokenizadores do Postgres (simple) e do FTS5 (unicode61)
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+
+def get_search_backend() -> str:
+    '''Retorna o mecanismo de busca disponível: tsvector (Postgres), FTS5 (SQLite) ou LIKE.'''
+    dialect = get_dialect_name()
+    if dialect == 'postgresql':
+        return SEARCH_POSTGRES
+    if dialect == 'sqlite' and sqlite_has_fts5():
+        return SEARCH_SQLITE
+    return SEARCH_LIKE
+
+
+def get_include_description(include_description: Optional[bool] = None) -> bool:
+    '''Retorna include_description ou, se não informado, SEARCH_INCLUDE_DESCRIPTION da configuração da aplicação.'''
+    if include_description is None:
+        return current_app.config.get('SEARCH_INCLUDE_DESCRIPTION', Config.SEARCH_INCLUDE_DESCRIPTION)
+    return include_description
+
+
+def tokenize(term: Optional[str]) -> List[str]:
+    '''Divide o termo de busca em tokens, em minúsculas.'''
+    return TOKEN_PATTERN.findall(term.lower()) if term else []
+
+
+def build_tsquery(title_tokens: List[str], genre_tokens: List[str], include_description: bool) -> str:
+    '''
+    Monta o tsquery do Postgres: todos os tokens de cada parâmetro, como prefixos, restritos aos
+    pesos das colunas (A título, B gênero, C descrição); os parâmetros são combinados com OR.
+    '''
+    title_weights = 'AC' if include_description else 'A'
+    groups = []
+    if title_tokens:
+        groups.append(' & '.join(f'{token}:*{title_weights}' for token in title_tokens))
+    if genre_tokens:
+        groups.append(' & '.join(f'{token}:*B' for token in genre_tokens))
+    return ' | '.join(f'({group})' for group in groups)
+
+
+def build_fts5_query(title_tokens: List[str], genre_tokens: List[str], include_description: bool) -> str:
+    '''
+    Monta a expressão MATCH do FTS5: todos os tokens de cada parâmetro, como prefixos, restritos às
+    colunas correspondentes; os parâmetros são combinados com OR. Os tokens são citados para que
+    palavras como AND, OR e NEAR não sejam interpretadas como operadores.
+    '''
+    title_columns = '{title description}' if include_description else 'title'
+    groups = []
+    if title_tokens:
+        groups.append(f'{title_columns} : (' + ' AND '.join(f'"{token}"*' for token in title_tokens) + ')')
+    if genre_tokens:
+        groups.append('genre : (' + ' AND '.join(f'"{token}"*' for token in genre_tokens) + ')')
+    return ' OR '.join(groups)
+
+
+def search_books(
+    title: Optional[str] = None,
+    genre: Optional[str] = None,
+    include_description: Optional[bool] = None,
+    fuzzy: bool = True,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Sequence[str] = BOOK_SUMMARY_FIELDS
+) -> Page:
+    '''
+    Busca livros por título e/ou gênero no índice de texto completo, ordenados por relevância.
+
+    Cada palavra do termo é buscada como prefixo ("murd" encontra "Murder") e todas as palavras
+    de um parâmetro precisam estar presentes; os parâmetros são combinados com OR. No Postgres a
+    consulta usa o índice GIN sobre books.search_vector (ts_rank); no SQLite, a tabela FTS5
+    books_fts (bm25). Nos demais bancos, a busca é feita com ILIKE, sem relevância.
+
+    Se nada for encontrado e houver termo de título, a busca é refeita por similaridade de
+    trigramas (find_similar_titles), o que tolera erros de digitação ("murdr" encontra "Murder");
+    nesse caso a relevância é a similaridade entre 0 e 1.
+
+    Args:
+        title (str, optional): Termo buscado no título.
+        genre (str, optional): Termo buscado no gênero.
+        include_description (bool, optional): Se o termo do título também é buscado na descrição
+            (com peso menor). Padrão é SEARCH_INCLUDE_DESCRIPTION da configuração.
+        fuzzy (bool, optional): Se a busca aproximada por título é usada quando nada é encontrado.
+        limit (int, optional): Tamanho da página; None retorna todos os resultados.
+        cursor (str, optional): Cursor da página anterior (Page.next_cursor), para continuar a partir
+            do último livro dela (paginação por chave: relevância, título e id).
+        fields (sequence, optional): Colunas de books lidas para cada livro, além do título e do id
+            (chaves da ordenação). Padrão é BOOK_SUMMARY_FIELDS.
+
+    Returns:
+        Page: Pares (livro, relevância), do mais para o menos relevante (empate por título e id).
+              O livro é uma tupla só com as colunas de fields (acessíveis como atributos),
+              e não a entidade Books. Quanto maior a relevância, melhor; a escala depende do banco.
+
+    Raises:
+        PaginationError: Se o cursor for inválido.
+    '''
+    after = decode_cursor(cursor, SEARCH_CURSOR_TYPES) if cursor else None
+    if after and after[0] not in (SEARCH_MODE_TEXT, SEARCH_MODE_FUZZY):
+        raise PaginationError('O parâmetro cursor é inválido.')
+
+    include_description = get_include_description(include_description)
+    fields = with_keys(fields, ('title', 'id'))
+    if not after or after[0] == SEARCH_MODE_TEXT:
+        keyset = after[1:] if after else None
+        backend = get_search_backend()
+        if backend == SEARCH_LIKE:
+            results = _search_books_like(title, genre, include_description, fields, limit, keyset)
+        else:
+            results = _search_books_full_text(backend, title, genre, include_description, fields, limit, keyset)
+        #a busca aproximada só substitui a primeira página vazia, nunca a continuação da busca exata
+        if results or after or not fuzzy or not title:
+            return paginate(results, limit, lambda row: (SEARCH_MODE_TEXT, row[1], row[0].title, row[0].id))
+
+    keyset = after[1:] if after else None
+    return paginate(_search_books_fuzzy(title, fields, keyset), limit, lambda row: (SEARCH_MODE_FUZZY, row[1], row[0].title, row[0].id))
+
+
+def build_ranked_subquery(backend: str, title_tokens: List[str], genre_tokens: List[str], include_description: bool):
+    '''
+    Subconsulta ranked (id, rank) com os livros que correspondem aos tokens no índice de texto
+    completo do banco (tsvector no Postgres, FTS5 no SQLite), para ser unida a books pelo id.
+    '''
+    if backend == SEARCH_POSTGRES:
+        query = build_tsquery(title_tokens, genre_tokens, include_description)
+        #ts_rank retorna real (float4); em float8 o valor lido no Python (e gravado no cursor) é exatamente o do banco
+        ranked = text(
+            f"SELECT id, ts_rank({SEARCH_VECTOR_COLUMN}, to_tsquery('simple', :query))::float8 AS rank "
+            f"FROM books WHERE {SEARCH_VECTOR_COLUMN} @@ to_tsquery('simple', :query)"
+        )
+    else:
+        query = build_fts5_query(title_tokens, genre_tokens, include_description)
+        weights = ', '.join(str(weight) for weight in FTS5_WEIGHTS)
+        #o bm25 é negativo (menor é melhor); o sinal é invertido para manter "maior é melhor"
+        ranked = text(f'SELECT rowid AS id, -bm25({FTS_TABLE}, {weights}) AS rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :query')
+    return ranked.bindparams(query=query).columns(id=Integer, rank=Float).subquery('ranked')
+
+
+def after_keyset(rank, keyset: Tuple[float, str, int]):
+    '''Condição dos livros posteriores a keyset (relevância, título, id) na ordem relevância desc, título asc, id asc.'''
+    rank_value, title, book_id = keyset
+    #comparada em precisão dupla, a mesma da relevância de build_ranked_subquery
+    rank_value = cast(literal(rank_value), Double)
+    return or_(
+        rank < rank_value,
+        and_(rank == rank_value, or_(Books.title > title, and_(Books.title == title, Books.id > book_id)))
+    )
+
+
+def _full_text_query(
+    backend: str,
+    title: Optional[str],
+    genre: Optional[str],
+    include_description: bool,
+    fields: Sequence[str] = BOOK_SUMMARY_FIELDS,
+    keyset: Optional[Tuple[float, str, int]] = None
+):
+    '''Consulta ordenada da busca no índice de texto completo (None se não houver termos).'''
+    title_tokens, genre_tokens = tokenize(title), tokenize(genre)
+    if not title_tokens and not genre_tokens:
+        return None
+
+    ranked = build_ranked_subquery(backend, title_tokens, genre_tokens, include_description)
+    query = db.session.query(book_bundle(fields), ranked.c.rank).select_from(Books).join(ranked, ranked.c.id == Books.id)
+    if keyset:
+        query = query.filter(after_keyset(ranked.c.rank, keyset))
+    return query.order_by(ranked.c.rank.desc(), Books.title.asc(), Books.id.asc())
+
+
+def _like_query(
+    title: Optional[str],
+    genre: Optional[str],
+    include_description: bool,
+    fields: Sequence[str] = BOOK_SUMMARY_FIELDS,
+    keyset: Optional[Tuple[float, str, int]] = None
+):
+    '''Consulta ordenada da busca por correspondência parcial (None se não houver termos).'''
+    filters = []
+    if title:
+        filters.append(Books.title.ilike(f'%{title}%'))
+        if include_description:
+            filters.append(Books.details.has(BookDetails.description.ilike(f'%{title}%')))
+    if genre:
+        filters.append(Books.genre_id.in_(db.select(Genre.id).where(Genre.name.ilike(f'%{genre}%'))))
+    if not filters:
+        return None
+    rank = literal(0.0)
+    query = db.session.query(book_bundle(fields), rank).select_from(Books).filter(or_(*filters))
+    if keyset:
+        query = query.filter(after_keyset(rank, keyset))
+    return query.order_by(Books.title.asc(), Books.id.asc())
+
+
+def _search_books_full_text(
+    backend: str,
+    title: Optional[str],
+    genre: Optional[str],
+    include_description: bool,
+    fields: Sequence[str] = BOOK_SUMMARY_FIELDS,
+    limit: Optional[int] = None,
+    keyset: Optional[Tuple[float, str, int]] = None
+) -> List[Tuple]:
+    '''Busca no índice de texto completo do banco (tsvector no Postgres, FTS5 no SQLite).'''
+    query = _full_text_query(backend, title, genre, include_description, fields, keyset)
+    if query is None:
+        return []
+    #uma linha além do limite indica se há próxima página (ver pagination_utils.paginate)
+    return (query.limit(limit + 1) if limit else query).all()
+
+
+def _search_books_like(
+    title: Optional[str],
+    genre: Optional[str],
+    include_description: bool,
+    fields: Sequence[str] = BOOK_SUMMARY_FIELDS,
+    limit: Optional[int] = None,
+    keyset: Optional[Tuple[float, str, int]] = None
+) -> List[Tuple]:
+    '''Busca por correspondência parcial (ILIKE), para bancos sem índice de texto completo.'''
+    query = _like_query(title, genre, include_description, fields, keyset)
+    if query is None:
+        return []
+    return (query.limit(limit + 1) if limit else query).all()
+
+
+def iter_search_books(
+    title: Optional[str] = None,
+    genre: Optional[str] = None,
+    include_description: Optional[bool] = None,
+    fields: Sequence[str] = BOOK_SUMMARY_FIELDS
+) -> Iterator[Tuple]:
+    '''
+    Percorre todos os resultados da busca (os mesmos pares (livro, relevância) de search_books,
+    na mesma ordem) lendo as linhas em lotes (streaming_utils.iter_rows), sem paginação e sem
+    materializar a lista. A busca aproximada só é usada se a busca exata não encontrar nada.
+    '''
+    include_description = get_include_description(include_description)
+    fields = with_keys(fields, ('title', 'id'))
+    backend = get_search_backend()
+    if backend == SEARCH_LIKE:
+        query = _like_query(title, genre, include_description, fields)
+    else:
+        query = _full_text_query(backend, title, genre, include_description, fields)
+    found = False
+    for row in iter_rows(query) if query is not None else ():
+        found = True
+        yield row
+    if not found and title:
+        yield from _search_books_fuzzy(title, fields)
+
+
+def _search_books_fuzzy(
+    title: str,
+    fields: Sequence[str] = BOOK_SUMMARY_FIELDS,
+    keyset: Optional[Tuple[float, str, int]] = None
+) -> List[Tuple]:
+    '''Busca aproximada por título (trigramas), na ordem de similaridade (empate por título e id).'''
+    matches = find_similar_titles(title)
+    if not matches:
+        return []
+    rows = Books.query.with_entities(*book_columns(fields)).filter(Books.id.in_([book_id for book_id, _, _ in matches]))
+    books = {book.id: book for book in rows}
+    results = sorted(
+        ((books[book_id], score) for book_id, _, score in matches if book_id in books),
+        key=lambda row: (-row[1], row[0].title, row[0].id)
+    )
+    if keyset:
+        rank_value, title_value, book_id = keyset
+        results = [row for row in results if (-row[1], row[0].title, row[0].id) > (-rank_value, title_value, book_id)]
+    return results
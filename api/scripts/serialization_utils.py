@@ -0,0 +1,83 @@
+from operator import attrgetter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from flask import request
+from sqlalchemy.orm import Bundle
+from api.models.book_details import BOOK_DETAIL_COLUMNS, BookDetails
+from api.models.books import Books
+
+
+#campos de um livro em /books/details, na ordem da resposta (colunas de books e de book_details)
+BOOK_FIELDS = (
+    'id', 'upc', 'title', 'genre', 'price', 'availability', 'rating', 'description', 'product_type',
+    'price_excl_tax', 'price_incl_tax', 'tax', 'number_of_reviews', 'url', 'image_url'
+)
+#campos que as listagens aceitam em ?fields=: só as colunas da tabela books (e do snapshot colunar)
+BOOK_LIST_FIELDS = tuple(field for field in BOOK_FIELDS if field not in BOOK_DETAIL_COLUMNS)
+#campos das listagens de livros (busca, faixa de preço, busca facetada)
+BOOK_SUMMARY_FIELDS = ('id', 'upc', 'title', 'genre', 'price', 'image_url')
+#campos da listagem dos mais bem avaliados
+TOP_RATED_FIELDS = ('id', 'upc', 'title', 'genre', 'rating', 'price', 'image_url')
+
+
+class FieldsError(ValueError):
+    '''Parâmetro fields com campos desconhecidos ou não aceitos pelo endpoint.'''
+
+
+def parse_fields(value: Optional[str], allowed: Sequence[str]) -> Optional[Tuple[str, ...]]:
+    '''
+    Converte o parâmetro fields (campos separados por vírgula) em uma tupla de campos, na ordem
+    informada e sem repetições, ou None se ausente (cada função usa então os seus campos padrão).
+
+    Raises:
+        FieldsError: Se algum campo não estiver em allowed.
+    '''
+    if value is None:
+        return None
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    if not fields or any(field not in allowed for field in fields):
+        raise FieldsError(f'O parâmetro fields aceita apenas os campos: {", ".join(allowed)}.')
+    return fields
+
+
+def get_fields_arg(allowed: Sequence[str] = BOOK_LIST_FIELDS) -> Optional[Tuple[str, ...]]:
+    '''Lê o parâmetro fields da query string da requisição atual (ver parse_fields).'''
+    return parse_fields(request.args.get('fields'), allowed)
+
+
+def with_keys(fields: Sequence[str], keys: Sequence[str]) -> Tuple[str, ...]:
+    '''Campos a consultar: os campos pedidos mais as chaves de que a consulta precisa (ordenação, cursor), sem repetições.'''
+    return tuple(dict.fromkeys((*fields, *keys)))
+
+
+def needs_details(fields: Sequence[str]) -> bool:
+    '''Indica se algum dos campos está em book_details (e a consulta precisa da junção com a tabela).'''
+    return any(field in BOOK_DETAIL_COLUMNS for field in fields)
+
+
+def book_columns(fields: Sequence[str]) -> List:
+    '''
+    Colunas correspondentes aos campos, para consultas que projetam só o necessário
+    (Books.query.with_entities(*book_columns(...))) em vez de carregar a entidade inteira, com a
+    descrição e as demais colunas que as listagens não retornam. Os campos de book_details vêm
+    de BookDetails (a consulta deve incluir a junção, ver needs_details).
+    '''
+    return [getattr(BookDetails if field in BOOK_DETAIL_COLUMNS else Books, field) for field in fields]
+
+
+def book_bundle(fields: Sequence[str], name: str = 'book') -> Bundle:
+    '''Colunas de Books agrupadas em um Bundle, para consultas que retornam o livro ao lado de outros valores (e.g., relevância).'''
+    return Bundle(name, *book_columns(fields))
+
+
+def serialize_rows(rows: Iterable, fields: Sequence[str]) -> List[Dict]:
+    '''
+    Converte linhas em dicionários com os campos informados, na ordem deles.
+
+    Aceita qualquer linha com os campos como atributos: tuplas do SQLAlchemy (Row), CatalogRow do
+    snapshot ou entidades Books. Os valores são lidos com um único attrgetter por lista.
+    '''
+    if len(fields) == 1:
+        field = fields[0]
+        return [{field: getattr(row, field)} for row in rows]
+    getter = attrgetter(*fields)
+    return [dict(zip(fields, getter(row))) for row in rows]
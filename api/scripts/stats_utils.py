@@ -1,6 +1,13 @@
+import copy
 import logging
-from sqlalchemy import func
-from api.models.books import Books
+from api.scripts.catalog_snapshot_utils import get_catalog_snapshot
+from api.scripts.catalog_stats_utils import (
+    STATS_GENRES,
+    STATS_OVERVIEW,
+    compute_stats_by_genre,
+    compute_stats_overview,
+    get_catalog_stats
+)
 
 
 logger = logging.getLogger('__name__')
@@ -13,30 +20,22 @@ def get_stats_overview():
     Calculates:
         - O número total de livros.
         - O preço médio de todos os livros.
-        - A distribuição e contagem de cada nível de rating (avaliação).
+        - A distribuição e contagem de cada nível de rating (avaliação); avaliações fora de One a Five
+          são contadas como 'No Rating'.
+
+    As estatísticas são recalculadas a cada gravação em books e lidas da tabela catalog_stats
+    pela chave primária; enquanto não houver linha gravada, são agregadas na hora.
 
     Returns:
         dict: Um dicionário contendo o total de livros, preço médio formatado e a distribuição de ratings.
               Retorna None em caso de erro.
     '''
     try:
-        total_books = Books.query.count()
-        avg_price = (
-            Books.query
-            .with_entities(func.avg(Books.price))
-            .scalar()
-        )
-        rating_distribution = (
-            Books.query.with_entities(Books.rating, func.count(Books.rating))
-            .group_by(Books.rating)
-            .order_by(func.count(Books.rating).desc())
-            .all()
-        )
-        return {
-            'total_books': total_books,
-            'avg_price': round(avg_price, 2) if avg_price else 0.0,
-            'rating_distribution': [{'rating': r[0], 'total': r[1]} for r in rating_distribution]
-        }
+        snapshot = get_catalog_snapshot()
+        if snapshot is not None:
+            return copy.deepcopy(snapshot.overview)
+        stats = get_catalog_stats(STATS_OVERVIEW)
+        return stats if stats is not None else compute_stats_overview()
     except Exception as e:
         logger.error(f'error: {e}')
         return None
@@ -50,30 +49,18 @@ def get_stats_by_genre():
         - A quantidade de livros em cada categoria.
         - O preço médio dos livros em cada categoria.
 
+    Como em get_stats_overview, o resultado vem da tabela catalog_stats quando já calculado.
+
     Returns:
         list: Uma lista de dicionários, onde cada dicionário contém a categoria, a quantidade de livros e o preço médio formatado.
               Retorna None em caso de erro.
     '''
     try:
-        category_stats = (
-            Books.query.with_entities(
-                Books.genre,
-                func.count(Books.genre).label('count'),
-                func.avg(Books.price).label('avg_price')
-            )
-            .group_by(Books.genre)
-            .order_by(func.count(Books.genre).desc())
-            .all()
-        )
-        results = [
-            {
-                'genre': stat.genre,
-                'total': stat.count,
-                'avg_price': round(stat.avg_price, 2)
-            }
-            for stat in category_stats
-        ]
-        return results
+        snapshot = get_catalog_snapshot()
+        if snapshot is not None:
+            return copy.deepcopy(snapshot.genre_stats)
+        stats = get_catalog_stats(STATS_GENRES)
+        return stats if stats is not None else compute_stats_by_genre()
     except Exception as e:
         logger.error(f'error: {e}')
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,93 @@
+import itertools
+import logging
+from typing import Any, Iterable, Iterator, Optional
+from flask import Response, current_app, request, stream_with_context
+from api.config import Config
+from api.extensions import db
+
+
+logger = logging.getLogger(__name__)
+
+#formatos do modo streaming: um array JSON emitido aos pedaços ou um objeto JSON por linha (NDJSON)
+STREAM_JSON = 'json'
+STREAM_NDJSON = 'ndjson'
+STREAM_MIMETYPES = {
+    STREAM_JSON: 'application/json',
+    STREAM_NDJSON: 'application/x-ndjson'
+}
+
+
+class StreamError(ValueError):
+    '''Parâmetro stream com formato desconhecido.'''
+
+
+def get_stream_arg() -> Optional[str]:
+    '''
+    Lê o formato de streaming da requisição atual: o parâmetro stream (json ou ndjson) ou, na
+    ausência dele, o cabeçalho Accept (application/x-ndjson). Retorna None fora do modo streaming.
+
+    Raises:
+        StreamError: Se o parâmetro stream não for um formato conhecido.
+    '''
+    value = request.args.get('stream')
+    if value is not None:
+        if value not in STREAM_MIMETYPES:
+            raise StreamError(f'O parâmetro stream deve ser um dos formatos: {", ".join(STREAM_MIMETYPES)}.')
+        return value
+    best = request.accept_mimetypes.best_match([STREAM_MIMETYPES[STREAM_JSON], STREAM_MIMETYPES[STREAM_NDJSON]])
+    return STREAM_NDJSON if best == STREAM_MIMETYPES[STREAM_NDJSON] else None
+
+
+def is_stream_request() -> bool:
+    '''Indica se a requisição atual pede o modo streaming (usado no unless do cache: respostas em streaming não são cacheadas).'''
+    try:
+        return get_stream_arg() is not None
+    except StreamError:
+        return False
+
+
+def iter_rows(query, batch_size: Optional[int] = None) -> Iterator:
+    '''
+    Percorre as linhas de uma consulta (Query ou select) em lotes de batch_size, sem carregar o
+    resultado inteiro: com yield_per, o Postgres usa um cursor do servidor (stream_results) e os
+    demais bancos leem as linhas do cursor aos poucos (fetchmany).
+    '''
+    batch_size = batch_size or current_app.config.get('STREAM_YIELD_PER', Config.STREAM_YIELD_PER)
+    if hasattr(query, 'yield_per'):
+        return iter(query.yield_per(batch_size))
+    return iter(db.session.execute(query, execution_options={'yield_per': batch_size}))
+
+
+def stream_response(items: Iterable[Any], stream_format: str) -> Response:
+    '''
+    Resposta em streaming com os itens serializados à medida que são lidos: um array JSON (o
+    mesmo corpo de jsonify, emitido aos pedaços) ou NDJSON (um objeto por linha).
+
+    Os itens são agrupados em blocos de STREAM_YIELD_PER por escrita. Como o status e os
+    cabeçalhos já foram enviados, um erro durante a leitura apenas interrompe a resposta
+    (registrado no log).
+    '''
+    dumps = current_app.json.dumps
+    batch_size = current_app.config.get('STREAM_YIELD_PER', Config.STREAM_YIELD_PER)
+
+    def generate():
+        iterator = iter(items)
+        separator = ''
+        try:
+            if stream_format == STREAM_JSON:
+                yield '['
+            while True:
+                batch = list(itertools.islice(iterator, batch_size))
+                if not batch:
+                    break
+                if stream_format == STREAM_NDJSON:
+                    yield ''.join(dumps(item) + '\n' for item in batch)
+                else:
+                    yield separator + ','.join(dumps(item) for item in batch)
+                    separator = ','
+            if stream_format == STREAM_JSON:
+                yield ']'
+        except Exception as e:
+            logger.error(f'Erro durante o streaming da resposta: {e}')
+
+    return Response(stream_with_context(generate()), mimetype=STREAM_MIMETYPES[stream_format])
@@ -0,0 +1,178 @@
+'''
+Benchmark offline do scraper.
+
+Executa run_scraping() contra o servidor local (benchmarks.standin_server), sem acessar
+o books.toscrape.com, e reporta páginas/s, bytes baixados, tempo de coleta (rede) x tempo
+de extração (parser) e pico de memória. O pico de memória é medido com tracemalloc em uma
+execução à parte, depois das execuções cronometradas, para não inflar os tempos reportados.
+
+Uso:
+    python -m benchmarks.bench_scrape --parser lxml --latency 0.02 --repeat 5
+    python -m benchmarks.bench_scrape --error-rate 0.05 --seed 42 --json resultado.json
+    python -m benchmarks.bench_scrape --cache-dir /tmp/scrape-cache --repeat 3
+
+Com --cache-dir, a primeira execução popula o cache HTTP em disco e as seguintes reproduzem as
+respostas a partir dele, medindo apenas o custo de extração.
+'''
+import argparse
+import json
+import os
+import resource
+import socket
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from unittest.mock import patch
+from benchmarks.standin_server import CORPUS_DIR, StandInServer
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark offline do scraper.')
+    parser.add_argument('--parser', default=None, help='Backend de extração (padrão: SCRAPER_PARSER).')
+    parser.add_argument('--corpus', default=CORPUS_DIR, help='Diretório com as páginas salvas.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Latência do servidor por resposta, em segundos.')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Variação máxima da latência, em segundos.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probabilidade de o servidor responder com erro.')
+    parser.add_argument('--seed', type=int, default=0, help='Semente da injeção de erros e da latência.')
+    parser.add_argument('--repeat', type=int, default=3, help='Número de execuções.')
+    parser.add_argument('--json', default=None, help='Arquivo para gravar as métricas de cada execução.')
+    parser.add_argument('--cache-dir', default=None, help='Diretório do cache HTTP em disco (padrão: sem cache).')
+    parser.add_argument('--port', type=int, default=0, help='Porta do servidor local (padrão: porta livre, fixa entre execuções com --cache-dir).')
+    return parser.parse_args()
+
+
+class CrawlProbe:
+    '''Acumula tempos e volumes de rede e de extração durante uma execução.'''
+    def __init__(self):
+        self.pages = 0
+        self.bytes = 0
+        self.fetch_seconds = 0.0
+        self.parse_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def timed_get(self, get):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            response = get(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.pages += 1
+                self.bytes += len(response.content or b'')
+                self.fetch_seconds += elapsed
+            return response
+        return wrapper
+
+    def timed_extractor(self, extractor):
+        probe = self
+
+        class TimedExtractor(type(extractor)):
+            def _timed(self, method, html):
+                start = time.perf_counter()
+                try:
+                    return method(self, html)
+                finally:
+                    with probe._lock:
+                        probe.parse_seconds += time.perf_counter() - start
+
+            def parse_categories(self, html):
+                return self._timed(type(extractor).parse_categories, html)
+
+            def parse_category_page(self, html):
+                return self._timed(type(extractor).parse_category_page, html)
+
+            def parse_book_page(self, html):
+                return self._timed(type(extractor).parse_book_page, html)
+
+        return TimedExtractor()
+
+
+def run_once(args, scrape_utils, extractor, trace_memory=False):
+    '''Executa uma coleta; com trace_memory, mede também o pico de memória alocada (tracemalloc).'''
+    import requests
+    from api.scripts.crawl_utils import CrawlController
+    from api.scripts.http_cache_utils import ResponseCache
+
+    probe = CrawlProbe()
+    server = StandInServer(
+        corpus_dir=args.corpus,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        seed=args.seed
+    )
+    controller = CrawlController.from_config()
+    if args.cache_dir:
+        controller.cache = ResponseCache(args.cache_dir)
+    with server, tempfile.TemporaryDirectory() as tmp_dir, \
+            patch.object(scrape_utils, 'BASE_URL', server.base_url), \
+            patch.object(scrape_utils, 'HOME_URL', server.base_url + 'index.html'), \
+            patch.object(requests, 'get', probe.timed_get(requests.get)):
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        books = scrape_utils.run_scraping(
+            file_path=os.path.join(tmp_dir, 'books.csv'),
+            extractor=probe.timed_extractor(extractor),
+            controller=controller
+        )
+        wall_seconds = time.perf_counter() - start
+        if trace_memory:
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    cache_hits = controller.cache.hits if controller.cache else 0
+    run = {
+        'parser': extractor.name,
+        'books': books,
+        'pages': probe.pages,
+        'cache_hits': cache_hits,
+        'bytes': probe.bytes,
+        'errors_injected': server.errors_injected,
+        'wall_seconds': wall_seconds,
+        'pages_per_second': (probe.pages + cache_hits) / wall_seconds if wall_seconds else 0.0,
+        'fetch_seconds': probe.fetch_seconds,
+        'parse_seconds': probe.parse_seconds
+    }
+    if trace_memory:
+        run['peak_traced_memory_bytes'] = peak_bytes
+    return run
+
+
+def main():
+    args = parse_args()
+    if args.cache_dir and not args.port:
+        #as chaves do cache incluem o host e a porta, que precisam se repetir entre as execuções
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            args.port = sock.getsockname()[1]
+
+    from api.scripts import scrape_utils
+    from api.scripts.extract_utils import get_extractor
+
+    extractor = get_extractor(args.parser)
+    runs = [run_once(args, scrape_utils, extractor) for _ in range(args.repeat)]
+    #o tracemalloc deixa as alocações bem mais lentas: o pico é medido em uma execução separada
+    peak_bytes = run_once(args, scrape_utils, extractor, trace_memory=True)['peak_traced_memory_bytes']
+
+    print(f'Parser: {extractor.name} | latência: {args.latency}s | erros: {args.error_rate:.0%} | execuções: {len(runs)}')
+    print(f'{"execução":>8} {"livros":>7} {"páginas":>8} {"cache":>6} {"erros":>6} {"págs/s":>9} {"KiB":>9} {"rede (s)":>9} {"parser (s)":>11}')
+    for number, run in enumerate(runs, start=1):
+        print(
+            f'{number:>8} {run["books"]:>7} {run["pages"]:>8} {run["cache_hits"]:>6} {run["errors_injected"]:>6} {run["pages_per_second"]:>9.1f} '
+            f'{run["bytes"] / 1024:>9.1f} {run["fetch_seconds"]:>9.3f} {run["parse_seconds"]:>11.3f}'
+        )
+    print(f'Mediana págs/s: {statistics.median(run["pages_per_second"] for run in runs):.1f}')
+    print(f'Pico de memória alocada (tracemalloc, execução separada): {peak_bytes / 2**20:.2f} MiB')
+    #ru_maxrss é reportado em KiB no Linux
+    print(f'Pico de RSS do processo: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump({'args': vars(args), 'runs': runs, 'peak_traced_memory_bytes': peak_bytes}, file, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+'''
+Servidor HTTP local que substitui o books.toscrape.com em testes e benchmarks.
+
+Serve as páginas salvas em tests/fixtures/books_toscrape, com latência e injeção de
+erros configuráveis.
+
+Uso:
+    python -m benchmarks.standin_server --port 8000 --latency 0.05 --error-rate 0.1
+
+Com o servidor no ar, a API pode ser apontada para ele com SCRAPER_BASE_URL=http://127.0.0.1:8000/.
+'''
+import argparse
+import os
+import random
+import threading
+import time
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'fixtures', 'books_toscrape')
+
+
+class StandInServer:
+    '''
+    Servidor local do corpus de páginas, executado em uma thread em segundo plano.
+
+    Args:
+        corpus_dir (str): Diretório com as páginas salvas.
+        port (int): Porta de escuta (0 escolhe uma porta livre).
+        latency (float): Atraso, em segundos, aplicado a cada resposta.
+        jitter (float): Variação aleatória máxima, em segundos, somada à latência.
+        error_rate (float): Probabilidade (0 a 1) de responder com erro.
+        error_status (int): Código HTTP das respostas de erro injetadas.
+        retry_after (int, optional): Valor do cabeçalho Retry-After nas respostas de erro.
+        seed (int, optional): Semente do gerador aleatório, para execuções reprodutíveis.
+    '''
+    def __init__(
+        self,
+        corpus_dir=CORPUS_DIR,
+        port=0,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        error_status=HTTPStatus.SERVICE_UNAVAILABLE,
+        retry_after=None,
+        seed=None
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.requests_served = 0
+        self.errors_injected = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        server = self
+
+        class Handler(SimpleHTTPRequestHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=corpus_dir, **kwargs)
+
+            def do_GET(self):
+                delay, fail = server._next_behavior()
+                if delay:
+                    time.sleep(delay)
+                if fail:
+                    self.send_response(server.error_status)
+                    if server.retry_after is not None:
+                        self.send_header('Retry-After', str(server.retry_after))
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                super().do_GET()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        '''URL base do servidor, no mesmo formato de scrape_utils.BASE_URL.'''
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def _next_behavior(self):
+        with self._lock:
+            self.requests_served += 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+            if fail:
+                self.errors_injected += 1
+            return delay, fail
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Servidor local que substitui o books.toscrape.com.')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--corpus', default=CORPUS_DIR, help='Diretório com as páginas salvas.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Latência por resposta, em segundos.')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Variação máxima da latência, em segundos.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probabilidade de responder com erro.')
+    parser.add_argument('--error-status', type=int, default=503, help='Código HTTP dos erros injetados.')
+    parser.add_argument('--retry-after', type=int, default=None, help='Cabeçalho Retry-After dos erros injetados.')
+    parser.add_argument('--seed', type=int, default=None)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    server = StandInServer(
+        corpus_dir=args.corpus,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+    print(f'Servindo {args.corpus} em {server.base_url} (Ctrl+C para encerrar)')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Busca de texto completo
+
+Revision ID: 0b6d4e8a7c21
+Revises: f3a7b2c9e104
+Create Date: 2026-10-19 15:42:08.771903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b6d4e8a7c21'
+down_revision = 'f3a7b2c9e104'
+branch_labels = None
+depends_on = None
+
+POSTGRES_UPGRADE = [
+    #coluna gerada: preenchida para as linhas existentes e mantida pelo próprio banco nas cargas do scraping
+    '''ALTER TABLE books ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(genre, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED''',
+    'CREATE INDEX ix_books_search_vector ON books USING gin (search_vector)'
+]
+
+SQLITE_UPGRADE = [
+    '''CREATE VIRTUAL TABLE books_fts USING fts5(
+        title, genre, description, content='books', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )''',
+    #triggers mantêm o índice sincronizado com INSERT, upsert (ON CONFLICT DO UPDATE) e DELETE em books
+    '''CREATE TRIGGER books_fts_ai AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, title, genre, description) VALUES (new.id, new.title, new.genre, new.description);
+    END''',
+    '''CREATE TRIGGER books_fts_ad AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, genre, description) VALUES ('delete', old.id, old.title, old.genre, old.description);
+    END''',
+    '''CREATE TRIGGER books_fts_au AFTER UPDATE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, genre, description) VALUES ('delete', old.id, old.title, old.genre, old.description);
+        INSERT INTO books_fts(rowid, title, genre, description) VALUES (new.id, new.title, new.genre, new.description);
+    END''',
+    #indexa os livros já existentes
+    "INSERT INTO books_fts(books_fts) VALUES ('rebuild')"
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    statements = {'postgresql': POSTGRES_UPGRADE, 'sqlite': SQLITE_UPGRADE}.get(dialect, [])
+    for statement in statements:
+        op.execute(sa.text(statement))
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute(sa.text('DROP INDEX IF EXISTS ix_books_search_vector'))
+        op.execute(sa.text('ALTER TABLE books DROP COLUMN IF EXISTS search_vector'))
+    elif dialect == 'sqlite':
+        for trigger in ('books_fts_au', 'books_fts_ad', 'books_fts_ai'):
+            op.execute(sa.text(f'DROP TRIGGER IF EXISTS {trigger}'))
+        op.execute(sa.text('DROP TABLE IF EXISTS books_fts'))
@@ -0,0 +1,40 @@
+"""Tabela scrape_job
+
+Revision ID: 3b9d2f6c1a47
+Revises: 76e640c44ba2
+Create Date: 2026-10-19 10:12:44.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9d2f6c1a47'
+down_revision = '76e640c44ba2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('scrape_job',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('categories', sa.JSON(), nullable=True),
+    sa.Column('categories_total', sa.Integer(), nullable=False),
+    sa.Column('categories_done', sa.Integer(), nullable=False),
+    sa.Column('pages_done', sa.Integer(), nullable=False),
+    sa.Column('books_parsed', sa.Integer(), nullable=False),
+    sa.Column('checkpoint_url', sa.String(length=1024), nullable=True),
+    sa.Column('active_seconds', sa.Float(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('scrape_job')
@@ -0,0 +1,168 @@
+"""Partição vertical de books
+
+Revision ID: 4d7b1e9c3a52
+Revises: 9a4f7c2e6b18
+Create Date: 2026-10-19 22:17:40.612983
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d7b1e9c3a52'
+down_revision = '9a4f7c2e6b18'
+branch_labels = None
+depends_on = None
+
+DETAIL_COLUMNS = ['description', 'product_type', 'price_excl_tax', 'price_incl_tax', 'tax', 'url']
+SQLITE_TRIGGERS = ['books_fts_ai', 'books_fts_ad', 'books_fts_au', 'books_fts_details_ai', 'books_fts_details_ad', 'books_fts_details_au']
+
+#o tsvector deixa de ser coluna gerada (que não pode ler outra tabela) e passa a ser mantido por triggers
+POSTGRES_UPGRADE = [
+    'ALTER TABLE books ADD COLUMN search_vector tsvector',
+    '''CREATE OR REPLACE FUNCTION books_search_vector() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.genre, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce((SELECT description FROM book_details WHERE upc = NEW.upc), '')), 'C');
+        RETURN NEW;
+    END $$''',
+    '''CREATE TRIGGER books_search_vector BEFORE INSERT OR UPDATE OF title, genre, search_vector ON books
+        FOR EACH ROW EXECUTE FUNCTION books_search_vector()''',
+    '''CREATE OR REPLACE FUNCTION book_details_search_vector() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            UPDATE books SET search_vector = NULL WHERE upc = OLD.upc;
+        ELSE
+            UPDATE books SET search_vector = NULL WHERE upc = NEW.upc;
+        END IF;
+        RETURN NULL;
+    END $$''',
+    '''CREATE TRIGGER book_details_search_vector AFTER INSERT OR UPDATE OF description OR DELETE ON book_details
+        FOR EACH ROW EXECUTE FUNCTION book_details_search_vector()''',
+    #o UPDATE dispara o trigger de books, que calcula o tsvector das linhas existentes
+    'UPDATE books SET search_vector = NULL',
+    'CREATE INDEX ix_books_search_vector ON books USING gin (search_vector)'
+]
+
+SQLITE_UPGRADE = [
+    '''CREATE VIRTUAL TABLE books_fts USING fts5(
+        title, genre, description, content='', tokenize='unicode61 remove_diacritics 2'
+    )''',
+    '''CREATE TRIGGER books_fts_ai AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, title, genre, description) VALUES (new.id, new.title, new.genre, coalesce((SELECT description FROM book_details WHERE upc = new.upc), ''));
+    END''',
+    '''CREATE TRIGGER books_fts_ad AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, genre, description) VALUES ('delete', old.id, old.title, old.genre, coalesce((SELECT description FROM book_details WHERE upc = old.upc), ''));
+    END''',
+    '''CREATE TRIGGER books_fts_au AFTER UPDATE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, genre, description) VALUES ('delete', old.id, old.title, old.genre, coalesce((SELECT description FROM book_details WHERE upc = old.upc), ''));
+        INSERT INTO books_fts(rowid, title, genre, description) VALUES (new.id, new.title, new.genre, coalesce((SELECT description FROM book_details WHERE upc = new.upc), ''));
+    END''',
+    '''CREATE TRIGGER books_fts_details_ai AFTER INSERT ON book_details BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, genre, description) SELECT 'delete', id, title, genre, '' FROM books WHERE upc = new.upc;
+        INSERT INTO books_fts(rowid, title, genre, description) SELECT id, title, genre, new.description FROM books WHERE upc = new.upc;
+    END''',
+    '''CREATE TRIGGER books_fts_details_ad AFTER DELETE ON book_details BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, genre, description) SELECT 'delete', id, title, genre, old.description FROM books WHERE upc = old.upc;
+        INSERT INTO books_fts(rowid, title, genre, description) SELECT id, title, genre, '' FROM books WHERE upc = old.upc;
+    END''',
+    '''CREATE TRIGGER books_fts_details_au AFTER UPDATE ON book_details BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, genre, description) SELECT 'delete', id, title, genre, old.description FROM books WHERE upc = old.upc;
+        INSERT INTO books_fts(rowid, title, genre, description) SELECT id, title, genre, new.description FROM books WHERE upc = new.upc;
+    END''',
+    #indexa os livros já existentes (tabela contentless não tem 'rebuild')
+    '''INSERT INTO books_fts(rowid, title, genre, description)
+        SELECT b.id, b.title, b.genre, coalesce(d.description, '') FROM books b LEFT JOIN book_details d ON d.upc = b.upc'''
+]
+
+#estruturas originais (0b6d4e8a7c21), sobre a descrição de volta em books
+POSTGRES_DOWNGRADE = [
+    '''ALTER TABLE books ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(genre, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED''',
+    'CREATE INDEX ix_books_search_vector ON books USING gin (search_vector)'
+]
+
+SQLITE_DOWNGRADE = [
+    '''CREATE VIRTUAL TABLE books_fts USING fts5(
+        title, genre, description, content='books', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )''',
+    '''CREATE TRIGGER books_fts_ai AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, title, genre, description) VALUES (new.id, new.title, new.genre, new.description);
+    END''',
+    '''CREATE TRIGGER books_fts_ad AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, genre, description) VALUES ('delete', old.id, old.title, old.genre, old.description);
+    END''',
+    '''CREATE TRIGGER books_fts_au AFTER UPDATE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, genre, description) VALUES ('delete', old.id, old.title, old.genre, old.description);
+        INSERT INTO books_fts(rowid, title, genre, description) VALUES (new.id, new.title, new.genre, new.description);
+    END''',
+    "INSERT INTO books_fts(books_fts) VALUES ('rebuild')"
+]
+
+
+def _drop_search(dialect):
+    '''Remove as estruturas de busca que dependem das colunas movidas (recriadas no fim da migração).'''
+    if dialect == 'postgresql':
+        op.execute(sa.text('DROP TRIGGER IF EXISTS book_details_search_vector ON book_details'))
+        op.execute(sa.text('DROP TRIGGER IF EXISTS books_search_vector ON books'))
+        op.execute(sa.text('DROP FUNCTION IF EXISTS book_details_search_vector()'))
+        op.execute(sa.text('DROP FUNCTION IF EXISTS books_search_vector()'))
+        op.execute(sa.text('DROP INDEX IF EXISTS ix_books_search_vector'))
+        op.execute(sa.text('ALTER TABLE books DROP COLUMN IF EXISTS search_vector'))
+    elif dialect == 'sqlite':
+        for trigger in SQLITE_TRIGGERS:
+            op.execute(sa.text(f'DROP TRIGGER IF EXISTS {trigger}'))
+        op.execute(sa.text('DROP TABLE IF EXISTS books_fts'))
+
+
+def _create_search(dialect, statements):
+    for statement in statements.get(dialect, []):
+        op.execute(sa.text(statement))
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    op.create_table('book_details',
+    sa.Column('upc', sa.String(length=50), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('product_type', sa.String(length=50), nullable=False),
+    sa.Column('price_excl_tax', sa.Float(), nullable=False),
+    sa.Column('price_incl_tax', sa.Float(), nullable=False),
+    sa.Column('tax', sa.Float(), nullable=False),
+    sa.Column('url', sa.String(length=1024), nullable=False),
+    sa.ForeignKeyConstraint(['upc'], ['books.upc'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('upc')
+    )
+    columns = ', '.join(DETAIL_COLUMNS)
+    op.execute(sa.text(f'INSERT INTO book_details (upc, {columns}) SELECT upc, {columns} FROM books'))
+
+    _drop_search(dialect)
+    #o SQLite (3.35+) remove colunas sem reescrever a tabela com o ALTER TABLE DROP COLUMN
+    for column in DETAIL_COLUMNS:
+        op.drop_column('books', column)
+    _create_search(dialect, {'postgresql': POSTGRES_UPGRADE, 'sqlite': SQLITE_UPGRADE})
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    _drop_search(dialect)
+    #as colunas voltam como anuláveis (preenchidas a partir de book_details); no Postgres, NOT NULL é restaurado
+    op.add_column('books', sa.Column('description', sa.Text(), nullable=True))
+    op.add_column('books', sa.Column('product_type', sa.String(length=50), nullable=True))
+    op.add_column('books', sa.Column('price_excl_tax', sa.Float(), nullable=True))
+    op.add_column('books', sa.Column('price_incl_tax', sa.Float(), nullable=True))
+    op.add_column('books', sa.Column('tax', sa.Float(), nullable=True))
+    op.add_column('books', sa.Column('url', sa.String(length=1024), nullable=True))
+    for column in DETAIL_COLUMNS:
+        op.execute(sa.text(f'UPDATE books SET {column} = (SELECT d.{column} FROM book_details d WHERE d.upc = books.upc)'))
+    if dialect == 'postgresql':
+        for column in DETAIL_COLUMNS:
+            op.alter_column('books', column, nullable=False)
+    op.drop_table('book_details')
+    _create_search(dialect, {'postgresql': POSTGRES_DOWNGRADE, 'sqlite': SQLITE_DOWNGRADE})
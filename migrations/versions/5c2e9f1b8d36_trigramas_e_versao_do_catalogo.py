@@ -0,0 +1,35 @@
+"""Trigramas e versão do catálogo
+
+Revision ID: 5c2e9f1b8d36
+Revises: 0b6d4e8a7c21
+Create Date: 2026-10-19 17:10:44.205617
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2e9f1b8d36'
+down_revision = '0b6d4e8a7c21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('catalog_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    #busca aproximada de títulos: operador % do pg_trgm servido por índice GIN (nos demais bancos o índice fica em memória)
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(sa.text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+        op.execute(sa.text('CREATE INDEX ix_books_title_trgm ON books USING gin (title gin_trgm_ops)'))
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(sa.text('DROP INDEX IF EXISTS ix_books_title_trgm'))
+    op.drop_table('catalog_version')
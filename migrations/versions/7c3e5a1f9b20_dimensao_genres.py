@@ -0,0 +1,143 @@
+"""Dimensão genres
+
+Revision ID: 7c3e5a1f9b20
+Revises: 4d7b1e9c3a52
+Create Date: 2026-10-19 23:41:08.270316
+
+"""
+from contextlib import contextmanager
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3e5a1f9b20'
+down_revision = '4d7b1e9c3a52'
+branch_labels = None
+depends_on = None
+
+#triggers da busca que leem o gênero (a tabela books_fts e a coluna search_vector são mantidas: os nomes não mudam)
+RATING_VALUE_EXPRESSION = "CASE rating WHEN 'One' THEN 1 WHEN 'Two' THEN 2 WHEN 'Three' THEN 3 WHEN 'Four' THEN 4 WHEN 'Five' THEN 5 END"
+
+SQLITE_TRIGGERS = ['books_fts_ai', 'books_fts_ad', 'books_fts_au', 'books_fts_details_ai', 'books_fts_details_ad', 'books_fts_details_au']
+
+
+def _sqlite_triggers(genre):
+    '''Triggers do FTS5 contentless, com a expressão do nome do gênero de cada linha (genre.format(row=...)).'''
+    description = "coalesce((SELECT description FROM book_details WHERE upc = {row}.upc), '')"
+    return [
+        f'''CREATE TRIGGER books_fts_ai AFTER INSERT ON books BEGIN
+            INSERT INTO books_fts(rowid, title, genre, description) VALUES (new.id, new.title, {genre.format(row='new')}, {description.format(row='new')});
+        END''',
+        f'''CREATE TRIGGER books_fts_ad AFTER DELETE ON books BEGIN
+            INSERT INTO books_fts(books_fts, rowid, title, genre, description) VALUES ('delete', old.id, old.title, {genre.format(row='old')}, {description.format(row='old')});
+        END''',
+        f'''CREATE TRIGGER books_fts_au AFTER UPDATE ON books BEGIN
+            INSERT INTO books_fts(books_fts, rowid, title, genre, description) VALUES ('delete', old.id, old.title, {genre.format(row='old')}, {description.format(row='old')});
+            INSERT INTO books_fts(rowid, title, genre, description) VALUES (new.id, new.title, {genre.format(row='new')}, {description.format(row='new')});
+        END''',
+        f'''CREATE TRIGGER books_fts_details_ai AFTER INSERT ON book_details BEGIN
+            INSERT INTO books_fts(books_fts, rowid, title, genre, description) SELECT 'delete', id, title, {genre.format(row='books')}, '' FROM books WHERE upc = new.upc;
+            INSERT INTO books_fts(rowid, title, genre, description) SELECT id, title, {genre.format(row='books')}, new.description FROM books WHERE upc = new.upc;
+        END''',
+        f'''CREATE TRIGGER books_fts_details_ad AFTER DELETE ON book_details BEGIN
+            INSERT INTO books_fts(books_fts, rowid, title, genre, description) SELECT 'delete', id, title, {genre.format(row='books')}, old.description FROM books WHERE upc = old.upc;
+            INSERT INTO books_fts(rowid, title, genre, description) SELECT id, title, {genre.format(row='books')}, '' FROM books WHERE upc = old.upc;
+        END''',
+        f'''CREATE TRIGGER books_fts_details_au AFTER UPDATE ON book_details BEGIN
+            INSERT INTO books_fts(books_fts, rowid, title, genre, description) SELECT 'delete', id, title, {genre.format(row='books')}, old.description FROM books WHERE upc = old.upc;
+            INSERT INTO books_fts(rowid, title, genre, description) SELECT id, title, {genre.format(row='books')}, new.description FROM books WHERE upc = new.upc;
+        END'''
+    ]
+
+
+def _postgres_trigger(genre, genre_column):
+    '''Função e trigger do tsvector de books, com a expressão do nome do gênero e a coluna que o dispara.'''
+    return [
+        f'''CREATE OR REPLACE FUNCTION books_search_vector() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce({genre}, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce((SELECT description FROM book_details WHERE upc = NEW.upc), '')), 'C');
+            RETURN NEW;
+        END $$''',
+        f'''CREATE TRIGGER books_search_vector BEFORE INSERT OR UPDATE OF title, {genre_column}, search_vector ON books
+            FOR EACH ROW EXECUTE FUNCTION books_search_vector()'''
+    ]
+
+
+def _drop_triggers(dialect):
+    '''Remove os triggers que leem a coluna de gênero (o DROP COLUMN falha enquanto eles existirem).'''
+    if dialect == 'postgresql':
+        op.execute(sa.text('DROP TRIGGER IF EXISTS books_search_vector ON books'))
+    elif dialect == 'sqlite':
+        for trigger in SQLITE_TRIGGERS:
+            op.execute(sa.text(f'DROP TRIGGER IF EXISTS {trigger}'))
+
+
+@contextmanager
+def _batch_books(dialect):
+    '''
+    Altera books em modo batch: no SQLite, que não adiciona restrições via ALTER TABLE, a tabela é recriada.
+    A cópia das linhas não pode inserir na coluna gerada rating_value, então ela (e seu índice) é recriada junto.
+    '''
+    if dialect == 'sqlite':
+        op.drop_index('ix_books_rating_value_title', table_name='books')
+    with op.batch_alter_table('books') as batch_op:
+        if dialect == 'sqlite':
+            batch_op.drop_column('rating_value')
+            batch_op.add_column(sa.Column('rating_value', sa.Integer(), sa.Computed(RATING_VALUE_EXPRESSION, persisted=True), nullable=True))
+        yield batch_op
+    if dialect == 'sqlite':
+        op.create_index('ix_books_rating_value_title', 'books', [sa.text('rating_value DESC'), 'title'], unique=False)
+
+
+def _create_triggers(dialect, statements):
+    for statement in statements.get(dialect, []):
+        op.execute(sa.text(statement))
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    op.create_table('genres',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_genres_name'), 'genres', ['name'], unique=True)
+    op.execute(sa.text('INSERT INTO genres (name) SELECT DISTINCT genre FROM books ORDER BY genre'))
+
+    _drop_triggers(dialect)
+    op.add_column('books', sa.Column('genre_id', sa.Integer(), nullable=True))
+    op.execute(sa.text('UPDATE books SET genre_id = (SELECT g.id FROM genres g WHERE g.name = books.genre)'))
+    with _batch_books(dialect) as batch_op:
+        batch_op.alter_column('genre_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('books_genre_id_fkey', 'genres', ['genre_id'], ['id'])
+    op.create_index('ix_books_genre_id_price', 'books', ['genre_id', 'price'], unique=False)
+    op.drop_index('ix_books_genre_price', table_name='books')
+    op.drop_column('books', 'genre')
+    _create_triggers(dialect, {
+        'postgresql': _postgres_trigger('(SELECT name FROM genres WHERE id = NEW.genre_id)', 'genre_id'),
+        'sqlite': _sqlite_triggers('(SELECT name FROM genres WHERE id = {row}.genre_id)')
+    })
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    _drop_triggers(dialect)
+    op.add_column('books', sa.Column('genre', sa.String(length=100), nullable=True))
+    op.execute(sa.text('UPDATE books SET genre = (SELECT g.name FROM genres g WHERE g.id = books.genre_id)'))
+    with _batch_books(dialect) as batch_op:
+        batch_op.alter_column('genre', existing_type=sa.String(length=100), nullable=False)
+        batch_op.drop_constraint('books_genre_id_fkey', type_='foreignkey')
+    op.create_index('ix_books_genre_price', 'books', ['genre', 'price'], unique=False)
+    op.drop_index('ix_books_genre_id_price', table_name='books')
+    op.drop_column('books', 'genre_id')
+    op.drop_index(op.f('ix_genres_name'), table_name='genres')
+    op.drop_table('genres')
+    _create_triggers(dialect, {
+        'postgresql': _postgres_trigger('NEW.genre', 'genre'),
+        'sqlite': _sqlite_triggers('{row}.genre')
+    })
@@ -0,0 +1,49 @@
+"""Fila de scraping distribuído
+
+Revision ID: 8e4a1c7d2b90
+Revises: 3b9d2f6c1a47
+Create Date: 2026-10-19 11:02:17.540931
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4a1c7d2b90'
+down_revision = '3b9d2f6c1a47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('scrape_job', sa.Column('mode', sa.String(length=20), server_default='single', nullable=False))
+    op.create_table('scrape_task',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('genre', sa.String(length=100), nullable=False),
+    sa.Column('url', sa.String(length=1024), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('worker', sa.String(length=200), nullable=True),
+    sa.Column('books_found', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('claimed_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['job_id'], ['scrape_job.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('job_id', 'url', name='uq_scrape_task_job_url')
+    )
+    op.create_index('ix_scrape_task_claim', 'scrape_task', ['job_id', 'status', 'id'], unique=False)
+    #o upsert dos livros usa o upc como chave de conflito
+    op.create_index(op.f('ix_books_upc'), 'books', ['upc'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_books_upc'), table_name='books')
+    op.drop_index('ix_scrape_task_claim', table_name='scrape_task')
+    op.drop_table('scrape_task')
+    with op.batch_alter_table('scrape_job') as batch_op:
+        batch_op.drop_column('mode')
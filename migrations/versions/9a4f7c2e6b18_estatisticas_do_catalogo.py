@@ -0,0 +1,30 @@
+"""Estatísticas do catálogo
+
+Revision ID: 9a4f7c2e6b18
+Revises: 5c2e9f1b8d36
+Create Date: 2026-10-19 21:04:12.518304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4f7c2e6b18'
+down_revision = '5c2e9f1b8d36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    #preenchida na próxima gravação em books; até lá os endpoints de estatísticas agregam a tabela books
+    op.create_table('catalog_stats',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('catalog_stats')
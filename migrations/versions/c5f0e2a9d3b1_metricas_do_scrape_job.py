@@ -0,0 +1,25 @@
+"""Métricas do scrape_job
+
+Revision ID: c5f0e2a9d3b1
+Revises: 8e4a1c7d2b90
+Create Date: 2026-10-19 11:48:05.271604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5f0e2a9d3b1'
+down_revision = '8e4a1c7d2b90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('scrape_job', sa.Column('metrics', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('scrape_job') as batch_op:
+        batch_op.drop_column('metrics')
@@ -0,0 +1,46 @@
+"""Índices das consultas
+
+Revision ID: d81b6e3f4a25
+Revises: c5f0e2a9d3b1
+Create Date: 2026-10-19 12:20:33.904417
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd81b6e3f4a25'
+down_revision = 'c5f0e2a9d3b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    #ix_books_upc (único) já foi criado na migração 8e4a1c7d2b90, usado pelo upsert do scraping
+    #get_books_by_price_range: filtro e ordenação por preço
+    op.create_index(op.f('ix_books_price'), 'books', ['price'], unique=False)
+    #get_all_book_titles e ordenação por título das buscas
+    op.create_index(op.f('ix_books_title'), 'books', ['title'], unique=False)
+    #get_stats_overview: distribuição por avaliação
+    op.create_index(op.f('ix_books_rating'), 'books', ['rating'], unique=False)
+    #get_stats_by_genre, get_all_genres e get_all_categories (índice de cobertura)
+    op.create_index('ix_books_genre_price', 'books', ['genre', 'price'], unique=False)
+    #/ml/user-preferences: filtro por usuário ordenado por similaridade
+    op.create_index('ix_user_preferences_user_id_similarity_score', 'user_preferences', ['user_id', 'similarity_score'], unique=False)
+    #/auth/refresh: busca pelo texto do token
+    op.create_index('ix_refresh_token_manager_refresh_token', 'refresh_token_manager', ['refresh_token'], unique=False, postgresql_using='hash')
+    #/auth/login: último refresh token válido do usuário
+    op.create_index('ix_refresh_token_manager_username_created_at', 'refresh_token_manager', ['username', 'created_at'], unique=False)
+    #consultas do access_log por período
+    op.create_index(op.f('ix_access_log_created_at'), 'access_log', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_access_log_created_at'), table_name='access_log')
+    op.drop_index('ix_refresh_token_manager_username_created_at', table_name='refresh_token_manager')
+    op.drop_index('ix_refresh_token_manager_refresh_token', table_name='refresh_token_manager')
+    op.drop_index('ix_user_preferences_user_id_similarity_score', table_name='user_preferences')
+    op.drop_index('ix_books_genre_price', table_name='books')
+    op.drop_index(op.f('ix_books_rating'), table_name='books')
+    op.drop_index(op.f('ix_books_title'), table_name='books')
+    op.drop_index(op.f('ix_books_price'), table_name='books')
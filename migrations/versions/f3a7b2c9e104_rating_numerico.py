@@ -0,0 +1,40 @@
+"""Rating numérico
+
+Revision ID: f3a7b2c9e104
+Revises: d81b6e3f4a25
+Create Date: 2026-10-19 14:05:12.318044
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a7b2c9e104'
+down_revision = 'd81b6e3f4a25'
+branch_labels = None
+depends_on = None
+
+RATING_VALUE_EXPRESSION = "CASE rating WHEN 'One' THEN 1 WHEN 'Two' THEN 2 WHEN 'Three' THEN 3 WHEN 'Four' THEN 4 WHEN 'Five' THEN 5 END"
+
+
+def upgrade():
+    #a coluna é gerada pelo banco, o que já preenche as linhas existentes (no Postgres o ADD COLUMN reescreve a tabela);
+    #STORED nos dois bancos, como no modelo: o SQLite só adiciona colunas geradas VIRTUAL via ALTER TABLE, então a tabela é recriada
+    column = sa.Column('rating_value', sa.Integer(), sa.Computed(RATING_VALUE_EXPRESSION, persisted=True), nullable=True)
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('books', schema=None, recreate='always') as batch_op:
+            batch_op.add_column(column)
+    else:
+        op.add_column('books', column)
+    #get_top_rated_books e o agrupamento por avaliação de get_stats_overview
+    op.create_index('ix_books_rating_value_title', 'books', [sa.text('rating_value DESC'), 'title'], unique=False)
+    #substituído pelo índice acima
+    op.drop_index('ix_books_rating', table_name='books')
+
+
+def downgrade():
+    op.create_index('ix_books_rating', 'books', ['rating'], unique=False)
+    op.drop_index('ix_books_rating_value_title', table_name='books')
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.drop_column('rating_value')
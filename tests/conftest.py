@@ -1,6 +1,16 @@
+import os
 import pytest
+from contextlib import contextmanager
+from unittest.mock import patch, MagicMock
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
 from api.__init__ import create_app
 from api.models.user import db
+from api.scripts import scrape_utils
+from api.scripts.load_utils import bulk_load_books
+
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'books_toscrape')
 
 
 @pytest.fixture
@@ -14,4 +24,84 @@ def app():
 
 @pytest.fixture
 def client(app):
-    return app.test_client()
\ No newline at end of file
+    return app.test_client()
+
+@pytest.fixture
+def books_toscrape_corpus():
+    '''Responde as requisições do scraper com as páginas salvas em tests/fixtures/books_toscrape'''
+    def fake_get(url, timeout=None):
+        path = os.path.join(CORPUS_DIR, url.replace(scrape_utils.BASE_URL, ''))
+        with open(path, encoding='utf-8') as file:
+            return MagicMock(status_code=200, text=file.read())
+    with patch('api.scripts.scrape_utils.requests.get', side_effect=fake_get) as mock_get:
+        yield mock_get
+
+@pytest.fixture
+def catalog(app):
+    '''Carrega o catálogo de data/books.csv'''
+    bulk_load_books('data/books.csv')
+    db.session.commit()
+
+@pytest.fixture
+def headers(app):
+    '''Cabeçalho de autorização com um token de acesso válido'''
+    return {'Authorization': f'Bearer {create_access_token(identity="test_user")}'}
+
+
+def make_book(upc, title, genre='Mystery', description='Sem descrição.'):
+    '''Registro de livro no formato aceito por upsert_books.'''
+    return {
+        'upc': upc, 'title': title, 'genre': genre, 'price': 10.0, 'availability': 1, 'rating': 'Three',
+        'description': description, 'product_type': 'Books', 'price_excl_tax': 10.0, 'price_incl_tax': 10.0,
+        'tax': 0.0, 'number_of_reviews': 0, 'url': f'http://books.toscrape.com/{upc}', 'image_url': f'http://books.toscrape.com/{upc}.jpg'
+    }
+
+
+def walk(client, url, headers):
+    '''Percorre todas as páginas do endpoint seguindo o cabeçalho X-Next-Cursor.'''
+    pages, cursor = [], None
+    while True:
+        separator = '&' if '?' in url else '?'
+        response = client.get(url + (f'{separator}cursor={cursor}' if cursor else ''), headers=headers)
+        assert response.status_code == 200
+        pages.append(response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return pages
+
+
+@contextmanager
+def capture_statements():
+    '''Captura os comandos SQL (com parâmetros) executados no bloco.'''
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def explain(statement, parameters):
+    '''Retorna o plano de execução da consulta como texto (EXPLAIN QUERY PLAN no SQLite, EXPLAIN no Postgres).'''
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        #com tabelas pequenas o planejador prefere a varredura sequencial; desativá-la revela se o índice é utilizável
+        connection.exec_driver_sql('SET enable_seqscan = off')
+        rows = connection.exec_driver_sql('EXPLAIN ' + statement, parameters).all()
+        connection.exec_driver_sql('RESET enable_seqscan')
+        return '\n'.join(row[0] for row in rows)
+    rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    return '\n'.join(row[-1] for row in rows)
+
+
+def plan_of(statements, fragment):
+    '''Plano da única consulta capturada que contém o trecho informado.'''
+    matches = [(statement, parameters) for statement, parameters in statements if fragment in statement]
+    assert len(matches) == 1, f'{len(matches)} consultas com "{fragment}" em {statements}'
+    return explain(*matches[0])
@@ -0,0 +1,73 @@
+import time
+import pytest
+from api.extensions import db
+from api.scripts.load_utils import upsert_books
+from api.scripts.autocomplete_utils import PrefixIndex, autocomplete_titles, get_prefix_index, normalize_title
+from tests.conftest import make_book
+
+
+@pytest.mark.books
+@pytest.mark.autocomplete
+class TestAutocomplete:
+    def test_quando_normalizar_titulo_deve_remover_acentos_e_pontuacao(self):
+        #when
+        resultado = normalize_title("  Él Niño's — Diário!  ")
+        #then
+        assert resultado == 'el nino s diario'
+
+    def test_quando_completar_deve_priorizar_titulos_que_comecam_pelo_prefixo(self):
+        #given
+        index = PrefixIndex(['The Secret Garden', 'Secrets of the Sea', 'A Secret Life', 'The Secret Garden', 'Sapiens'])
+        #when
+        resultado = index.complete('secr', limit=10)
+        #then
+        assert resultado == ['Secrets of the Sea', 'The Secret Garden', 'A Secret Life']
+
+    def test_quando_completar_deve_respeitar_o_limite(self):
+        #given
+        index = PrefixIndex([f'Title {number:03d}' for number in range(100)])
+        #when
+        resultado = index.complete('title', limit=3)
+        #then
+        assert resultado == ['Title 000', 'Title 001', 'Title 002']
+
+    def test_quando_catalogo_mudar_deve_reconstruir_o_indice(self, app):
+        #given
+        upsert_books([make_book('p1', 'Poems of the Night', genre='Poetry')])
+        db.session.commit()
+        antes = autocomplete_titles('poem')
+        #when
+        upsert_books([make_book('p2', 'Poems of the Day', genre='Poetry')])
+        db.session.commit()
+        depois = autocomplete_titles('poem')
+        #then
+        assert antes == ['Poems of the Night']
+        assert depois == ['Poems of the Day', 'Poems of the Night']
+
+    def test_quando_completar_no_catalogo_deve_responder_em_menos_de_um_milissegundo(self, catalog):
+        #given
+        index = get_prefix_index()
+        #when
+        start = time.perf_counter()
+        for _ in range(100):
+            resultado = index.complete('the sec', limit=10)
+        elapsed = (time.perf_counter() - start) / 100
+        #then
+        assert 'The Secret Garden' in resultado
+        assert elapsed < 0.001
+
+    @pytest.mark.integration
+    def test_quando_buscar_sugestoes_deve_retornar_200_com_titulos(self, client, headers, catalog):
+        #when
+        response = client.get('/api/v1/books/autocomplete?q=Sapi&limit=2', headers=headers)
+        #then
+        assert response.status_code == 200
+        assert response.get_json() == ['Sapiens: A Brief History of Humankind']
+
+    @pytest.mark.integration
+    @pytest.mark.parametrize('query', ['', '?q=', '?q=abc&limit=0', '?q=abc&limit=51'])
+    def test_quando_parametros_invalidos_deve_retornar_400(self, client, headers, query):
+        #when
+        response = client.get(f'/api/v1/books/autocomplete{query}', headers=headers)
+        #then
+        assert response.status_code == 400
@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+from api.extensions import db
+from api.models.book_details import BookDetails
+from api.models.books import Books
+from api.models.genres import Genre
+from api.scripts.books_utils import get_all_book_titles, get_book_by_id, get_books_by_price_range, get_top_rated_books
+from api.scripts.catalog_stats_utils import compute_stats_by_genre, compute_stats_overview
+from api.scripts.genres_utils import get_all_genres
+from api.scripts.load_utils import truncate_books, upsert_books
+from api.scripts.search_utils import search_books
+from tests.conftest import capture_statements
+
+
+@pytest.mark.book_details
+class TestBookDetails:
+    def test_quando_carregar_catalogo_deve_gravar_os_detalhes_em_book_details(self, catalog):
+        #given
+        esperado = pd.read_csv('data/books.csv', keep_default_na=False).iloc[0].to_dict()
+        #when
+        livro = get_book_by_id('1')
+        #then
+        assert BookDetails.query.count() == Books.query.count() == 1000
+        assert {column: livro[column] for column in esperado} == esperado
+
+    def test_quando_listar_ou_agregar_livros_nao_deve_ler_book_details(self, catalog):
+        #given
+        with capture_statements() as statements:
+            #when
+            get_books_by_price_range(10, 20)
+            get_top_rated_books(limit=10)
+            get_all_book_titles()
+            get_all_genres()
+            compute_stats_overview()
+            compute_stats_by_genre()
+            search_books(title='murder')
+        #then
+        assert statements
+        assert all('book_details' not in statement for statement, _ in statements)
+
+    def test_quando_atualizar_descricao_deve_reindexar_a_busca(self, catalog):
+        #given
+        livro = pd.read_csv('data/books.csv', keep_default_na=False).iloc[[0]].assign(description='Um zepelim sobre o mar.')
+        #when
+        upsert_books(livro)
+        db.session.commit()
+        #then
+        encontrados = search_books(title='zepelim', include_description=True)
+        assert [book.upc for book, _ in encontrados] == [livro['upc'].iloc[0]]
+        assert search_books(title='himalayas', include_description=True)
+        assert get_book_by_id('1')['description'] == 'Um zepelim sobre o mar.'
+
+    def test_quando_limpar_catalogo_deve_remover_os_detalhes_e_o_indice(self, catalog):
+        #when
+        truncate_books()
+        db.session.commit()
+        #then
+        assert BookDetails.query.count() == 0
+        assert search_books(title='wherever', include_description=True) == []
+
+    def test_quando_criar_livro_pelo_orm_deve_gravar_os_detalhes_pelos_atributos(self, app):
+        #given
+        genero = Genre(name='Poetry')
+        db.session.add(genero)
+        db.session.flush()
+        livro = Books(
+            upc='orm-1', title='Livro do ORM', genre_id=genero.id, price=10.0, availability=1, rating='Two',
+            number_of_reviews=0, image_url='', description='Versos de teste.', product_type='Books',
+            price_excl_tax=10.0, price_incl_tax=10.0, tax=0.0, url='http://books.toscrape.com/orm-1'
+        )
+        #when
+        db.session.add(livro)
+        db.session.commit()
+        db.session.expunge_all()
+        #then
+        detalhes = db.session.get(BookDetails, 'orm-1')
+        assert detalhes.description == 'Versos de teste.' and detalhes.url == 'http://books.toscrape.com/orm-1'
+        assert Books.query.filter_by(upc='orm-1').one().description == 'Versos de teste.'
+        assert [book.upc for book, _ in search_books(title='versos', include_description=True)] == ['orm-1']
@@ -79,7 +79,7 @@ class TestBooks:
         assert response.status_code == 200
         assert isinstance(resultado, dict)
         assert resultado == livro_esperado
-        mock_get_book_by_id.assert_called_once_with('1')
+        mock_get_book_by_id.assert_called_once_with('1', fields=None)
 
     @pytest.mark.integration
     @pytest.mark.book_id
@@ -95,7 +95,7 @@ class TestBooks:
         #then
         assert response.status_code == 404
         assert resultado['msg'] == 'Livro com id 999 não encontrado'
-        mock_get_book_by_id.assert_called_once_with('999')
+        mock_get_book_by_id.assert_called_once_with('999', fields=None)
 
     @pytest.mark.integration
     @pytest.mark.search
@@ -130,7 +130,7 @@ class TestBooks:
         assert response.status_code == 200
         assert isinstance(resultado, list)
         assert resultado == livros_esperados
-        mock_get_books.assert_called_once_with(title='Murder', genre=None)
+        mock_get_books.assert_called_once_with(title='Murder', genre=None, limit=None, cursor=None, fields=None)
 
     @pytest.mark.integration
     @pytest.mark.search
@@ -157,7 +157,7 @@ class TestBooks:
         assert response.status_code == 200
         assert isinstance(resultado, list)
         assert resultado == livros_esperados
-        mock_get_books.assert_called_once_with(title=None, genre='Mystery')
+        mock_get_books.assert_called_once_with(title=None, genre='Mystery', limit=None, cursor=None, fields=None)
 
     @pytest.mark.integration
     @pytest.mark.search
@@ -184,7 +184,7 @@ class TestBooks:
         #then
         assert response.status_code == 200
         assert resultado == livros_esperados
-        mock_get_books.assert_called_once_with(title='Test', genre='Fiction')
+        mock_get_books.assert_called_once_with(title='Test', genre='Fiction', limit=None, cursor=None, fields=None)
 
     @pytest.mark.integration
     @pytest.mark.search
@@ -213,7 +213,7 @@ class TestBooks:
         #then
         assert response.status_code == 404
         assert resultado['msg'] == 'Nenhum livro encontrado com os parâmetros fornecidos'
-        mock_get_books.assert_called_once_with(title='Inexistente', genre=None)
+        mock_get_books.assert_called_once_with(title='Inexistente', genre=None, limit=None, cursor=None, fields=None)
 
     @pytest.mark.integration
     @pytest.mark.price_range
@@ -248,7 +248,7 @@ class TestBooks:
         assert response.status_code == 200
         assert isinstance(resultado, list)
         assert resultado == livros_esperados
-        mock_get_books.assert_called_once_with(min_price=10.0, max_price=15.0)
+        mock_get_books.assert_called_once_with(min_price=10.0, max_price=15.0, limit=None, cursor=None, fields=None)
     
     @pytest.mark.integration
     @pytest.mark.price_range
@@ -303,7 +303,7 @@ class TestBooks:
         #then
         assert response.status_code == 404
         assert resultado['msg'] == 'Nenhum livro encontrado na faixa de preço informada.'
-        mock_get_books.assert_called_once_with(min_price=1000.0, max_price=2000.0)
+        mock_get_books.assert_called_once_with(min_price=1000.0, max_price=2000.0, limit=None, cursor=None, fields=None)
 
     @pytest.mark.integration
     @pytest.mark.top_rated
@@ -340,7 +340,7 @@ class TestBooks:
         assert response.status_code == 200
         assert isinstance(resultado, list)
         assert resultado == livros_esperados
-        mock_get_top_rated.assert_called_once_with(limit=10)
+        mock_get_top_rated.assert_called_once_with(limit=10, fields=None)
 
     @pytest.mark.integration
     @pytest.mark.top_rated
@@ -356,4 +356,4 @@ class TestBooks:
         #then
         assert response.status_code == 404
         assert resultado['msg'] == 'Nenhum livro encontrado'
-        mock_get_top_rated.assert_called_once_with(limit=10)
\ No newline at end of file
+        mock_get_top_rated.assert_called_once_with(limit=10, fields=None)
\ No newline at end of file
@@ -0,0 +1,39 @@
+import pytest
+from api.scripts.books_utils import get_book_by_id, get_books_by_ids
+from tests.conftest import capture_statements
+
+
+@pytest.mark.details_batch
+class TestBooksBatch:
+    def test_quando_buscar_varios_ids_deve_retornar_na_ordem_com_uma_consulta(self, catalog):
+        #given
+        ids = [500, 3, 9999, 42, 3]
+        esperados = [get_book_by_id(str(id)) for id in (500, 3, 42)]
+        with capture_statements() as statements:
+            #when
+            resultado = get_books_by_ids(ids)
+        #then
+        assert resultado == {'books': esperados, 'missing': [9999]}
+        assert len(statements) == 1
+
+    def test_quando_buscar_varios_ids_pelo_endpoint_deve_retornar_200(self, client, catalog, headers):
+        #when
+        response = client.get('/api/v1/books/details?ids=10,2&ids=77777', headers=headers)
+        resultado = response.get_json()
+        #then
+        assert response.status_code == 200
+        assert [book['id'] for book in resultado['books']] == [10, 2]
+        assert resultado['books'][0] == get_book_by_id('10')
+        assert resultado['missing'] == [77777]
+
+    @pytest.mark.parametrize('query, mensagem', [
+        ('', 'Forneça o parâmetro ids para a consulta.'),
+        ('?ids=1,abc', 'Os ids devem ser números inteiros.'),
+        ('?ids=' + ','.join(str(id) for id in range(1, 102)), 'Informe no máximo 100 ids por consulta.'),
+    ])
+    def test_quando_buscar_ids_invalidos_deve_retornar_400(self, client, headers, query, mensagem):
+        #when
+        response = client.get(f'/api/v1/books/details{query}', headers=headers)
+        #then
+        assert response.status_code == 400
+        assert response.get_json()['msg'] == mensagem
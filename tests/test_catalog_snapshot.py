@@ -0,0 +1,108 @@
+import pandas as pd
+import pytest
+from flask_jwt_extended import create_access_token
+from api.extensions import db
+from api.scripts.books_utils import get_all_book_titles, get_book_by_id, get_books_by_ids, get_books_by_price_range, get_top_rated_books
+from api.scripts.catalog_snapshot_utils import CatalogSnapshot, get_catalog_snapshot
+from api.scripts.genres_utils import get_all_genres
+from api.scripts.load_utils import upsert_books
+from api.scripts.stats_utils import get_stats_by_genre, get_stats_overview
+from tests.conftest import capture_statements
+
+
+@pytest.fixture
+def snapshot_enabled(app):
+    app.config['CATALOG_SNAPSHOT_ENABLED'] = True
+    yield
+    app.config['CATALOG_SNAPSHOT_ENABLED'] = False
+
+
+def read_all():
+    '''Resultados das consultas de leitura atendidas pelo snapshot.'''
+    prices = get_books_by_price_range(10, 20, limit=7)
+    return {
+        'titles': get_all_book_titles(),
+        'titles_page': get_all_book_titles(limit=50, cursor=get_all_book_titles(limit=50).next_cursor),
+        'price_range': get_books_by_price_range(10, 20),
+        'price_range_page': (prices, get_books_by_price_range(10, 20, limit=7, cursor=prices.next_cursor)),
+        'top_rated': get_top_rated_books(limit=25),
+        'details': [get_book_by_id(id) for id in ('1', '500', '1000', '1001', 'abc')],
+        'details_batch': get_books_by_ids([1000, 7, 1001, 7, 1]),
+        'genres': get_all_genres(),
+        'overview': get_stats_overview(),
+    }
+
+
+@pytest.mark.catalog_snapshot
+class TestCatalogSnapshot:
+    def test_quando_ativar_snapshot_deve_retornar_o_mesmo_que_o_banco(self, catalog, snapshot_enabled, app):
+        #given
+        app.config['CATALOG_SNAPSHOT_ENABLED'] = False
+        esperado = read_all()
+        estatisticas_esperadas = get_stats_by_genre()
+        app.config['CATALOG_SNAPSHOT_ENABLED'] = True
+        #when
+        resultado = read_all()
+        estatisticas = get_stats_by_genre()
+        #then
+        assert resultado == esperado
+        assert resultado['price_range_page'][1].next_cursor == esperado['price_range_page'][1].next_cursor
+        #o banco não define a ordem entre gêneros com a mesma quantidade de livros
+        assert sorted(estatisticas, key=lambda stat: stat['genre']) == sorted(estatisticas_esperadas, key=lambda stat: stat['genre'])
+        assert [stat['total'] for stat in estatisticas] == [stat['total'] for stat in estatisticas_esperadas]
+
+    def test_quando_snapshot_estiver_montado_nao_deve_consultar_books(self, catalog, snapshot_enabled):
+        #given
+        get_catalog_snapshot()
+        with capture_statements() as statements:
+            #when
+            read_all()
+            get_stats_by_genre()
+        #then
+        assert statements
+        assert all('books' not in statement for statement, _ in statements)
+
+    def test_quando_catalogo_mudar_deve_remontar_snapshot(self, catalog, snapshot_enabled):
+        #given
+        antes = get_catalog_snapshot()
+        livro = pd.read_csv('data/books.csv', keep_default_na=False).iloc[[0]].assign(price=999.0, rating='One')
+        #when
+        upsert_books(livro)
+        db.session.commit()
+        depois = get_catalog_snapshot()
+        #then
+        assert depois is not antes
+        assert get_books_by_price_range(999, 999)[0]['upc'] == livro['upc'].iloc[0]
+        assert get_book_by_id('1')['price'] == 999.0
+
+    def test_quando_desativado_deve_retornar_none(self, catalog):
+        #then
+        assert get_catalog_snapshot() is None
+
+    def test_quando_avaliacao_for_desconhecida_deve_contar_como_no_rating_e_ficar_fora_do_top(self):
+        #given
+        rows = [
+            (1, 'a', 'Beta', 'Poetry', 10.0, 1, 'Five', 5, 0, ''),
+            (2, 'b', 'Alfa', 'Poetry', 20.0, 1, 'Five', 5, 0, ''),
+            (3, 'c', 'Gama', 'Travel', 20.0, 1, 'Zero', None, 0, ''),
+        ]
+        #when
+        snapshot = CatalogSnapshot(rows)
+        #then
+        assert [book.title for book in snapshot.top_rated(10)] == ['Alfa', 'Beta']
+        assert snapshot.overview['rating_distribution'] == [{'rating': 'Five', 'total': 2}, {'rating': 'No Rating', 'total': 1}]
+        assert snapshot.get(3).rating_value is None and snapshot.get(4) is None
+        assert [book.id for book in snapshot.price_range(10, 20, after=(20.0, 2))] == [3]
+        assert snapshot.genre_stats == [{'genre': 'Poetry', 'total': 2, 'avg_price': 15.0}, {'genre': 'Travel', 'total': 1, 'avg_price': 20.0}]
+
+    def test_quando_ativar_snapshot_os_endpoints_devem_responder_sem_mudancas(self, client, catalog, snapshot_enabled, app):
+        #given
+        headers = {'Authorization': f'Bearer {create_access_token(identity="test_user")}'}
+        urls = ['/api/v1/books/top-rated?limit=5', '/api/v1/books/price-range?min=50&max=51', '/api/v1/books/details/7', '/api/v1/genres', '/api/v1/stats/overview']
+        app.config['CATALOG_SNAPSHOT_ENABLED'] = False
+        esperado = [client.get(url, headers=headers).get_json() for url in urls]
+        app.config['CATALOG_SNAPSHOT_ENABLED'] = True
+        #when
+        resultado = [client.get(url, headers=headers).get_json() for url in urls]
+        #then
+        assert resultado == esperado
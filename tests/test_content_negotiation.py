@@ -0,0 +1,116 @@
+import pytest
+from unittest.mock import patch
+from api.scripts.negotiation_utils import COLUMNAR_MIMETYPE, format_cache_key, msgpack, to_columns
+
+
+URLS = [
+    '/api/v1/books/titles?limit=50',
+    '/api/v1/books/search?title=the&fields=id,title,price',
+    '/api/v1/books/facets?title=the',
+    '/api/v1/books/price-range?min=10&max=20',
+    '/api/v1/books/top-rated?limit=5',
+    '/api/v1/books/details?ids=3,1,9999',
+    '/api/v1/stats/overview',
+    '/api/v1/stats/genres',
+]
+
+
+@pytest.mark.negotiation
+class TestContentNegotiation:
+    @pytest.mark.parametrize('url', URLS)
+    def test_quando_nao_pedir_formato_deve_manter_o_json(self, client, catalog, headers, url):
+        #when
+        sem_accept = client.get(url, headers=headers)
+        qualquer = client.get(url, headers=dict(headers, Accept='*/*'))
+        html = client.get(url, headers=dict(headers, Accept='text/html'))
+        #then
+        assert sem_accept.status_code == 200
+        assert sem_accept.mimetype == qualquer.mimetype == html.mimetype == 'application/json'
+        assert sem_accept.data == qualquer.data == html.data
+        assert 'Accept' in sem_accept.headers['Vary']
+
+    @pytest.mark.skipif(msgpack is None, reason='msgpack não instalado')
+    @pytest.mark.parametrize('url', URLS)
+    def test_quando_aceitar_msgpack_deve_retornar_o_mesmo_corpo(self, client, catalog, headers, url):
+        #given
+        esperado = client.get(url, headers=headers)
+        #when
+        response = client.get(url, headers=dict(headers, Accept='application/msgpack'))
+        #then
+        assert response.status_code == 200
+        assert response.mimetype == 'application/msgpack'
+        assert msgpack.unpackb(response.data) == esperado.get_json()
+        assert response.headers.get('Link') == esperado.headers.get('Link')
+
+    @pytest.mark.parametrize('url', URLS)
+    def test_quando_aceitar_json_colunar_deve_retornar_um_array_por_campo(self, client, catalog, headers, url):
+        #given
+        esperado = client.get(url, headers=headers).get_json()
+        #when
+        response = client.get(url, headers=dict(headers, Accept=COLUMNAR_MIMETYPE))
+        #then
+        assert response.status_code == 200
+        assert response.mimetype == COLUMNAR_MIMETYPE
+        assert response.get_json(force=True) == to_columns(esperado)
+
+    def test_quando_converter_para_colunas_deve_agrupar_os_campos(self):
+        #given
+        body = {
+            'total': 3,
+            'books': [{'id': 1, 'title': 'A', 'tags': [{'n': 1}]}, {'id': 2, 'title': 'B', 'tags': []}, {'id': 3}],
+            'missing': [9]
+        }
+        #when
+        resultado = to_columns(body)
+        #then
+        assert resultado == {
+            'total': 3,
+            'books': {'id': [1, 2, 3], 'title': ['A', 'B', None], 'tags': [{'n': [1]}, [], None]},
+            'missing': [9]
+        }
+
+    @patch('api.routes.ml.tokenizer', side_effect=lambda text: text)
+    def test_quando_aceitar_json_colunar_deve_transmitir_features_em_colunas(self, mock_tokenizer, client, catalog, headers):
+        #when
+        response = client.get('/api/v1/ml/features?limit=10', headers=dict(headers, Accept=COLUMNAR_MIMETYPE))
+        resultado = response.get_json(force=True)
+        #then
+        assert response.status_code == 200
+        assert resultado['total_records'] == 10
+        assert list(resultado['features']) == ['id', 'title', 'description']
+        assert resultado['features']['id'] == sorted(resultado['features']['id'])
+        assert response.headers['X-Next-Cursor']
+
+    def test_quando_faltar_msgpack_ou_orjson_deve_usar_json(self, client, catalog, headers):
+        #given
+        url = '/api/v1/stats/genres'
+        esperado = client.get(url, headers=headers).get_json()
+        #when
+        with patch('api.scripts.negotiation_utils.msgpack', None), patch('api.scripts.negotiation_utils.orjson', None):
+            response_msgpack = client.get(url, headers=dict(headers, Accept='application/msgpack'))
+            response_colunar = client.get(url, headers=dict(headers, Accept=COLUMNAR_MIMETYPE))
+        #then
+        assert response_msgpack.mimetype == 'application/json'
+        assert response_msgpack.get_json() == esperado
+        assert response_colunar.get_json(force=True) == to_columns(esperado)
+
+    def test_quando_mudar_o_accept_deve_mudar_a_chave_do_cache(self, app):
+        #given
+        chave = lambda url, accept: app.test_request_context(url, headers={'Accept': accept})
+        #when
+        with chave('/api/v1/stats/genres', '*/*'):
+            json_padrao = format_cache_key()
+        with chave('/api/v1/stats/genres', 'application/json'):
+            json_explicito = format_cache_key()
+        with chave('/api/v1/stats/genres', COLUMNAR_MIMETYPE):
+            colunar = format_cache_key()
+        with chave('/api/v1/stats/genres', 'application/msgpack'):
+            binario = format_cache_key()
+        with chave('/api/v1/books/top-rated?limit=5&fields=title', 'application/json'):
+            com_args = format_cache_key()
+        with chave('/api/v1/books/top-rated?fields=title&limit=5', 'application/json'):
+            com_args_invertidos = format_cache_key()
+        #then
+        assert json_padrao == json_explicito
+        assert len({json_padrao, colunar, binario}) == (3 if msgpack is not None else 2)
+        assert com_args == com_args_invertidos != json_padrao
@@ -0,0 +1,90 @@
+import pytest
+from api.models.books import Books
+from api.scripts.facet_utils import faceted_search
+from tests.conftest import walk, capture_statements
+
+
+def expected_facets(books, edges):
+    '''Contagens por faceta calculadas em Python sobre os livros informados.'''
+    genres, ratings = {}, {}
+    for book in books:
+        genres[book.genre] = genres.get(book.genre, 0) + 1
+        ratings[book.rating] = ratings.get(book.rating, 0) + 1
+    bounds = [None, *edges, None]
+    prices = [
+        sum(1 for book in books if (low is None or book.price >= low) and (high is None or book.price < high))
+        for low, high in zip(bounds, bounds[1:])
+    ]
+    return genres, ratings, prices
+
+
+@pytest.mark.facets
+class TestFacets:
+    def test_quando_combinar_filtros_deve_retornar_resultados_e_contagens_dos_mesmos_livros(self, catalog):
+        #given
+        esperados = [
+            book for book in Books.query.filter(Books.genre.in_(['Mystery', 'Poetry'])).all()
+            if 10 <= book.price <= 40 and book.rating_value >= 3
+        ]
+        #when
+        resultado = faceted_search(genres=['Mystery', 'Poetry'], min_price=10, max_price=40, min_rating=3, price_edges=(20, 30))
+        #then
+        genres, ratings, prices = expected_facets(esperados, (20, 30))
+        assert resultado['total'] == len(esperados)
+        assert sorted(book['id'] for book in resultado['results']) == sorted(book.id for book in esperados)
+        assert [book['title'] for book in resultado['results']] == sorted(book.title for book in esperados)
+        assert {facet['value']: facet['count'] for facet in resultado['facets']['genre']} == genres
+        assert {facet['value']: facet['count'] for facet in resultado['facets']['rating']} == ratings
+        assert resultado['facets']['price'] == [
+            {'min': None, 'max': 20, 'count': prices[0]},
+            {'min': 20, 'max': 30, 'count': prices[1]},
+            {'min': 30, 'max': None, 'count': prices[2]},
+        ]
+
+    def test_quando_buscar_por_titulo_deve_ordenar_por_relevancia_e_contar_so_os_encontrados(self, catalog):
+        #when
+        resultado = faceted_search(title='murder')
+        #then
+        ranks = [book['rank'] for book in resultado['results']]
+        assert resultado['total'] == len(resultado['results']) > 0
+        assert ranks == sorted(ranks, reverse=True)
+        assert all('murder' in book['title'].lower() for book in resultado['results'])
+        assert sum(facet['count'] for facet in resultado['facets']['genre']) == resultado['total']
+        assert sum(facet['count'] for facet in resultado['facets']['price']) == resultado['total']
+
+    def test_quando_configurar_faixas_de_preco_deve_usar_a_configuracao_da_aplicacao(self, app, client, headers, catalog):
+        #given
+        app.config['FACET_PRICE_EDGES'] = (25,)
+        #when
+        response = client.get('/api/v1/books/facets?genre=Poetry', headers=headers)
+        #then
+        assert [(facet['min'], facet['max']) for facet in response.get_json()['facets']['price']] == [(None, 25), (25, None)]
+
+    def test_quando_buscar_deve_contar_as_facetas_em_uma_unica_consulta_agregada(self, catalog):
+        #given
+        with capture_statements() as statements:
+            #when
+            faceted_search(title='the', genres=['Mystery'], min_rating=2, limit=5)
+        #then
+        consultas = [statement for statement, _ in statements if 'books' in statement]
+        assert len(consultas) == 2
+        assert sum('GROUP BY' in statement for statement in consultas) == 1
+
+    def test_quando_percorrer_paginas_deve_retornar_todos_os_resultados_em_ordem(self, client, headers, catalog):
+        #given
+        url = '/api/v1/books/facets?title=the&genre=Mystery&genre=Poetry&min_rating=2'
+        completo = client.get(url + '&limit=1000', headers=headers).get_json()
+        #when
+        paginas = walk(client, url + '&limit=4', headers)
+        #then
+        assert len(paginas) > 1
+        assert [book for pagina in paginas for book in pagina['results']] == completo['results']
+        assert all(pagina['facets'] == completo['facets'] and pagina['total'] == completo['total'] for pagina in paginas)
+
+    @pytest.mark.parametrize('query', ['min_rating=0', 'min_rating=6', 'limit=0', 'cursor=abc'])
+    def test_quando_parametros_forem_invalidos_deve_retornar_400(self, client, headers, catalog, query):
+        #when
+        response = client.get(f'/api/v1/books/facets?{query}', headers=headers)
+        #then
+        assert response.status_code == 400
+        assert 'msg' in response.get_json()
@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+from api.extensions import db
+from api.models.books import Books
+from api.models.genres import Genre
+from api.scripts.books_utils import get_books_by_price_range
+from api.scripts.catalog_stats_utils import compute_stats_by_genre
+from api.scripts.genres_utils import get_all_genres
+from api.scripts.load_utils import truncate_books, upsert_books
+from api.scripts.search_utils import search_books
+from tests.conftest import capture_statements, plan_of
+
+
+@pytest.mark.genre_dimension
+class TestGenreDimension:
+    def test_quando_carregar_catalogo_deve_cadastrar_cada_genero_uma_vez(self, catalog):
+        #given
+        df_books = pd.read_csv('data/books.csv', keep_default_na=False)
+        #when
+        generos = get_all_genres()
+        #then
+        assert Genre.query.count() == df_books['genre'].nunique()
+        assert generos == [{'genre': genre} for genre in sorted(df_books['genre'].unique())]
+
+    def test_quando_listar_livros_deve_retornar_o_nome_do_genero(self, catalog):
+        #given
+        df_books = pd.read_csv('data/books.csv', keep_default_na=False).set_index('upc')
+        #when
+        livros = get_books_by_price_range(10, 20)
+        #then
+        assert livros
+        assert all(livro['genre'] == df_books.loc[livro['upc'], 'genre'] for livro in livros)
+
+    def test_quando_agregar_por_genero_deve_percorrer_apenas_o_indice(self, catalog):
+        #given
+        df_books = pd.read_csv('data/books.csv', keep_default_na=False)
+        with capture_statements() as statements:
+            #when
+            estatisticas = compute_stats_by_genre()
+        #then
+        plan = plan_of(statements, 'GROUP BY books.genre_id')
+        assert 'COVERING INDEX ix_books_genre_id_price' in plan or 'Index Only Scan' in plan
+        totais = df_books.groupby('genre').size()
+        assert {stat['genre']: stat['total'] for stat in estatisticas} == totais.to_dict()
+
+    def test_quando_livro_mudar_de_genero_deve_remover_o_genero_sem_livros(self, catalog):
+        #given
+        df_books = pd.read_csv('data/books.csv', keep_default_na=False)
+        totais = df_books.groupby('genre').size()
+        genero_antigo = totais[totais == 1].index[0]
+        livro = df_books[df_books['genre'] == genero_antigo].assign(genre='Genero Novo')
+        #when
+        upsert_books(livro)
+        db.session.commit()
+        #then
+        assert Genre.query.filter_by(name=genero_antigo).count() == 0
+        assert Books.query.filter_by(upc=livro['upc'].iloc[0]).one().genre == 'Genero Novo'
+        assert [book.upc for book, _ in search_books(genre='novo')] == [livro['upc'].iloc[0]]
+        assert search_books(genre=genero_antigo) == []
+
+    def test_quando_limpar_catalogo_deve_remover_os_generos(self, catalog):
+        #when
+        truncate_books()
+        db.session.commit()
+        #then
+        assert Genre.query.count() == 0
+        assert get_all_genres() == []
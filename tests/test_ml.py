@@ -1,6 +1,10 @@
 import pytest
+from flask import Flask
 from unittest.mock import patch, MagicMock
 from flask_jwt_extended import create_access_token
+from api.extensions import cache, db
+from api.models.user_preferences import UserPreferences
+from api.scripts.load_utils import bulk_load_books
 
 
 @pytest.mark.ml
@@ -51,6 +55,30 @@ class TestML:
         assert mock_db.add.called
         assert mock_db.commit.called
 
+    @pytest.mark.integration
+    @pytest.mark.predictions
+    @patch('api.routes.ml.joblib.load')
+    @patch('api.routes.ml.recommender')
+    def test_quando_usuarios_pedirem_a_mesma_predicao_deve_salvar_as_preferencias_de_cada_um(self, mock_recommender, mock_load, app, client):
+        #given
+        #cache real; o pytest-flask troca a classe das respostas por uma que não pode ser serializada no cache
+        cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+        app.response_class = Flask.response_class
+        bulk_load_books('data/books.csv')
+        db.session.commit()
+        mock_recommender.return_value = ([{'id': 2, 'title': 'Recomendado', 'similarity_score': 0.95}], None)
+        mock_load.return_value = MagicMock()
+        payload = {'title': 'Livro Favoritado'}
+        #when
+        respostas = [
+            client.get('/api/v1/ml/predictions', json=payload, headers={'Authorization': f'Bearer {create_access_token(identity=user_id)}'})
+            for user_id in ('1', '2')
+        ]
+        #then
+        assert [response.status_code for response in respostas] == [200, 200]
+        assert mock_recommender.call_count == 2
+        assert sorted(user_id for (user_id,) in db.session.query(UserPreferences.user_id)) == [1, 2]
+
     @pytest.mark.integration
     @pytest.mark.user_preferences
     def test_quando_buscar_preferencias_usuario_existente_deve_retornar_200(self, client):
@@ -0,0 +1,164 @@
+import pytest
+from unittest.mock import patch
+from api.extensions import db
+from api.models.user_preferences import UserPreferences
+from api.scripts.books_utils import get_all_book_titles, get_books_by_price_range, get_books_by_title_or_category
+from api.scripts.load_utils import upsert_books
+from api.scripts.pagination_utils import PaginationError, Page, decode_cursor, encode_cursor, paginate
+from tests.conftest import make_book, walk
+
+
+@pytest.mark.pagination
+class TestPagination:
+    def test_quando_codificar_cursor_deve_decodificar_os_mesmos_valores(self):
+        #given
+        cursor = encode_cursor('text', 4.851032000000001, 'Ação & "Reação"', 42)
+        #when
+        resultado = decode_cursor(cursor, (str, float, str, int))
+        #then
+        assert resultado == ['text', 4.851032000000001, 'Ação & "Reação"', 42]
+        assert '=' not in cursor and '/' not in cursor and '+' not in cursor
+
+    @pytest.mark.parametrize('cursor', ['!!!', encode_cursor('a', 1), encode_cursor(1.5, 'a'), encode_cursor(True, 1), 'eyJ4Ijox'])
+    def test_quando_decodificar_cursor_invalido_deve_lancar_erro(self, cursor):
+        #then
+        with pytest.raises(PaginationError):
+            decode_cursor(cursor, (float, int))
+
+    def test_quando_paginar_deve_gerar_cursor_so_se_houver_linha_excedente(self):
+        #when
+        com_proxima = paginate([1, 2, 3], 2, lambda row: (row,))
+        ultima = paginate([1, 2], 2, lambda row: (row,))
+        sem_limite = paginate([1, 2, 3], None, lambda row: (row,))
+        #then
+        assert com_proxima == [1, 2] and decode_cursor(com_proxima.next_cursor, (int,)) == [2]
+        assert ultima == [1, 2] and ultima.next_cursor is None
+        assert isinstance(sem_limite, Page) and sem_limite == [1, 2, 3] and sem_limite.next_cursor is None
+
+    @pytest.mark.titles
+    def test_quando_percorrer_titulos_deve_retornar_todos_sem_repeticao(self, client, headers, catalog):
+        #when
+        pages = walk(client, '/api/v1/books/titles?limit=300', headers)
+        #then
+        assert [len(page) for page in pages[:-1]] == [300] * (len(pages) - 1)
+        assert [item for page in pages for item in page] == get_all_book_titles()
+
+    @pytest.mark.price_range
+    def test_quando_percorrer_faixa_de_preco_com_empates_deve_retornar_todos_na_ordem(self, client, headers, catalog):
+        #when
+        pages = walk(client, '/api/v1/books/price-range?min=10&max=20&limit=7', headers)
+        #then
+        books = [book for page in pages for book in page]
+        assert books == get_books_by_price_range(10, 20)
+        assert len({book['id'] for book in books}) == len(books)
+        assert [(book['price'], book['id']) for book in books] == sorted((book['price'], book['id']) for book in books)
+
+    @pytest.mark.search
+    def test_quando_percorrer_busca_deve_manter_a_ordem_de_relevancia(self, client, headers, catalog):
+        #when
+        pages = walk(client, '/api/v1/books/search?title=the&limit=25', headers)
+        #then
+        books = [book for page in pages for book in page]
+        assert len(pages) > 1
+        assert [book['id'] for book in books] == [book['id'] for book in get_books_by_title_or_category(title='the')]
+
+    @pytest.mark.search
+    @pytest.mark.parametrize('url', ['/api/v1/books/search?title=tide&limit=2', '/api/v1/books/facets?title=tide&limit=2'])
+    def test_quando_percorrer_busca_com_relevancias_empatadas_deve_desempatar_por_titulo_e_id(self, client, headers, url):
+        #given
+        #títulos, gênero e descrição do mesmo tamanho: todos os livros têm a mesma relevância
+        titulos = ['Tide Beta', 'Tide Alpha', 'Tide Beta', 'Tide Gamma', 'Tide Alpha']
+        upsert_books([make_book(f'tide{i}', titulo, description='Maré alta.') for i, titulo in enumerate(titulos)])
+        db.session.commit()
+        #when
+        pages = walk(client, url, headers)
+        #then
+        books = [book for page in pages for book in (page if isinstance(page, list) else page['results'])]
+        assert len(pages) == 3
+        assert len({book['rank'] for book in books}) == 1
+        assert [(book['title'], book['id']) for book in books] == sorted((book['title'], book['id']) for book in books)
+        assert len({book['id'] for book in books}) == len(titulos)
+
+    @pytest.mark.search
+    def test_quando_percorrer_busca_aproximada_deve_continuar_na_busca_aproximada(self, client, headers, catalog):
+        #when
+        pages = walk(client, '/api/v1/books/search?title=the%20secrt&limit=2', headers)
+        #then
+        books = [book for page in pages for book in page]
+        assert len(pages) > 1
+        assert [book['id'] for book in books] == [book['id'] for book in get_books_by_title_or_category(title='the secrt')]
+        assert all(0 < book['rank'] <= 1 for book in books)
+
+    @pytest.mark.user_preferences
+    def test_quando_percorrer_preferencias_deve_ordenar_por_similaridade_e_desempatar_por_id(self, client, headers, catalog):
+        #given
+        for book_id, score in [(1, 0.5), (2, 0.9), (3, 0.5), (4, 0.7), (5, 0.5)]:
+            db.session.add(UserPreferences(
+                user_id=1, inputed_book_title='Livro', recommended_book_id=book_id,
+                recommended_book_title='Livro', similarity_score=score
+            ))
+        db.session.commit()
+        #when
+        pages = walk(client, '/api/v1/ml/user-preferences/1?limit=2', headers)
+        #then
+        assert [len(page) for page in pages] == [2, 2, 1]
+        assert [(book['id'], book['similarity_score']) for page in pages for book in page] == [
+            (2, 0.9), (4, 0.7), (5, 0.5), (3, 0.5), (1, 0.5)
+        ]
+
+    @pytest.mark.ml
+    @patch('api.routes.ml.tokenizer', side_effect=lambda text: text)
+    def test_quando_percorrer_features_deve_retornar_todos_os_livros_em_ordem_de_id(self, mock_tokenizer, client, headers, catalog):
+        #when
+        pages = walk(client, '/api/v1/ml/features?limit=400', headers)
+        #then
+        ids = [feature['id'] for page in pages for feature in page['features']]
+        assert [page['total_records'] for page in pages] == [400, 400, 200]
+        assert ids == sorted(ids) and len(set(ids)) == 1000
+
+    def test_quando_houver_proxima_pagina_deve_informar_url_no_link(self, client, headers, catalog):
+        #when
+        response = client.get('/api/v1/books/price-range?min=10&max=20&limit=5', headers=headers)
+        #then
+        cursor = response.headers['X-Next-Cursor']
+        assert response.headers['Link'] == f'<http://localhost/api/v1/books/price-range?min=10&max=20&limit=5&cursor={cursor}>; rel="next"'
+
+    @pytest.mark.parametrize('url, function', [
+        ('/api/v1/books/titles', lambda: get_all_book_titles()),
+        ('/api/v1/books/price-range?min=0&max=100', lambda: get_books_by_price_range(0, 100)),
+        ('/api/v1/books/search?title=the', lambda: get_books_by_title_or_category(title='the')),
+    ])
+    def test_quando_nao_informar_limit_nem_cursor_deve_retornar_a_listagem_inteira(self, client, headers, catalog, url, function):
+        #when
+        response = client.get(url, headers=headers)
+        #then
+        assert response.status_code == 200
+        assert 'X-Next-Cursor' not in response.headers and 'Link' not in response.headers
+        assert len(response.get_json()) > 100
+        assert response.get_json() == function()
+
+    def test_quando_informar_cursor_sem_limit_deve_usar_o_limite_padrao(self, app, client, headers, catalog):
+        #given
+        app.config['PAGINATION_DEFAULT_LIMIT'] = 40
+        cursor = client.get('/api/v1/books/titles?limit=10', headers=headers).headers['X-Next-Cursor']
+        #when
+        response = client.get(f'/api/v1/books/titles?cursor={cursor}', headers=headers)
+        #then
+        assert len(response.get_json()) == 40
+        assert response.get_json() == get_all_book_titles()[10:50]
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/books/titles?limit=0',
+        '/api/v1/books/titles?limit=1001',
+        '/api/v1/books/titles?cursor=invalido',
+        '/api/v1/books/search?title=murder&cursor=' + encode_cursor('outro', 1.0, 'a', 1),
+        '/api/v1/books/price-range?min=10&max=20&cursor=' + encode_cursor('a', 1),
+        '/api/v1/ml/features?cursor=' + encode_cursor('a'),
+        '/api/v1/ml/user-preferences/1?cursor=' + encode_cursor(1),
+    ])
+    def test_quando_paginacao_for_invalida_deve_retornar_400(self, client, headers, catalog, url):
+        #when
+        response = client.get(url, headers=headers)
+        #then
+        assert response.status_code == 400
+        assert 'msg' in response.get_json()
@@ -0,0 +1,104 @@
+import json
+import pytest
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from api.extensions import db
+from api.models.access_log import AccessLog
+from api.models.books import Books
+from api.models.user_preferences import UserPreferences
+from api.scripts.books_utils import get_books_by_price_range, get_all_book_titles, get_top_rated_books, get_books_by_title_or_category
+from api.scripts.genres_utils import get_all_genres
+from api.scripts.catalog_stats_utils import compute_stats_overview, compute_stats_by_genre
+from tests.conftest import capture_statements, plan_of
+
+
+@pytest.mark.query_plans
+class TestQueryPlans:
+    @pytest.mark.parametrize('function, fragment, index', [
+        (lambda: get_books_by_price_range(10, 20), 'books.price >=', 'ix_books_price'),
+        (get_all_book_titles, 'DISTINCT books.title', 'ix_books_title'),
+        (get_all_genres, 'FROM genres', 'ix_genres_name'),
+        (compute_stats_by_genre, 'GROUP BY books.genre_id', 'ix_books_genre_id_price'),
+        (compute_stats_overview, 'GROUP BY books.rating_value', 'ix_books_rating_value_title'),
+        (get_top_rated_books, 'ORDER BY books.rating_value DESC', 'ix_books_rating_value_title'),
+        (lambda: Books.query.filter_by(upc='a22124811bfa8350').first(), 'books.upc =', 'ix_books_upc'),
+    ])
+    def test_quando_consultar_books_deve_usar_o_indice(self, catalog, function, fragment, index):
+        #given
+        with capture_statements() as statements:
+            #when
+            function()
+        #then
+        assert index in plan_of(statements, fragment)
+
+    def test_quando_buscar_top_rated_deve_percorrer_o_indice_sem_ordenar(self, catalog):
+        #given
+        with capture_statements() as statements:
+            #when
+            books = get_top_rated_books(limit=5)
+        #then
+        plan = plan_of(statements, 'ORDER BY books.rating_value DESC')
+        assert [book['rating'] for book in books] == ['Five'] * 5
+        assert [book['title'] for book in books] == sorted(book['title'] for book in books)
+        assert 'TEMP B-TREE' not in plan and 'Sort' not in plan
+
+    def test_quando_buscar_proxima_pagina_deve_continuar_no_indice_sem_ordenar(self, catalog):
+        #given
+        prices = get_books_by_price_range(10, 20, limit=5)
+        titles = get_all_book_titles(limit=5)
+        with capture_statements() as statements:
+            #when
+            get_books_by_price_range(10, 20, limit=5, cursor=prices.next_cursor)
+            get_all_book_titles(limit=5, cursor=titles.next_cursor)
+        #then
+        for fragment, index in [('books.price >=', 'ix_books_price'), ('DISTINCT books.title', 'ix_books_title')]:
+            plan = plan_of(statements, fragment)
+            assert index in plan
+            assert 'TEMP B-TREE' not in plan and 'Sort' not in plan
+
+    def test_quando_buscar_por_titulo_deve_usar_o_indice_de_texto_completo(self, catalog):
+        #given
+        with capture_statements() as statements:
+            #when
+            get_books_by_title_or_category(title='murder')
+        #then
+        plan = plan_of(statements, 'ranked')
+        assert 'books_fts VIRTUAL TABLE INDEX' in plan or 'ix_books_search_vector' in plan
+        assert 'SCAN books' not in plan.replace('SCAN books_fts', '')
+
+    def test_quando_buscar_preferencias_do_usuario_deve_usar_o_indice(self, client, catalog):
+        #given
+        db.session.add(UserPreferences(
+            user_id=1, inputed_book_title='Livro', recommended_book_id=1,
+            recommended_book_title='Livro', similarity_score=0.9
+        ))
+        db.session.commit()
+        with capture_statements() as statements:
+            #when
+            response = client.get('/api/v1/ml/user-preferences/1', headers={'Authorization': f'Bearer {create_access_token(identity="1")}'})
+        #then
+        assert response.status_code == 200
+        assert 'ix_user_preferences_user_id_similarity_score' in plan_of(statements, 'user_preferences.user_id =')
+
+    def test_quando_fazer_login_e_refresh_deve_buscar_tokens_pelos_indices(self, client):
+        #given
+        user_data = {'username': 'indice', 'password': 'indice'}
+        client.post('/api/v1/auth/register', data=json.dumps(user_data), content_type='application/json')
+        client.post('/api/v1/auth/login', data=json.dumps(user_data), content_type='application/json')
+        with capture_statements() as statements:
+            #when
+            login = client.post('/api/v1/auth/login', data=json.dumps(user_data), content_type='application/json')
+            refresh = client.post('/api/v1/auth/refresh', headers={'Authorization': f'Bearer {login.get_json()["refresh_token"]}'})
+        #then
+        assert refresh.status_code == 200
+        assert 'ix_refresh_token_manager_username_created_at' in plan_of(statements, 'refresh_token_manager.refresh_token_expire_at >')
+        assert 'ix_refresh_token_manager_refresh_token' in plan_of(statements, 'refresh_token_manager.refresh_token =')
+
+    def test_quando_consultar_access_log_por_periodo_deve_usar_o_indice(self, app):
+        #given
+        inicio = datetime.utcnow() - timedelta(days=1)
+        with capture_statements() as statements:
+            #when
+            AccessLog.query.filter(AccessLog.created_at >= inicio).order_by(AccessLog.created_at.desc()).all()
+        #then
+        assert 'ix_access_log_created_at' in plan_of(statements, 'access_log.created_at >=')
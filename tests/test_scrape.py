@@ -1,6 +1,31 @@
+import csv
+import hashlib
+import io
+import json
+import os
+from datetime import datetime, timedelta
 import pytest
+import requests
+import pandas as pd
 from unittest.mock import patch, MagicMock
 from flask_jwt_extended import create_access_token
+from api.config import Config
+from api.extensions import db
+from api.models.books import Books
+from api.models.scrape_job import ScrapeJob
+from api.models.scrape_task import ScrapeTask
+from api.scripts.load_utils import BOOK_COLUMNS, bulk_load_books, truncate_books, upsert_books
+from api.scripts.catalog_stats_utils import STATS_OVERVIEW, compute_stats_overview, get_catalog_stats
+from api.scripts.scrape_utils import run_scraping, get_category_links, iter_books
+from api.scripts.extract_utils import EXTRACTORS, available_extractors, get_extractor
+from tests.conftest import CORPUS_DIR
+from benchmarks.standin_server import StandInServer
+from api.scripts import load_utils, scrape_utils
+from api.scripts.crawl_utils import AdaptiveLimiter, CrawlController
+from api.scripts.http_cache_utils import ResponseCache
+from api.scripts.metrics_utils import Histogram, ScrapeMetrics
+from api.scripts.scrape_job_utils import create_scrape_job, create_scrape_job_if_idle, run_scrape_job, serialize_scrape_job
+from api.scripts.scrape_queue_utils import claim_tasks, finish_job_if_drained, process_tasks, get_latest_distributed_job
 
 
 @pytest.mark.scrape
@@ -13,8 +38,7 @@ class TestScrape:
     @pytest.mark.scrape
     @patch('api.scripts.scrape_utils.requests.get')
     @patch('api.scripts.scrape_utils.pd.DataFrame.to_csv')
-    @patch('api.routes.scrape.db.session')
-    def test_quando_executar_scrape_com_sucesso_deve_retornar_200_e_total_de_registros(self, mock_session, mock_csv, mock_get, client):
+    def test_quando_executar_scrape_com_sucesso_deve_retornar_202_e_id_do_job(self, mock_csv, mock_get, client):
         #given
         html_home = '<ul class="nav nav-list"><li><ul><li><a href="cat.html">Classics</a></li></ul></li></ul>'
         html_list = '<article class="product_pod"><h3><a href="book.html">Livro Teste</a></h3></article>'
@@ -39,11 +63,583 @@ class TestScrape:
         #when
         response = client.post('/api/v1/scrape/', headers=headers)
         resultado = response.get_json()
+        progresso = client.get(resultado['status_url'], headers=headers).get_json()
         #then
-        assert response.status_code == 200
-        assert resultado['msg'] == 'Web scraping realizado com sucesso'
-        assert resultado['total_records'] == 1
-        #verifica se as operações de banco foram chamadas
-        assert mock_session.execute.called
-        assert mock_session.bulk_insert_mappings.called
-        assert mock_session.commit.called
\ No newline at end of file
+        assert response.status_code == 202
+        assert resultado['msg'] == 'Web scraping iniciado'
+        assert progresso['status'] == 'done'
+        assert progresso['categories_total'] == 1
+        assert progresso['categories_done'] == 1
+        assert progresso['books_parsed'] == 1
+        assert progresso['checkpoint_url'] is None
+        assert progresso['metrics']['books'] == 1
+        assert progresso['metrics']['requests'] == 3
+        assert Books.query.one().upc == 'UPC123'
+        assert mock_csv.called
+
+    @pytest.mark.integration
+    @pytest.mark.scrape
+    def test_quando_job_for_interrompido_deve_retomar_do_ultimo_checkpoint(self, client, books_toscrape_corpus, tmp_path):
+        #given
+        file_path = str(tmp_path / 'books.csv')
+        headers = {'Authorization': f'Bearer {self._get_mock_token()}'}
+        job_id = create_scrape_job().id
+        calls = []
+
+        def bulk_load_com_falha(batch, **kwargs):
+            #simula a queda do processo ao gravar a segunda página de Mystery
+            calls.append(len(batch))
+            if len(calls) == 3:
+                raise RuntimeError('worker reiniciado')
+            return bulk_load_books(batch, **kwargs)
+
+        with patch('api.scripts.scrape_job_utils.bulk_load_books', side_effect=bulk_load_com_falha):
+            run_scrape_job(job_id, file_path=file_path)
+        interrompido = client.get(f'/api/v1/scrape/jobs/{job_id}', headers=headers).get_json()
+        requests_before_resume = books_toscrape_corpus.call_count
+        #when
+        with patch('api.routes.scrape.start_scrape_job', lambda app, job_id: run_scrape_job(job_id, file_path=file_path)):
+            response = client.post(f'/api/v1/scrape/jobs/{job_id}/resume', headers=headers)
+        progresso = client.get(f'/api/v1/scrape/jobs/{job_id}', headers=headers).get_json()
+        #then
+        assert interrompido['status'] == 'failed'
+        assert interrompido['categories_done'] == 1
+        assert interrompido['books_parsed'] == 6
+        assert interrompido['checkpoint_url'].endswith('mystery_3/page-2.html')
+        assert response.status_code == 202
+        assert progresso['status'] == 'done'
+        assert progresso['categories_done'] == progresso['categories_total'] == 3
+        assert progresso['books_parsed'] == 10
+        #a retomada não baixa novamente a página inicial nem as páginas já gravadas
+        assert books_toscrape_corpus.call_count - requests_before_resume == 6
+        assert Books.query.count() == 10
+        assert len(pd.read_csv(file_path)) == 10
+
+    @pytest.mark.integration
+    @pytest.mark.scrape
+    @pytest.mark.parametrize('url_com_falha', [
+        'catalogue/category/books/mystery_3/page-2.html',
+        'catalogue/the-murder-of-roger-ackroyd-hercule-poirot-4_852/index.html',
+    ])
+    def test_quando_pagina_falhar_apos_as_tentativas_deve_falhar_o_job_no_checkpoint(self, app, books_toscrape_corpus, tmp_path, url_com_falha):
+        #given
+        file_path = str(tmp_path / 'books.csv')
+        job_id = create_scrape_job().id
+        fake_get = books_toscrape_corpus.side_effect
+
+        def get_com_falha(url, timeout=None):
+            if url.endswith(url_com_falha):
+                raise requests.exceptions.ConnectionError('conexão recusada')
+            return fake_get(url, timeout=timeout)
+
+        books_toscrape_corpus.side_effect = get_com_falha
+        #when
+        job = run_scrape_job(job_id, file_path=file_path, controller=CrawlController(max_retries=1, backoff_base=0.001))
+        falhou = (job.status, job.categories_done, job.books_parsed, job.checkpoint_url)
+        books_toscrape_corpus.side_effect = fake_get
+        job = run_scrape_job(job_id, file_path=file_path)
+        #then
+        assert falhou[:3] == ('failed', 1, 6)
+        assert falhou[3].endswith('mystery_3/page-2.html')
+        assert job.status == 'done'
+        assert job.books_parsed == Books.query.count() == 10
+
+    @pytest.mark.integration
+    @pytest.mark.scrape
+    def test_quando_pagina_de_livro_estiver_malformada_deve_descartar_o_livro_e_registrar_a_falha(self, app, books_toscrape_corpus, tmp_path):
+        #given
+        job_id = create_scrape_job().id
+        fake_get = books_toscrape_corpus.side_effect
+
+        def get_malformado(url, timeout=None):
+            if url.endswith('the-murder-of-roger-ackroyd-hercule-poirot-4_852/index.html'):
+                return MagicMock(status_code=200, text='<html><body>em manutenção</body></html>')
+            return fake_get(url, timeout=timeout)
+
+        books_toscrape_corpus.side_effect = get_malformado
+        #when
+        job = run_scrape_job(job_id, file_path=str(tmp_path / 'books.csv'))
+        #then
+        assert job.status == 'done'
+        assert job.books_parsed == Books.query.count() == 9
+        assert job.metrics['failures_by_category'] == {'Mystery': 1}
+        assert job.metrics['recent_errors'][0]['url'].endswith('the-murder-of-roger-ackroyd-hercule-poirot-4_852/index.html')
+
+    @pytest.mark.integration
+    @pytest.mark.scrape
+    def test_quando_job_gravar_varios_lotes_deve_recalcular_as_estatisticas_uma_vez(self, app, books_toscrape_corpus, tmp_path):
+        #given
+        job_id = create_scrape_job().id
+        #when
+        with patch('api.scripts.catalog_stats_utils.compute_stats_overview', wraps=compute_stats_overview) as mock_overview:
+            job = run_scrape_job(job_id, file_path=str(tmp_path / 'books.csv'))
+        #then
+        assert job.status == 'done' and job.pages_done > 1
+        assert mock_overview.call_count == 1
+        assert get_catalog_stats(STATS_OVERVIEW)['total_books'] == 10
+
+    @pytest.mark.integration
+    @pytest.mark.scrape
+    def test_quando_fila_for_esvaziada_deve_recalcular_as_estatisticas_uma_vez(self, app, books_toscrape_corpus, tmp_path):
+        #given
+        runner = app.test_cli_runner()
+        app.config['SCRAPE_QUEUE_LOCK_FILE'] = str(tmp_path / 'queue.lock')
+        runner.invoke(args=['scrape-queue', 'seed'])
+        job_id = get_latest_distributed_job().id
+        #when
+        with patch('api.scripts.catalog_stats_utils.compute_stats_overview', wraps=compute_stats_overview) as mock_overview:
+            work = runner.invoke(args=['scrape-queue', 'work', '--job-id', str(job_id)])
+        #then
+        assert work.exit_code == 0
+        assert db.session.get(ScrapeJob, job_id).pages_done > 1
+        assert mock_overview.call_count == 1
+        assert get_catalog_stats(STATS_OVERVIEW)['total_books'] == 10
+
+    @pytest.mark.scrape
+    def test_quando_criar_job_com_outro_em_execucao_nao_deve_criar_um_segundo(self, app):
+        #when
+        primeiro = create_scrape_job_if_idle(stale_seconds=300)
+        segundo = create_scrape_job_if_idle(stale_seconds=300)
+        primeiro.updated_at = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+        apos_interrupcao = create_scrape_job_if_idle(stale_seconds=300)
+        #then
+        assert primeiro is not None and primeiro.status == 'pending'
+        assert segundo is None
+        assert apos_interrupcao is not None and apos_interrupcao.id != primeiro.id
+        assert ScrapeJob.query.count() == 2
+
+    @pytest.mark.scrape
+    def test_quando_job_estiver_em_execucao_deve_retornar_409_ou_interrupted_se_sem_checkpoint(self, client):
+        #given
+        headers = {'Authorization': f'Bearer {self._get_mock_token()}'}
+        job = create_scrape_job()
+        job.status = 'running'
+        db.session.commit()
+        #when
+        conflito = client.post('/api/v1/scrape/', headers=headers)
+        job.updated_at = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+        progresso = client.get(f'/api/v1/scrape/jobs/{job.id}', headers=headers).get_json()
+        inexistente = client.get('/api/v1/scrape/jobs/999', headers=headers)
+        #then
+        assert conflito.status_code == 409
+        assert conflito.get_json()['job_id'] == job.id
+        assert progresso['status'] == 'interrupted'
+        assert inexistente.status_code == 404
+
+    @pytest.mark.integration
+    @pytest.mark.scrape
+    def test_quando_carregar_csv_em_lote_deve_inserir_todos_os_registros(self, app):
+        #given
+        file_path = 'data/books.csv'
+        #when
+        truncate_books()
+        total = bulk_load_books(file_path, chunk_size=300)
+        db.session.commit()
+        #then
+        assert total == 1000
+        assert Books.query.count() == 1000
+        assert Books.query.filter_by(upc='a22124811bfa8350').first().genre == 'Travel'
+
+    @pytest.mark.scrape
+    def test_quando_carregar_csv_via_copy_deve_usar_as_colunas_de_book_columns_entre_aspas(self, app, tmp_path):
+        #given
+        livros = pd.read_csv('data/books.csv', nrows=3, keep_default_na=False)
+        livros['genre) FROM STDIN; DROP TABLE books; --'] = 'x'
+        file_path = tmp_path / 'books.csv'
+        livros[livros.columns[::-1]].to_csv(file_path, index=False)
+        comandos, copiados = [], []
+        cursor = MagicMock(rowcount=3)
+        cursor.execute.side_effect = lambda sql: comandos.append(sql)
+        cursor.copy_expert.side_effect = lambda sql, stream: copiados.append((sql, stream.read()))
+        connection = MagicMock()
+        connection.connection.dbapi_connection.cursor.return_value.__enter__.return_value = cursor
+        #when
+        with patch('api.scripts.load_utils.db.session.connection', return_value=connection):
+            total = load_utils._copy_books(str(file_path), chunk_size=2)
+        #then
+        sql, dados = copiados[0]
+        linhas = list(csv.reader(io.StringIO(dados)))
+        assert total == 3
+        assert sql == 'COPY "books_copy_staging" (' + ', '.join(f'"{column}"' for column in BOOK_COLUMNS) + ') FROM STDIN WITH (FORMAT csv)'
+        assert [linha[0] for linha in linhas] == list(livros['upc']) and {len(linha) for linha in linhas} == {len(BOOK_COLUMNS)}
+        assert not any('DROP TABLE books' in comando for comando in comandos + [sql, dados])
+
+    @pytest.mark.scrape
+    @patch('api.scripts.scrape_utils.iter_books')
+    @patch('api.scripts.scrape_utils.get_category_links')
+    def test_quando_coleta_falhar_no_meio_deve_manter_lotes_ja_gravados(self, mock_categories, mock_iter_books, tmp_path):
+        #given
+        def livros_com_falha(*args):
+            for i in range(5):
+                yield {column: f'{column}-{i}' for column in BOOK_COLUMNS} | {'price': 10.0}
+            raise RuntimeError('conexão perdida')
+        mock_categories.return_value = [{'name': 'Classics', 'initial_url': 'cat.html'}]
+        mock_iter_books.side_effect = livros_com_falha
+        file_path = tmp_path / 'books.csv'
+        lotes = []
+        #when
+        with pytest.raises(RuntimeError):
+            run_scraping(on_batch=lotes.append, batch_size=2, file_path=str(file_path))
+        #then
+        assert [len(lote) for lote in lotes] == [2, 2]
+        assert len(pd.read_csv(file_path)) == 4
+
+
+    @pytest.mark.scrape
+    @pytest.mark.parametrize('backend', [
+        pytest.param(name, marks=pytest.mark.skipif(name not in available_extractors(), reason=f'{name} não instalado'))
+        for name in EXTRACTORS
+    ])
+    def test_quando_extrair_corpus_salvo_deve_coincidir_campo_a_campo_com_extrator_de_referencia(self, backend, books_toscrape_corpus):
+        #given
+        with open(os.path.join(CORPUS_DIR, 'expected_books.json'), encoding='utf-8') as file:
+            livros_esperados = json.load(file)
+        extractor = get_extractor(backend)
+        #when
+        livros = list(iter_books(get_category_links(extractor), extractor))
+        #then
+        assert len(livros) == len(livros_esperados)
+        for livro, esperado in zip(livros, livros_esperados):
+            for campo, valor in esperado.items():
+                assert livro[campo] == valor, f'{backend}: {campo} divergente em {esperado["url"]}'
+
+
+    @pytest.mark.scrape
+    def test_quando_coletar_do_servidor_local_deve_extrair_todo_o_corpus(self, tmp_path):
+        #given
+        with open(os.path.join(CORPUS_DIR, 'expected_books.json'), encoding='utf-8') as file:
+            upcs_esperados = [livro['upc'] for livro in json.load(file)]
+        lotes = []
+        #when
+        with StandInServer() as server, \
+                patch.object(scrape_utils, 'BASE_URL', server.base_url), \
+                patch.object(scrape_utils, 'HOME_URL', server.base_url + 'index.html'):
+            total = run_scraping(on_batch=lotes.append, batch_size=4, file_path=str(tmp_path / 'books.csv'))
+        #then
+        assert total == len(upcs_esperados)
+        assert [livro['upc'] for lote in lotes for livro in lote] == upcs_esperados
+        assert all(livro['url'].startswith(server.base_url) for lote in lotes for livro in lote)
+
+    @pytest.mark.scrape
+    def test_quando_nao_informar_tamanho_do_lote_deve_usar_scrape_batch_size(self, tmp_path):
+        #given
+        lotes = []
+        #when
+        with StandInServer() as server, \
+                patch.object(Config, 'SCRAPE_BATCH_SIZE', 3), \
+                patch.object(scrape_utils, 'BASE_URL', server.base_url), \
+                patch.object(scrape_utils, 'HOME_URL', server.base_url + 'index.html'):
+            total = run_scraping(on_batch=lotes.append, file_path=str(tmp_path / 'books.csv'))
+        #then
+        assert len(lotes) > 1
+        assert all(len(lote) == 3 for lote in lotes[:-1]) and 0 < len(lotes[-1]) <= 3
+        assert sum(len(lote) for lote in lotes) == total
+
+    @pytest.mark.scrape
+    @patch('api.scripts.crawl_utils.requests.get')
+    def test_quando_servidor_responder_429_deve_respeitar_retry_after_e_tentar_novamente(self, mock_get):
+        #given
+        mock_get.side_effect = [
+            MagicMock(status_code=429, headers={'Retry-After': '7'}),
+            MagicMock(status_code=503, headers={}),
+            MagicMock(status_code=200, text='ok')
+        ]
+        esperas = []
+        controller = CrawlController(sleep=esperas.append, jitter=lambda low, high: high)
+        #when
+        response = controller.fetch('http://books.toscrape.com/index.html')
+        #then
+        assert response.text == 'ok'
+        assert esperas == [7.0, controller.backoff_base * 2]
+        assert mock_get.call_count == 3
+
+    @pytest.mark.scrape
+    @patch('api.scripts.crawl_utils.requests.get')
+    def test_quando_tentativas_se_esgotarem_deve_levantar_erro(self, mock_get):
+        #given
+        mock_get.side_effect = requests.exceptions.ConnectionError('recusada')
+        controller = CrawlController(max_retries=2, sleep=lambda delay: None)
+        #when / then
+        with pytest.raises(requests.exceptions.ConnectionError):
+            controller.fetch('http://books.toscrape.com/index.html')
+        assert mock_get.call_count == 3
+
+    @pytest.mark.scrape
+    def test_quando_limitador_observar_sucessos_e_falhas_deve_ajustar_concorrencia_em_aimd(self):
+        #given
+        limiter = AdaptiveLimiter(initial=4, maximum=8, target_latency=1.0, cooldown=0)
+        #when
+        for _ in range(4):
+            limiter.acquire()
+            limiter.release(latency=0.1, success=True)
+        limite_apos_sucessos = limiter.limit
+        limiter.acquire()
+        limiter.release(latency=0.1, success=False)
+        #then
+        assert 4.9 < limite_apos_sucessos < 5.0
+        assert limiter.limit == pytest.approx(limite_apos_sucessos / 2)
+        assert limiter.in_flight == 0
+
+    @pytest.mark.scrape
+    def test_quando_servidor_local_falhar_de_forma_intermitente_nao_deve_perder_categorias(self, tmp_path):
+        #given
+        with open(os.path.join(CORPUS_DIR, 'expected_books.json'), encoding='utf-8') as file:
+            upcs_esperados = [livro['upc'] for livro in json.load(file)]
+        controller = CrawlController(max_retries=10, backoff_base=0.001)
+        lotes = []
+        #when
+        with StandInServer(error_rate=0.3, seed=7) as server, \
+                patch.object(scrape_utils, 'BASE_URL', server.base_url), \
+                patch.object(scrape_utils, 'HOME_URL', server.base_url + 'index.html'):
+            run_scraping(on_batch=lotes.append, file_path=str(tmp_path / 'books.csv'), controller=controller)
+        #then
+        assert server.errors_injected > 0
+        assert [livro['upc'] for lote in lotes for livro in lote] == upcs_esperados
+
+    @pytest.mark.integration
+    @pytest.mark.scrape
+    def test_quando_fazer_upsert_deve_atualizar_upcs_existentes_sem_duplicar(self, app):
+        #given
+        livros = pd.read_csv('data/books.csv', keep_default_na=False).head(3).to_dict(orient='records')
+        bulk_load_books(livros[:2])
+        db.session.commit()
+        atualizado = {**livros[0], 'price': 99.0}
+        #when
+        total = upsert_books([atualizado, livros[1], livros[2]])
+        db.session.commit()
+        #then
+        assert total == 3
+        assert Books.query.count() == 3
+        assert Books.query.filter_by(upc=livros[0]['upc']).one().price == 99.0
+
+    @pytest.mark.scrape
+    def test_quando_workers_reivindicarem_tarefas_nao_devem_receber_as_mesmas(self, app, tmp_path):
+        #given
+        job = create_scrape_job()
+        db.session.add_all([
+            ScrapeTask(job_id=job.id, kind='category', genre='Travel', url=f'http://livros/{i}.html', status='pending')
+            for i in range(5)
+        ])
+        db.session.commit()
+        lock_file = str(tmp_path / 'queue.lock')
+        #when
+        tarefas_a = [task.id for task in claim_tasks(job.id, 'worker-a', 2, lease_seconds=60, lock_file=lock_file)]
+        tarefas_b = [task.id for task in claim_tasks(job.id, 'worker-b', 2, lease_seconds=60, lock_file=lock_file)]
+        expirada = db.session.get(ScrapeTask, tarefas_a[0])
+        expirada.claimed_at = datetime.utcnow() - timedelta(minutes=5)
+        db.session.commit()
+        tarefas_c = [task.id for task in claim_tasks(job.id, 'worker-c', 5, lease_seconds=60, lock_file=lock_file)]
+        #then
+        assert len(tarefas_a) == len(tarefas_b) == 2
+        assert not set(tarefas_a) & set(tarefas_b)
+        #a tarefa com lease expirado volta a ser reivindicável, junto com a última pendente
+        assert sorted(tarefas_c) == sorted([tarefas_a[0], 5])
+
+    def _seed_travel_job(self, lock_file):
+        '''Job distribuído com uma tarefa (a página de Travel) reivindicada por worker-a.'''
+        job = create_scrape_job()
+        job.started_at = datetime.utcnow()
+        db.session.add(ScrapeTask(job_id=job.id, kind='category', genre='Travel', url=scrape_utils.BASE_URL + 'catalogue/category/books/travel_2/index.html', status='pending'))
+        db.session.commit()
+        claim_tasks(job.id, 'worker-a', 1, lease_seconds=60, lock_file=lock_file)
+        return job.id
+
+    @pytest.mark.scrape
+    def test_quando_um_livro_da_tarefa_falhar_deve_devolver_a_tarefa_a_fila(self, app, books_toscrape_corpus, tmp_path):
+        #given
+        job_id = self._seed_travel_job(str(tmp_path / 'queue.lock'))
+        fake_get = books_toscrape_corpus.side_effect
+
+        def get_com_falha(url, timeout=None):
+            if url.endswith('its-only-the-himalayas_981/index.html'):
+                raise requests.exceptions.ConnectionError('conexão recusada')
+            return fake_get(url, timeout=timeout)
+
+        books_toscrape_corpus.side_effect = get_com_falha
+        tasks = ScrapeTask.query.filter_by(job_id=job_id).all()
+        #when
+        gravados = process_tasks(job_id, 'worker-a', tasks, max_attempts=3, controller=CrawlController(max_retries=1, backoff_base=0.001))
+        #then
+        task = ScrapeTask.query.filter_by(job_id=job_id).one()
+        job = db.session.get(ScrapeJob, job_id)
+        assert gravados == 0 and Books.query.count() == 0
+        assert (task.status, task.attempts, task.worker) == ('pending', 1, None)
+        assert 'conexão recusada' in task.error
+        assert (job.pages_done, job.books_parsed) == (0, 0)
+
+    @pytest.mark.scrape
+    def test_quando_tarefa_esgotar_as_tentativas_deve_encerrar_o_job_como_falho(self, app, books_toscrape_corpus, tmp_path):
+        #given
+        job_id = self._seed_travel_job(str(tmp_path / 'queue.lock'))
+        db.session.get(ScrapeJob, job_id).status = 'running'
+        db.session.commit()
+        books_toscrape_corpus.side_effect = requests.exceptions.ConnectionError('conexão recusada')
+        tasks = ScrapeTask.query.filter_by(job_id=job_id).all()
+        #when
+        process_tasks(job_id, 'worker-a', tasks, max_attempts=1, controller=CrawlController(max_retries=1, backoff_base=0.001))
+        encerrado = finish_job_if_drained(job_id)
+        progresso = serialize_scrape_job(db.session.get(ScrapeJob, job_id), stale_seconds=300)
+        #then
+        assert encerrado
+        assert ScrapeTask.query.filter_by(job_id=job_id).one().status == 'failed'
+        assert (progresso['status'], progresso['failed_tasks']) == ('failed', 1)
+        assert progresso['error'] == '1 tarefas falharam após esgotar as tentativas'
+
+    @pytest.mark.scrape
+    def test_quando_outro_worker_assumir_o_lease_nao_deve_contar_a_pagina_duas_vezes(self, app, books_toscrape_corpus, tmp_path):
+        #given
+        lock_file = str(tmp_path / 'queue.lock')
+        job_id = self._seed_travel_job(lock_file)
+        tasks_a = ScrapeTask.query.filter_by(job_id=job_id).all()
+        #o lease de worker-a expira e worker-b assume a tarefa
+        db.session.query(ScrapeTask).update({ScrapeTask.claimed_at: datetime.utcnow() - timedelta(minutes=5)})
+        db.session.commit()
+        tasks_b = claim_tasks(job_id, 'worker-b', 1, lease_seconds=60, lock_file=lock_file)
+        #when
+        gravados_a = process_tasks(job_id, 'worker-a', tasks_a, max_attempts=3)
+        gravados_b = process_tasks(job_id, 'worker-b', tasks_b, max_attempts=3)
+        #then
+        task = ScrapeTask.query.filter_by(job_id=job_id).one()
+        job = db.session.get(ScrapeJob, job_id)
+        assert (gravados_a, gravados_b) == (0, 3)
+        assert (task.status, task.worker) == ('done', 'worker-b')
+        assert (job.pages_done, job.books_parsed, job.categories_done) == (1, 3, 1)
+
+    @pytest.mark.integration
+    @pytest.mark.scrape
+    def test_quando_workers_consumirem_a_fila_deve_gravar_todo_o_corpus_sem_duplicar(self, app, books_toscrape_corpus, tmp_path):
+        #given
+        runner = app.test_cli_runner()
+        lock_file = str(tmp_path / 'queue.lock')
+        app.config['SCRAPE_QUEUE_LOCK_FILE'] = lock_file
+        #when
+        seed = runner.invoke(args=['scrape-queue', 'seed'])
+        job_id = get_latest_distributed_job().id
+        #dois workers alternando reivindicações de uma tarefa por vez
+        while claim_tasks(job_id, 'worker-a', 1, 60, lock_file) + claim_tasks(job_id, 'worker-b', 1, 60, lock_file):
+            for task in ScrapeTask.query.filter_by(job_id=job_id, status='claimed').all():
+                process_tasks(job_id, task.worker, [task], max_attempts=3)
+        work = runner.invoke(args=['scrape-queue', 'work', '--job-id', str(job_id)])
+        job = db.session.get(ScrapeJob, job_id)
+        #uma nova rodada atualiza os mesmos livros em vez de duplicá-los
+        runner.invoke(args=['scrape-queue', 'seed'])
+        segunda = runner.invoke(args=['scrape-queue', 'work'])
+        #then
+        assert seed.exit_code == 0 and work.exit_code == 0 and segunda.exit_code == 0
+        assert job.status == 'done'
+        assert job.categories_done == job.categories_total == 3
+        assert job.pages_done == 4
+        assert job.books_parsed == 10
+        assert ScrapeTask.query.filter_by(job_id=job_id, kind='page').count() == 1
+        assert set(worker for (worker,) in db.session.query(ScrapeTask.worker).filter_by(job_id=job_id)) == {'worker-a', 'worker-b'}
+        assert Books.query.count() == 10
+
+    @pytest.mark.scrape
+    def test_quando_workers_processarem_tarefas_deve_combinar_as_metricas_no_job(self, app, books_toscrape_corpus, tmp_path):
+        #given
+        lock_file = str(tmp_path / 'queue.lock')
+        app.config['SCRAPE_QUEUE_LOCK_FILE'] = lock_file
+        app.test_cli_runner().invoke(args=['scrape-queue', 'seed'])
+        job_id = get_latest_distributed_job().id
+        controllers = {worker: CrawlController(metrics=ScrapeMetrics()) for worker in ('worker-a', 'worker-b')}
+        parciais = []
+        #when
+        while claim_tasks(job_id, 'worker-a', 1, 60, lock_file) + claim_tasks(job_id, 'worker-b', 1, 60, lock_file):
+            for task in ScrapeTask.query.filter_by(job_id=job_id, status='claimed').all():
+                process_tasks(job_id, task.worker, [task], max_attempts=3, controller=controllers[task.worker])
+                parciais.append(db.session.get(ScrapeJob, job_id).metrics['books'])
+        metricas = db.session.get(ScrapeJob, job_id).metrics
+        #then
+        assert parciais == sorted(parciais) and parciais[-1] == 10
+        assert set(metricas['workers']) == {'worker-a', 'worker-b'}
+        assert metricas['workers']['worker-a']['books'] == controllers['worker-a'].metrics.books
+        assert metricas['books'] == sum(worker['books'] for worker in metricas['workers'].values()) == 10
+        assert metricas['pages'] == 4 and metricas['writes'] == 4
+        assert metricas['requests'] == sum(controller.metrics.requests for controller in controllers.values())
+        assert metricas['request_latency_seconds']['count'] == metricas['requests']
+
+    @pytest.mark.scrape
+    def test_quando_reexecutar_com_cache_http_deve_reproduzir_do_disco_sem_acessar_a_rede(self, tmp_path):
+        #given
+        cache = ResponseCache(str(tmp_path / 'cache'))
+        lotes_rede, lotes_cache = [], []
+        with StandInServer() as server, \
+                patch.object(scrape_utils, 'BASE_URL', server.base_url), \
+                patch.object(scrape_utils, 'HOME_URL', server.base_url + 'index.html'):
+            run_scraping(on_batch=lotes_rede.extend, file_path=str(tmp_path / 'rede.csv'), controller=CrawlController(cache=cache))
+            requisicoes_primeira_execucao = server.requests_served
+            #when
+            run_scraping(on_batch=lotes_cache.extend, file_path=str(tmp_path / 'cache.csv'), controller=CrawlController(cache=cache))
+        #then
+        assert server.requests_served == requisicoes_primeira_execucao
+        assert cache.hits == requisicoes_primeira_execucao
+        assert lotes_cache == lotes_rede and len(lotes_rede) == 10
+
+    @pytest.mark.scrape
+    def test_quando_cache_http_expirar_ou_exceder_tamanho_deve_descartar_entradas(self, tmp_path):
+        #given
+        agora = [1000.0]
+        cache = ResponseCache(str(tmp_path / 'cache'), ttl=60, max_bytes=250, clock=lambda: agora[0])
+
+        def resposta(corpo):
+            response = requests.Response()
+            response._content, response.status_code = corpo, 200
+            return response
+        #when
+        cache.put('http://livros/a.html', resposta(b'a' * 100))
+        cache.put('http://livros/b.html', resposta(b'b' * 100))
+        cache.put('http://livros/a-copia.html', resposta(b'a' * 100))
+        os.utime(cache._object_path(hashlib.sha256(b'a' * 100).hexdigest()), (0, 0))
+        cache.put('http://livros/c.html', resposta(b'c' * 100))
+        agora[0] += 61
+        expirada = cache.get('http://livros/b.html')
+        #then
+        #conteúdo idêntico é armazenado uma única vez e o objeto menos usado é removido primeiro
+        assert cache.size == 200
+        assert cache.get('http://livros/a-copia.html') is None
+        assert expirada is None
+        agora[0] -= 61
+        assert cache.get('http://livros/c.html').content == b'c' * 100
+
+    @pytest.mark.scrape
+    def test_quando_coletar_com_metricas_deve_registrar_rede_parser_gravacao_e_falhas(self, tmp_path):
+        #given
+        metrics = ScrapeMetrics()
+        controller = CrawlController(max_retries=10, backoff_base=0.001, metrics=metrics)
+        #when
+        with StandInServer(error_rate=0.3, seed=7) as server, \
+                patch.object(scrape_utils, 'BASE_URL', server.base_url), \
+                patch.object(scrape_utils, 'HOME_URL', server.base_url + 'index.html'):
+            total = run_scraping(file_path=str(tmp_path / 'books.csv'), controller=controller)
+            with pytest.raises(requests.exceptions.HTTPError):
+                scrape_utils.extract_book_details(server.base_url + 'catalogue/inexistente/index.html', 'Travel', controller=controller)
+        snapshot = metrics.snapshot()
+        #then
+        assert snapshot['books'] == total == 10
+        assert snapshot['pages'] == 4
+        assert snapshot['requests'] == server.requests_served
+        assert snapshot['retries'] == server.errors_injected
+        assert snapshot['http_errors']['503'] == server.errors_injected
+        assert snapshot['request_latency_seconds']['count'] == server.requests_served
+        assert snapshot['bytes_downloaded'] > 0
+        assert snapshot['parse_seconds']['book']['count'] == 10
+        assert snapshot['failures_by_category'] == {'Travel': 1}
+        assert snapshot['writes'] == 1 and snapshot['books_per_second'] > 0
+        assert snapshot['bottleneck'] in ('network', 'parse', 'write')
+
+    @pytest.mark.scrape
+    def test_quando_observar_valores_o_histograma_deve_estimar_percentis_pelos_buckets(self):
+        #given
+        histograma = Histogram((0.1, 0.5, 1.0))
+        #when
+        for valor in [0.05] * 8 + [0.3, 2.0]:
+            histograma.observe(valor)
+        snapshot = histograma.snapshot()
+        #then
+        assert snapshot['count'] == 10
+        assert snapshot['p50'] == 0.1
+        assert snapshot['p90'] == 0.5
+        assert snapshot['p99'] == 2.0
+        assert snapshot['buckets'] == {'le_0.1': 8, 'le_0.5': 9, 'le_1': 9, 'le_inf': 10}
@@ -0,0 +1,192 @@
+import pandas as pd
+import pytest
+from sqlalchemy.dialects import postgresql
+from unittest.mock import patch, MagicMock
+from flask_jwt_extended import create_access_token
+from api.extensions import db
+from api.scripts.load_utils import upsert_books, truncate_books, get_catalog_version
+from api.scripts.search_utils import SEARCH_LIKE, SEARCH_POSTGRES, search_books, iter_search_books, build_fts5_query, build_tsquery, build_ranked_subquery, after_keyset
+from api.scripts.fuzzy_utils import TrigramIndex, trigrams, find_similar_titles, get_candidates_index, resolve_title
+from tests.conftest import make_book
+
+
+@pytest.mark.search
+class TestSearch:
+    def test_quando_montar_consultas_deve_usar_prefixos_e_colunas(self):
+        #given
+        title_tokens, genre_tokens = ['murder', 'time'], ['myst']
+        #when
+        fts5 = build_fts5_query(title_tokens, genre_tokens, include_description=True)
+        tsquery = build_tsquery(title_tokens, genre_tokens, include_description=False)
+        #then
+        assert fts5 == '{title description} : ("murder"* AND "time"*) OR genre : ("myst"*)'
+        assert tsquery == '(murder:*A & time:*A) | (myst:*B)'
+
+    def test_quando_montar_relevancia_no_postgres_deve_usar_precisao_dupla(self):
+        #given
+        dialect = postgresql.dialect()
+        ranked = build_ranked_subquery(SEARCH_POSTGRES, ['murder'], [], include_description=False)
+        #when
+        subquery = str(ranked.element.compile(dialect=dialect))
+        keyset = str(after_keyset(ranked.c.rank, (0.0607927, 'A', 1)).compile(dialect=dialect))
+        #then
+        assert "ts_rank(search_vector, to_tsquery('simple', %(query)s))::float8 AS rank" in subquery
+        assert 'CAST(%(param_1)s AS DOUBLE PRECISION)' in keyset
+
+    def test_quando_buscar_por_prefixo_deve_retornar_livros_ordenados_por_relevancia(self, catalog):
+        #when
+        results = search_books(title='murd')
+        #then
+        ranks = [rank for _, rank in results]
+        assert results
+        assert all('murder' in book.title.lower() for book, _ in results)
+        assert ranks == sorted(ranks, reverse=True)
+
+    def test_quando_buscar_com_descricao_deve_priorizar_correspondencias_no_titulo(self, app):
+        #given
+        upsert_books([
+            make_book('a', 'Gardens of Stone', description='A quiet murder in the village.'),
+            make_book('b', 'The Murder Room', description='Nothing to see.')
+        ])
+        db.session.commit()
+        #when
+        only_title = search_books(title='murder', include_description=False)
+        with_description = search_books(title='murder', include_description=True)
+        app.config['SEARCH_INCLUDE_DESCRIPTION'] = True
+        configured = search_books(title='murder')
+        streamed = list(iter_search_books(title='murder'))
+        #then
+        assert [book.upc for book, _ in only_title] == ['b']
+        assert [book.upc for book, _ in with_description] == ['b', 'a']
+        assert [book.upc for book, _ in configured] == [book.upc for book, _ in streamed] == ['b', 'a']
+
+    def test_quando_gravar_livros_no_scraping_deve_manter_o_indice_sincronizado(self, app):
+        #given
+        upsert_books([make_book('x1', 'Silent Harbor')])
+        db.session.commit()
+        found_before = [book.title for book, _ in search_books(title='harbor')]
+        #when
+        upsert_books([make_book('x1', 'Loud Harbour')])
+        db.session.commit()
+        found_after = [book.title for book, _ in search_books(title='silent')]
+        renamed = [book.title for book, _ in search_books(title='loud')]
+        truncate_books()
+        db.session.commit()
+        #then
+        assert found_before == ['Silent Harbor']
+        assert found_after == []
+        assert renamed == ['Loud Harbour']
+        assert search_books(title='harbour') == []
+
+    def test_quando_buscar_com_operadores_e_simbolos_nao_deve_falhar(self, catalog):
+        #when
+        results = search_books(title='AND "NEAR ( * murder')
+        #then
+        assert all('murder' in book.title.lower() for book, _ in results)
+        assert search_books(title='"*()') == []
+
+    def test_quando_banco_nao_tem_indice_de_texto_deve_buscar_com_like(self, catalog):
+        #given
+        with patch('api.scripts.search_utils.get_search_backend', return_value=SEARCH_LIKE):
+            #when
+            results = search_books(title='Murder', genre='Myst')
+        #then
+        assert results
+        assert all('murder' in book.title.lower() or 'myst' in book.genre.lower() for book, _ in results)
+
+    @pytest.mark.integration
+    def test_quando_buscar_pela_rota_deve_retornar_rank(self, client, catalog):
+        #given
+        headers = {'Authorization': f'Bearer {create_access_token(identity="test_user")}'}
+        #when
+        response = client.get('/api/v1/books/search?title=murder&genre=mystery', headers=headers)
+        resultado = response.get_json()
+        #then
+        assert response.status_code == 200
+        assert all('rank' in book for book in resultado)
+        assert [book['rank'] for book in resultado] == sorted((book['rank'] for book in resultado), reverse=True)
+        assert any(book['genre'] == 'Mystery' for book in resultado)
+
+
+@pytest.mark.search
+class TestFuzzySearch:
+    def test_quando_gerar_trigramas_deve_seguir_o_formato_do_pg_trgm(self):
+        #when
+        resultado = trigrams('Cat!')
+        #then
+        assert resultado == {'  c', ' ca', 'cat', 'at '}
+
+    def test_quando_buscar_no_indice_deve_calcular_a_similaridade_do_pg_trgm(self):
+        #given
+        index = TrigramIndex([(1, 'two words'), (2, 'unrelated')])
+        #when
+        resultado = index.search('word', threshold=0.3)
+        #then
+        assert [(key, round(score, 6)) for key, _, score in resultado] == [(1, 0.363636)]
+
+    def test_quando_buscar_titulo_com_erro_de_digitacao_deve_encontrar_o_livro(self, catalog):
+        #when
+        resultado = search_books(title='Murdr in Tme')
+        #then
+        assert resultado
+        assert resultado[0][0].title == 'A Murder in Time'
+        assert 0 < resultado[0][1] <= 1
+
+    def test_quando_catalogo_mudar_deve_reconstruir_o_indice_de_trigramas(self, app):
+        #given
+        upsert_books([make_book('t1', 'The Lighthouse Keeper')])
+        db.session.commit()
+        version_before = get_catalog_version()
+        assert [title for _, title, _ in find_similar_titles('Lighthouse Keper')] == ['The Lighthouse Keeper']
+        #when
+        upsert_books([make_book('t2', 'The Lighthouse Keepers Daughter')])
+        db.session.commit()
+        resultado = [title for _, title, _ in find_similar_titles('Lighthouse Keper')]
+        #then
+        assert get_catalog_version() == version_before + 1
+        assert sorted(resultado) == ['The Lighthouse Keeper', 'The Lighthouse Keepers Daughter']
+        app.config['SEARCH_FUZZY_LIMIT'] = 1
+        assert len(find_similar_titles('Lighthouse Keper')) == 1
+
+    def test_quando_resolver_titulo_deve_retornar_o_candidato_mais_parecido(self, app):
+        #given
+        candidatos = get_candidates_index('Candidatos de teste', 1, lambda: ['The Secret Garden', 'The Secret History', 'Sapiens'])
+        #when / then
+        assert resolve_title('The Secret Garden', candidatos) == 'The Secret Garden'
+        assert resolve_title('the secret gardn', candidatos) == 'The Secret Garden'
+        assert resolve_title('xyz', candidatos) is None
+        app.config['SEARCH_FUZZY_THRESHOLD'] = 0.95
+        assert resolve_title('the secret gardn', candidatos) is None
+
+    def test_quando_versao_dos_candidatos_nao_mudar_deve_reaproveitar_o_indice(self):
+        #given
+        candidatos = MagicMock(side_effect=lambda: ['The Secret Garden', 'Sapiens'])
+        #when
+        primeiro = get_candidates_index('Títulos do modelo de teste', 1, candidatos)
+        mesma_versao = get_candidates_index('Títulos do modelo de teste', 1, candidatos)
+        nova_versao = get_candidates_index('Títulos do modelo de teste', 2, candidatos)
+        #then
+        assert primeiro is mesma_versao is not nova_versao
+        assert candidatos.call_count == 2
+
+    @pytest.mark.integration
+    @pytest.mark.predictions
+    @patch('api.routes.ml.joblib.load')
+    @patch('api.routes.ml.recommender')
+    def test_quando_pedir_predicao_com_erro_de_digitacao_deve_usar_o_titulo_resolvido(self, mock_recommender, mock_load, client, tmp_path):
+        #given
+        headers = {'Authorization': f'Bearer {create_access_token(identity="1")}'}
+        upsert_books([make_book('g1', 'The Secret Garden'), make_book('g2', 'Sapiens')])
+        db.session.commit()
+        idx = pd.Series([0, 1], index=['The Secret Garden', 'Sapiens'])
+        #artefato próprio do teste: o índice dos títulos do modelo é versionado pelo arquivo
+        idx_path = str(tmp_path / 'idx_series.pkl')
+        idx.to_pickle(idx_path)
+        mock_load.side_effect = lambda path: idx if path.endswith('idx_series.pkl') else MagicMock()
+        mock_recommender.return_value = ([], None)
+        #when
+        with patch('api.routes.ml.IDX_PATH', idx_path):
+            response = client.get('/api/v1/ml/predictions', json={'title': 'The Secret Gardn'}, headers=headers)
+        #then
+        assert response.status_code == 200
+        assert mock_recommender.call_args[0][0] == 'The Secret Garden'
@@ -0,0 +1,37 @@
+import pytest
+from api.models.books import Books
+from api.scripts.books_utils import get_books_by_price_range, get_books_by_title_or_category, get_top_rated_books
+from api.scripts.catalog_snapshot_utils import CatalogRow
+from api.scripts.serialization_utils import BOOK_SUMMARY_FIELDS, book_columns, serialize_rows
+from tests.conftest import capture_statements
+
+
+@pytest.mark.serialization
+class TestSerialization:
+    @pytest.mark.parametrize('function', [
+        lambda: get_books_by_price_range(10, 20, limit=5),
+        lambda: get_books_by_title_or_category(title='murder'),
+        lambda: get_books_by_title_or_category(title='Murdr in Tme'),
+        lambda: get_top_rated_books(limit=5),
+    ])
+    def test_quando_listar_livros_deve_ler_so_as_colunas_retornadas(self, catalog, function):
+        #given
+        with capture_statements() as statements:
+            #when
+            books = function()
+        #then
+        consultas = [statement for statement, _ in statements if 'FROM books' in statement]
+        assert books and consultas
+        assert all('books.description' not in statement and 'books.url' not in statement for statement in consultas)
+
+    def test_quando_serializar_deve_aceitar_tuplas_snapshot_e_entidades(self, catalog):
+        #given
+        entidade = Books.query.filter_by(id=1).first()
+        tupla = Books.query.with_entities(*book_columns(BOOK_SUMMARY_FIELDS)).filter_by(id=1).first()
+        snapshot = CatalogRow(*(getattr(entidade, field) for field in CatalogRow._fields))
+        #when
+        resultado = [serialize_rows([row], BOOK_SUMMARY_FIELDS)[0] for row in (entidade, tupla, snapshot)]
+        #then
+        assert resultado[0] == resultado[1] == resultado[2]
+        assert list(resultado[0]) == list(BOOK_SUMMARY_FIELDS)
+        assert serialize_rows([tupla], ('title',)) == [{'title': entidade.title}]
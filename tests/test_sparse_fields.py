@@ -0,0 +1,99 @@
+import pytest
+from api.scripts.books_utils import get_book_by_id, get_books_by_ids, get_books_by_price_range
+from tests.conftest import walk, capture_statements
+
+
+def selected_columns(statements, fragment='FROM books'):
+    '''Lista de colunas (trecho entre SELECT e FROM) da única consulta capturada com o trecho informado.'''
+    matches = [statement for statement, _ in statements if fragment in statement]
+    assert len(matches) == 1
+    return matches[0].split('FROM books')[0]
+
+
+@pytest.mark.sparse_fields
+class TestSparseFields:
+    def test_quando_pedir_campos_dos_detalhes_deve_ler_so_essas_colunas(self, client, catalog, headers):
+        #given
+        completo = get_book_by_id('7')
+        with capture_statements() as statements:
+            #when
+            response = client.get('/api/v1/books/details/7?fields=id,title,price,image_url', headers=headers)
+        #then
+        assert response.status_code == 200
+        assert response.get_json() == {field: completo[field] for field in ('id', 'title', 'price', 'image_url')}
+        assert all('book_details' not in statement for statement, _ in statements)
+        assert 'books.upc' not in selected_columns(statements)
+
+    def test_quando_pedir_a_descricao_deve_juntar_book_details(self, catalog):
+        #given
+        completo = get_book_by_id('7')
+        with capture_statements() as statements:
+            #when
+            livro = get_book_by_id('7', fields=('title', 'description'))
+            livros = get_books_by_ids([7, 9999], fields=('description',))
+        #then
+        assert livro == {'title': completo['title'], 'description': completo['description']}
+        assert livros == {'books': [{'description': completo['description']}], 'missing': [9999]}
+        assert all('book_details' in statement for statement, _ in statements)
+
+    def test_quando_paginar_com_campos_deve_ler_so_os_campos_e_a_chave(self, client, catalog, headers):
+        #given
+        esperados = [book['title'] for book in get_books_by_price_range(10, 20)]
+        with capture_statements() as statements:
+            get_books_by_price_range(10, 20, limit=5, fields=('title',))
+        #when
+        pages = walk(client, '/api/v1/books/price-range?min=10&max=20&limit=50&fields=title', headers)
+        #then
+        colunas = selected_columns(statements)
+        assert 'books.title' in colunas and 'books.price' in colunas and 'books.id' in colunas
+        assert 'books.upc' not in colunas and 'books.image_url' not in colunas
+        assert all(list(book) == ['title'] for page in pages for book in page)
+        assert [book['title'] for page in pages for book in page] == esperados
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/books/search?title=murder&fields=id,rating',
+        '/api/v1/books/top-rated?limit=3&fields=title,number_of_reviews',
+        '/api/v1/books/facets?title=the&fields=title,availability',
+        '/api/v1/books/details?ids=1,2&fields=upc,tax',
+    ])
+    def test_quando_pedir_campos_nas_listagens_deve_retornar_so_esses_campos(self, client, catalog, headers, url):
+        #given
+        campos = set(url.split('fields=')[1].split(','))
+        #when
+        response = client.get(url, headers=headers)
+        resultado = response.get_json()
+        livros = (resultado.get('books') or resultado.get('results')) if isinstance(resultado, dict) else resultado
+        #then
+        assert response.status_code == 200
+        assert livros
+        assert all(set(book) - {'rank'} == campos for book in livros)
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/books/price-range?min=10&max=20&fields=title,description',
+        '/api/v1/books/top-rated?fields=isbn',
+        '/api/v1/books/details/1?fields=',
+        '/api/v1/books/details?ids=1&fields=id,,senha',
+    ])
+    def test_quando_pedir_campos_invalidos_deve_retornar_400(self, client, catalog, headers, url):
+        #when
+        response = client.get(url, headers=headers)
+        #then
+        assert response.status_code == 400
+        assert response.get_json()['msg'].startswith('O parâmetro fields aceita apenas os campos:')
+
+    def test_quando_usar_snapshot_deve_retornar_os_mesmos_campos(self, app, catalog):
+        #given
+        consultas = lambda: (
+            get_book_by_id('3', fields=('genre', 'url')),
+            get_books_by_ids([3, 1, 5000], fields=('title', 'tax')),
+            get_books_by_price_range(10, 11, fields=('rating',)),
+        )
+        esperado = consultas()
+        app.config['CATALOG_SNAPSHOT_ENABLED'] = True
+        try:
+            #when
+            resultado = consultas()
+        finally:
+            app.config['CATALOG_SNAPSHOT_ENABLED'] = False
+        #then
+        assert resultado == esperado
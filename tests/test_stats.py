@@ -1,6 +1,13 @@
+import pandas as pd
 import pytest
 from unittest.mock import patch
 from flask_jwt_extended import create_access_token
+from api.extensions import db
+from api.models.catalog_stats import CatalogStats
+from api.scripts.catalog_stats_utils import STATS_GENRES, STATS_OVERVIEW, compute_stats_by_genre, compute_stats_overview
+from api.scripts.load_utils import upsert_books
+from api.scripts.stats_utils import get_stats_by_genre, get_stats_overview
+from tests.conftest import capture_statements
 
 
 @pytest.mark.stats
@@ -87,4 +94,53 @@ class TestOverview:
         #then
         assert response.status_code == 404
         assert resultado['msg'] == 'Nenhuma estatística por gênero disponível'
-        mock_get_stats_by_genres.assert_called_once()
\ No newline at end of file
+        mock_get_stats_by_genres.assert_called_once()
+
+
+@pytest.mark.stats
+class TestCatalogStats:
+    def _get_mock_token(self):
+        return create_access_token(identity='test_user')
+
+    def test_quando_carregar_livros_deve_gravar_as_estatisticas(self, catalog):
+        #when
+        overview = db.session.get(CatalogStats, STATS_OVERVIEW)
+        genres = db.session.get(CatalogStats, STATS_GENRES)
+        #then
+        assert overview.payload == compute_stats_overview()
+        assert overview.payload['total_books'] == 1000
+        assert genres.payload == compute_stats_by_genre()
+
+    def test_quando_buscar_estatisticas_deve_ler_apenas_catalog_stats(self, client, catalog):
+        #given
+        headers = {'Authorization': f'Bearer {self._get_mock_token()}'}
+        with capture_statements() as statements:
+            #when
+            overview = client.get('/api/v1/stats/overview', headers=headers)
+            genres = client.get('/api/v1/stats/genres', headers=headers)
+        #then
+        assert overview.get_json() == compute_stats_overview()
+        assert genres.get_json() == compute_stats_by_genre()
+        assert len([statement for statement, _ in statements if 'FROM catalog_stats' in statement]) == 2
+        assert not [statement for statement, _ in statements if 'books' in statement]
+
+    def test_quando_atualizar_livros_deve_recalcular_as_estatisticas(self, catalog):
+        #given
+        livro = pd.read_csv('data/books.csv', keep_default_na=False).iloc[[0]].assign(upc='novo-livro', genre='Genero Novo', price=100.0)
+        #when
+        upsert_books(livro)
+        db.session.commit()
+        #then
+        assert get_stats_overview()['total_books'] == 1001
+        assert {'genre': 'Genero Novo', 'total': 1, 'avg_price': 100.0} in get_stats_by_genre()
+
+    def test_quando_estatisticas_nao_estiverem_gravadas_deve_agregar_books(self, catalog):
+        #given
+        CatalogStats.query.delete()
+        db.session.commit()
+        #when
+        overview = get_stats_overview()
+        genres = get_stats_by_genre()
+        #then
+        assert overview == compute_stats_overview()
+        assert genres == compute_stats_by_genre()
@@ -0,0 +1,63 @@
+import json
+import pytest
+from unittest.mock import patch
+from tests.conftest import walk
+
+
+def ndjson(response):
+    '''Objetos de uma resposta NDJSON, um por linha.'''
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+@pytest.mark.streaming
+class TestStreaming:
+    @pytest.mark.parametrize('url, stream', [
+        ('/api/v1/books/titles?limit=1000', '/api/v1/books/titles'),
+        ('/api/v1/books/search?title=the&fields=id,title&limit=1000', '/api/v1/books/search?title=the&fields=id,title'),
+        ('/api/v1/books/search?title=Murdr%20in%20Tme', '/api/v1/books/search?title=Murdr%20in%20Tme'),
+    ])
+    def test_quando_pedir_streaming_deve_retornar_todos_os_itens_das_paginas(self, client, catalog, headers, url, stream):
+        #given
+        esperado = [item for page in walk(client, url, headers) for item in page]
+        separator = '&' if '?' in stream else '?'
+        #when
+        response_json = client.get(f'{stream}{separator}stream=json', headers=headers)
+        streamed_json = response_json.is_streamed
+        resultado_json = response_json.get_json()
+        response_ndjson = client.get(f'{stream}{separator}stream=ndjson', headers=headers)
+        streamed_ndjson = response_ndjson.is_streamed
+        resultado_ndjson = ndjson(response_ndjson)
+        #then
+        assert streamed_json and response_json.mimetype == 'application/json'
+        assert streamed_ndjson and response_ndjson.mimetype == 'application/x-ndjson'
+        assert esperado
+        assert resultado_json == resultado_ndjson == esperado
+
+    @patch('api.routes.ml.tokenizer', side_effect=lambda text: text)
+    def test_quando_aceitar_ndjson_deve_transmitir_as_features(self, mock_tokenizer, client, catalog, headers):
+        #given
+        esperado = [item for page in walk(client, '/api/v1/ml/features?limit=1000', headers) for item in page['features']]
+        #when
+        response = client.get('/api/v1/ml/features', headers=dict(headers, Accept='application/x-ndjson'))
+        #then
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        assert ndjson(response) == esperado
+
+    def test_quando_transmitir_deve_emitir_os_itens_em_blocos(self, app, client, catalog, headers):
+        #given
+        app.config['STREAM_YIELD_PER'] = 100
+        #when
+        response = client.get('/api/v1/books/titles?stream=ndjson', headers=headers)
+        chunks = list(response.response)
+        #then
+        linhas = [chunk.count(b'\n') for chunk in chunks]
+        assert len(chunks) > 1
+        assert all(total == 100 for total in linhas[:-1]) and 0 < linhas[-1] <= 100
+
+    def test_quando_pedir_formato_desconhecido_deve_retornar_400(self, client, headers):
+        #when
+        response = client.get('/api/v1/books/titles?stream=xml', headers=headers)
+        #then
+        assert response.status_code == 400
+        assert response.get_json()['msg'] == 'O parâmetro stream deve ser um dos formatos: json, ndjson.'